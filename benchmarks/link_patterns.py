@@ -0,0 +1,93 @@
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+dir = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, f"{dir}/tools")
+
+from link_patterns import LinkPattern, LinkResolver, compile_pattern, match_properties  # noqa: E402
+
+# Measures URL resolution throughput of the compiled LinkResolver against trying every brand pattern in turn, for growing brand counts.
+
+
+def synthetic_patterns(brand_count: int):
+    patterns = []
+    for i in range(brand_count):
+        brand = f"brand-{i}"
+        host = rf"www\.brand{i}\.example"
+        patterns += [
+            LinkPattern(brand, "material_package", rf"https://{host}/(?:[a-z]{{2}}/)?product/(?<MaterialPackage_brand_specific_id>[\w-]+)/?"),
+            LinkPattern(brand, "material", rf"https://{host}/material/(?<Material_uuid>[0-9a-f-]{{36}})"),
+            LinkPattern(brand, "material_package_instance", rf"https://spool\.brand{i}\.example/\?id=(?<MaterialPackageInstance_brand_specific_id>\d+)"),
+        ]
+
+    return patterns
+
+
+def synthetic_urls(brand_count: int, count: int, rng: random.Random):
+    urls = []
+    for _ in range(count):
+        i = rng.randrange(brand_count)
+        match rng.randrange(4):
+            case 0:
+                urls.append(f"https://www.brand{i}.example/cs/product/pla-galaxy-black-{rng.randrange(1000)}/")
+            case 1:
+                urls.append(f"https://www.brand{i}.example/material/{rng.getrandbits(128):032x}")
+            case 2:
+                urls.append(f"https://spool.brand{i}.example/?id={rng.randrange(10**9)}")
+            case 3:
+                urls.append(f"https://unrelated.example/{rng.randrange(1000)}")
+
+    return urls
+
+
+def resolve_naive(patterns, url):
+    result = []
+    for link_pattern in patterns:
+        if match := re.match(compile_pattern(link_pattern.pattern), url):
+            result.append((link_pattern.brand, link_pattern.type, match_properties(match)))
+
+    return result
+
+
+def throughput(function, urls, min_time):
+    count = 0
+    start = time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < min_time or count == 0:
+        function(urls)
+        count += len(urls)
+
+    return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the link pattern resolver")
+    parser.add_argument("--brands", type=int, nargs="*", default=[10, 100, 1000, 5000])
+    parser.add_argument("--urls", type=int, default=2000, help="Number of distinct URLs per batch")
+    parser.add_argument("--min-time", type=float, default=1.0, help="Minimum measured time per case [s]")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'brands':>8} {'patterns':>9} {'naive URL/s':>12} {'resolver URL/s':>15} {'speedup':>8}")
+
+    for brand_count in args.brands:
+        rng = random.Random(args.seed)
+        patterns = synthetic_patterns(brand_count)
+        urls = synthetic_urls(brand_count, args.urls, rng)
+        resolver = LinkResolver(patterns)
+
+        expected = [resolve_naive(patterns, url) for url in urls]
+        actual = [[(match.brand, match.type, match.properties) for match in matches] for matches in resolver.resolve_many(urls)]
+        assert actual == expected, "Resolver results differ from the naive resolution"
+
+        naive = throughput(lambda urls: [resolve_naive(patterns, url) for url in urls], urls, args.min_time)
+        compiled = throughput(resolver.resolve_many, urls, args.min_time)
+
+        print(f"{brand_count:>8} {len(patterns):>9} {naive:>12.0f} {compiled:>15.0f} {compiled / naive:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+dir = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, f"{dir}/tools")
+
+import database  # noqa: E402
+import integrity  # noqa: E402
+import opt_uuid  # noqa: E402
+import validate_db  # noqa: E402
+import yaml_loader  # noqa: E402
+from color_index import ColorIndex  # noqa: E402
+from facets import FacetIndex  # noqa: E402
+from gtin import GtinIndex  # noqa: E402
+from synthetic_db import default_counts, SyntheticDatabase  # noqa: E402
+
+# Benchmark suite over a synthetic database (tools/synthetic_db.py).
+# Every run is appended to a JSON history file and compared with the previous run of the same size, so that regressions show up.
+# Metric names end with the unit: *_s/*_ms are times (lower is better), *_per_s are throughputs (higher is better).
+
+default_history = f"{dir}/build/benchmarks/history.json"
+schema_dir = f"{dir}/schema/generated/opt_db_schema"
+
+facet_queries = [
+    "class=FFF",
+    "class=FFF & type=PETG",
+    "tags=contains_carbon | tags=glitter",
+    "class=FFF & !implied_tags=abrasive",
+]
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def latency_ms(function, repeat: int):
+    # Median latency of repeated calls
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(times)
+
+
+def bench_schema_generation(root):
+    # Full generation and the up-to-date check, into a temporary directory so that schema/generated and its manifest are left alone
+    with tempfile.TemporaryDirectory() as output:
+        command = [sys.executable, f"{dir}/schema/generate_db_schema.py", "--output", output]
+        _, full = timed(subprocess.run, command, check=True, capture_output=True)
+        _, incremental = timed(subprocess.run, command, check=True, capture_output=True)
+
+    return {"full_s": full, "up_to_date_s": incremental}
+
+
+def bench_yaml_load(root):
+    # Loading through the (warm) cache and parsing without it
+    files = list(database.entity_files(root))
+    _, cached = timed(lambda: [yaml_loader.load_yaml(file.path) for file in files])
+
+    contents = []
+    for file in files:
+        with open(file.path, "rb") as f:
+            contents.append(f.read())
+
+    _, parse = timed(lambda: [yaml_loader.parse_yaml(content) for content in contents])
+
+    return {"files": len(files), "cached_files_per_s": len(files) / cached, "parse_files_per_s": len(files) / parse}
+
+
+def bench_validation(root):
+    results, elapsed = timed(lambda: list(validate_db.validate_database(root, schema_dir)))
+    assert all(result.errors == [] for result in results), "The synthetic database is not valid"
+
+    # Native validators on already loaded documents, single core
+    spec = importlib.util.spec_from_file_location("opt_db_validators", f"{schema_dir}/opt_db_validators.py")
+    native = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(native)
+
+    documents = [(native.validators[file.kind], yaml_loader.load_yaml(file.path)) for file in database.entity_files(root)]
+    _, native_elapsed = timed(lambda: [validator(document) for validator, document in documents])
+
+    return {"files_per_s": len(results) / elapsed, "native_documents_per_s": len(documents) / native_elapsed}
+
+
+def bench_uuid_derivation(root):
+    derivations, elapsed = timed(lambda: list(opt_uuid.derive_database(root)))
+    assert not any(derivation.mismatch for derivation in derivations), "UUID mismatch in the synthetic database"
+    return {"entities_per_s": len(derivations) / elapsed}
+
+
+def bench_integrity(root):
+    issues, elapsed = timed(integrity.check_database, root)
+    assert not issues, "Integrity issues in the synthetic database"
+    return {"check_s": elapsed}
+
+
+def bench_facet_index(root):
+    index, build = timed(FacetIndex.build, root)
+    result = {"build_s": build}
+
+    for i, query in enumerate(facet_queries):
+        result[f"query{i}_ms"] = latency_ms(lambda: index.facet_counts(index.query(query)), 20)
+
+    return result
+
+
+def bench_color_index(root):
+    index, build = timed(ColorIndex.build, root)
+    return {
+        "build_s": build,
+        "nearest_de76_ms": latency_ms(lambda: index.nearest([50, 20, -30], 10, "de76"), 50),
+        "nearest_de2000_ms": latency_ms(lambda: index.nearest([50, 20, -30], 10, "de2000"), 50),
+        "within_de76_ms": latency_ms(lambda: index.within([50, 20, -30], 10, "de76"), 50),
+    }
+
+
+def bench_gtin(root):
+    index, build = timed(GtinIndex.build, root)
+    assert not index.issues, "GTIN issues in the synthetic database"
+
+    # Batch of scans as they come from a barcode reader - GTIN-13 strings, some of them unknown
+    scans = [str(gtin) for gtin in index.packages] + [str(gtin + 10) for gtin in index.packages]
+    _, resolve = timed(index.resolve, scans)
+    return {"build_s": build, "resolve_scans_per_s": len(scans) / resolve}
+
+
+benchmarks = {
+    "schema_generation": bench_schema_generation,
+    "yaml_load": bench_yaml_load,
+    "validation": bench_validation,
+    "uuid_derivation": bench_uuid_derivation,
+    "integrity": bench_integrity,
+    "facet_index": bench_facet_index,
+    "color_index": bench_color_index,
+    "gtin": bench_gtin,
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=dir, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def read_history(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+
+    except FileNotFoundError:
+        return []
+
+
+def compare(previous, current, threshold):
+    # Returns [(benchmark, metric, previous, current, relative change)] of the metrics that got worse by more than the threshold
+    regressions = []
+    for name, metrics in current.items():
+        for metric, value in metrics.items():
+            old = previous.get(name, {}).get(metric)
+            if not old or not isinstance(value, float):
+                continue
+
+            if metric.endswith("_per_s"):
+                change = old / value - 1
+            elif metric.endswith("_s") or metric.endswith("_ms"):
+                change = value / old - 1
+            else:
+                continue
+
+            if change > threshold:
+                regressions.append((name, metric, old, value, change))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the benchmarks over a synthetic database and records the results")
+    parser.add_argument("--size", type=int, default=1000, help="Number of materials of the synthetic database (see tools/synthetic_db.py)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database", help="Directory of the synthetic database, generated if it does not exist (default: build/benchmarks/db-<size>-<seed>)")
+    parser.add_argument("--history", default=default_history, help="JSON history file the results are appended to")
+    parser.add_argument("--only", nargs="*", choices=sorted(benchmarks), help="Run only the selected benchmarks")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative slowdown reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    root = args.database or f"{dir}/build/benchmarks/db-{args.size}-{args.seed}"
+    if not os.path.isdir(root):
+        print(f"Generating synthetic database {root}", file=sys.stderr)
+        SyntheticDatabase(root, args.seed).generate(**default_counts(args.size))
+
+    # Warm up the YAML cache, so that the results do not depend on the order of the benchmarks
+    for file in database.entity_files(root):
+        yaml_loader.load_yaml(file.path)
+
+    results = dict()
+    for name in args.only or benchmarks:
+        print(f"Running {name}", file=sys.stderr)
+        results[name] = benchmarks[name](root)
+
+    entry = {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "size": args.size,
+        "seed": args.seed,
+        "results": results,
+    }
+
+    history = read_history(args.history)
+    previous = next((item for item in reversed(history) if item["size"] == args.size and item["seed"] == args.seed), None)
+
+    history.append(entry)
+    os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+    with open(f"{args.history}.tmp", "w") as f:
+        json.dump(history, f, indent=2)
+    os.replace(f"{args.history}.tmp", args.history)
+
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            print(f"{name + '.' + metric:<45} {value:>14.4g}")
+
+    if previous is None:
+        return
+
+    # The history can be shared between machines, the results are only comparable on the same one
+    environment = ("machine", "cpus", "python")
+    if differences := [f"{key} {previous.get(key)} -> {entry[key]}" for key in environment if previous.get(key) != entry[key]]:
+        print(f"WARNING: the previous run ({previous['commit']}) was on a different machine ({', '.join(differences)}), the comparison is not reliable", file=sys.stderr)
+
+    regressions = compare(previous["results"], results, args.threshold)
+    for name, metric, old, new, change in regressions:
+        print(f"REGRESSION {name}.{metric}: {old:.4g} -> {new:.4g} ({change:+.0%} against {previous['commit']})", file=sys.stderr)
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
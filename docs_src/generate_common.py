@@ -1,21 +1,28 @@
 import shutil
 import os
+import hashlib
+import glob
+import json
+import time
+import traceback
+import concurrent.futures
 import jinja2
 import jinja2.ext
 import subprocess
 import urllib.request
-import yaml
 import typing
-import pathlib
 import io
 import sys
 
 import vars
 import tables
 
-# Re-create output directory
-shutil.rmtree(vars.out_dir, ignore_errors=True)
-os.mkdir(vars.out_dir)
+sys.path.insert(0, f"{vars.root_dir}/tools")
+from spec import load_spec  # noqa: E402
+from tracing import count, span, traced  # noqa: E402
+
+# Output directory - not re-created, pages that are up to date are kept (see build)
+os.makedirs(vars.out_dir, exist_ok=True)
 
 # Build dir
 os.makedirs(vars.build_dir, exist_ok=True)
@@ -36,27 +43,82 @@ plantuml_jar = download_dependency(
 # Copy the docsify index.html
 shutil.copyfile(f"{vars.dir}/index.html", f"{vars.out_dir}/index.html")
 
+# Dependency tracking
+# Every template and data yaml used while rendering a page is recorded in the manifest, together with its content hash.
+# Later builds only re-render the pages whose dependencies changed. Changes of the generator code itself re-render everything.
+docs_manifest_file = f"{vars.build_dir}/docs_manifest.json"
+docs_manifest_version = 1
+
+generator_files = [
+    *sorted(glob.glob(f"{vars.dir}/*.py")),
+    f"{vars.root_dir}/tools/spec.py",
+    f"{vars.root_dir}/tools/yaml_loader.py",
+]
+
+# Record of the page being rendered: {"dependencies": set of paths relative to root_dir, "outputs": list of files in out_dir}
+current_page = None
+
+
+def file_hash(path):
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    except FileNotFoundError:
+        return None
+
+
+def add_dependency(path):
+    if current_page is not None:
+        current_page["dependencies"].add(os.path.relpath(path, vars.root_dir))
+
+
+class TrackingEnvironment(jinja2.Environment):
+    # Records all templates loaded during the page rendering, including includes/extends/imports (which load through get_template as well)
+    def get_template(self, name, parent=None, globals=None):
+        if isinstance(name, str):
+            add_dependency(f"{vars.dir}/{self.join_path(name, parent) if parent is not None else name}")
+
+        return super().get_template(name, parent, globals)
+
+
 # Set up jinja
-env = jinja2.Environment(loader=jinja2.FileSystemLoader(vars.dir))
+env = TrackingEnvironment(loader=jinja2.FileSystemLoader(vars.dir))
 jinja_args = {}
 
 
 # PlantUML support
+# Diagrams are only rendered to .plantuml sources during the templating, render_plantuml then converts them to SVGs at once.
+# Starting the JVM dominates the PlantUML run time, so all the diagrams not in the cache are rendered by a single java invocation.
+# The SVGs are cached by a hash of the rendered source, unchanged diagrams are never re-rendered.
 current_plantuml = None
+plantuml_cache_dir = f"{vars.build_dir}/plantuml_cache"
+
+# Rendered source file -> content hash
+pending_plantuml = {}
 
 
 def gen_plantuml(source_file):
     global current_plantuml
     rendered_uml_file = f"{vars.out_dir}/{source_file}"
 
+    current_plantuml = source_file
+    with span("render_template", "docs", template=f"plantuml/{source_file}"):
+        source = env.get_template(f"plantuml/{source_file}").render(jinja_args)
+    current_plantuml = None
+
     with open(rendered_uml_file, "w") as f:
-        current_plantuml = source_file
-        f.write(env.get_template(f"plantuml/{source_file}").render(jinja_args))
-        current_plantuml = None
+        f.write(source)
+
+    # plantuml_common is rendered outside of the page, so it is not tracked by the environment
+    add_dependency(f"{vars.dir}/plantuml/_common.plantuml")
+
+    # The PlantUML version is a part of the key, so that updating it re-renders everything
+    pending_plantuml[source_file] = hashlib.sha256(f"{os.path.basename(plantuml_jar)}\n{source}".encode()).hexdigest()
 
     rendered_img_file = os.path.splitext(source_file)[0] + ".svg"
-    args = ["java", "-jar", plantuml_jar, "-o", vars.out_dir, "-tsvg", rendered_uml_file]
-    subprocess.run(args)
+    if current_page is not None:
+        current_page["outputs"] += [source_file, rendered_img_file]
 
     result = f'<img src="{rendered_img_file}">'
     result += f"*The graph was automatically generated from [`{source_file}`]({vars.repo}/blob/main/docs_src/plantuml/{source_file})*\n\n"
@@ -64,6 +126,38 @@ def gen_plantuml(source_file):
     return result
 
 
+@traced("render_plantuml", "docs")
+def render_plantuml():
+    if not pending_plantuml:
+        return
+
+    os.makedirs(plantuml_cache_dir, exist_ok=True)
+
+    misses = []
+    for source_file, hash in pending_plantuml.items():
+        cached_source = f"{plantuml_cache_dir}/{hash}.plantuml"
+        if not os.path.isfile(f"{plantuml_cache_dir}/{hash}.svg") and cached_source not in misses:
+            shutil.copyfile(f"{vars.out_dir}/{source_file}", cached_source)
+            misses.append(cached_source)
+
+    if misses:
+        # Without -o, the SVGs are generated next to the sources, named by the hash
+        with span("plantuml", "docs", diagrams=len(misses)):
+            subprocess.run(["java", "-jar", plantuml_jar, "-tsvg", *misses])
+
+    for source_file, hash in pending_plantuml.items():
+        cached_svg = f"{plantuml_cache_dir}/{hash}.svg"
+        if os.path.isfile(cached_svg):
+            shutil.copyfile(cached_svg, f"{vars.out_dir}/{os.path.splitext(source_file)[0]}.svg")
+        else:
+            print(f"PlantUML failed to render {source_file}", file=sys.stderr)
+
+    print(f"PlantUML: {len(pending_plantuml)} diagrams, {len(misses)} rendered")
+    count("plantuml_cache.hits", len(pending_plantuml) - len(misses))
+    count("plantuml_cache.misses", len(misses))
+    pending_plantuml.clear()
+
+
 env.globals["plantuml"] = gen_plantuml
 
 
@@ -74,26 +168,20 @@ class ProjectTag(typing.NamedTuple):
 
 
 _project_tag_list = {}
-entity_yamls = dict()
-enum_yamls = dict()
-
-# Scan the data directory and load up all the yamls
-for file in pathlib.Path(vars.data_dir).glob("*.yaml"):
-    data = yaml.safe_load(open(os.path.join(vars.data_dir, file), "r"))
-    key = str(file)
-    if isinstance(data, dict):
-        entity_yamls[key] = data
 
-    elif isinstance(data, list):
-        enum_yamls[key] = {"items": data}
+# All the data yamls, loaded once (reloaded by the watch mode when they change)
+spec = load_spec(vars.data_dir)
 
-    else:
-        assert False
+# Entities/enums that have been documented already, to check that everything is documented exactly once
+plantuml_generated_entities = set()
+documentation_generated_entities = set()
+table_generated_enums = set()
 
 
 def get_entity_yaml(yaml_file, class_name):
-    yaml_file = f"{vars.data_dir}/{yaml_file.removesuffix('.yaml')}.yaml"
-    item = next((item for item in entity_yamls[yaml_file]["objects"] if item["name"] == class_name))
+    item = spec.entity(class_name)
+    assert item.file == yaml_file.removesuffix(".yaml"), f"Entity {class_name} is not defined in {yaml_file}"
+    add_dependency(f"{vars.data_dir}/{item.file}.yaml")
 
     return item
 
@@ -113,32 +201,32 @@ def gen_plantuml_entity(class_name, custom_inheritance=False):
     yaml_file = os.path.splitext(os.path.basename(current_plantuml))[0]
     item = get_entity_yaml(yaml_file, class_name)
 
-    assert "plantuml_entity_generated" not in data, f"Double plantuml_entity call for {class_name}"
-    item["plantuml_entity_generated"] = True
+    assert class_name not in plantuml_generated_entities, f"Double plantuml_entity call for {class_name}"
+    plantuml_generated_entities.add(class_name)
 
     result = gen_plantuml_entity_ref(yaml_file, class_name)
     result += "{\n"
 
-    for field in item.get("fields", []):
+    for field in item.fields:
         if field.get("primary_key", False):
             result += "*"
 
         # If the name doesn't contain "(", it is a field and not a method
         # Enforce the fieldness in this case, because the type might contain `(` and PlantUML would be misinterpreting it
-        if "(" not in field["name"]:
+        if not field.is_function:
             result += "{field} "
 
-        result += field["name"]
+        result += field.name
 
-        if field.get("type", None) is not None:
-            result += f": {field['type']}"
+        if field.type is not None:
+            result += f": {field.type}"
 
         result += "".join(f" ${key}" for key in _project_tag_list if field.get(key, False))
         result += "\n"
 
     result += "}\n"
 
-    if not custom_inheritance and (parent := item.get("inherits", None)):
+    if not custom_inheritance and (parent := item.inherits):
         result += f"{class_name} -u-|> {parent}"
 
     return result
@@ -174,8 +262,8 @@ class_columns = [
 def gen_class_documentation(yaml_file, class_name):
     item = get_entity_yaml(yaml_file, class_name)
 
-    assert "documentation_generated" not in item, f"Double class_documentation call for {class_name}"
-    item["documentation_generated"] = True
+    assert class_name not in documentation_generated_entities, f"Double class_documentation call for {class_name}"
+    documentation_generated_entities.add(class_name)
 
     result = f"# {class_name}\n"
 
@@ -187,7 +275,7 @@ def gen_class_documentation(yaml_file, class_name):
         result += tables.default_transform(item["description"])
         result += "\n\n"
 
-    result += tables.generate_table(item["fields"], class_columns)
+    result += tables.generate_table(item.fields, class_columns)
     result += f"*The documentation was automatically generated from [`{yaml_file}`]({vars.repo}/blob/main/data/{yaml_file})*\n\n"
 
     return result
@@ -203,11 +291,12 @@ enum_columns = [
 
 
 def gen_enum_table(yaml_file, columns=enum_columns):
-    data = enum_yamls[os.path.join(vars.data_dir, yaml_file)]
-    assert "table_generated" not in data
-    data["table_generated"] = True
+    enum = spec.enum(yaml_file)
+    add_dependency(f"{vars.data_dir}/{enum.name}.yaml")
+    assert enum.name not in table_generated_enums, f"Double enum_table call for {yaml_file}"
+    table_generated_enums.add(enum.name)
 
-    result = tables.generate_table(data["items"], columns)
+    result = tables.generate_table(enum.items, columns)
     result += f"*The table was automatically generated from [`{yaml_file}`]({vars.repo}/blob/main/data/{yaml_file})*\n\n"
     return result
 
@@ -220,12 +309,14 @@ def gen_material_tag_table():
     r.write("<table>")
     r.write("<tr><th>ID</th><th>Name</th><th>Display name</th><th>Info</th>")
 
-    tags = enum_yamls[os.path.join(vars.data_dir, "material_tags.yaml")]
-    tags["table_generated"] = True
-    tags = tags["items"]
+    tags = spec.enum("material_tags")
+    add_dependency(f"{vars.data_dir}/material_tags.yaml")
+    table_generated_enums.add(tags.name)
+    tags = tags.items
 
     yaml_file = "material_tag_categories.yaml"
-    categories = enum_yamls[os.path.join(vars.data_dir, yaml_file)]["items"]
+    categories = spec.enum(yaml_file).items
+    add_dependency(f"{vars.data_dir}/{yaml_file}")
     categories_keys = {c["name"] for c in categories}
 
     # Check that all tags have a matching category
@@ -255,7 +346,7 @@ def gen_material_tag_table():
             desc_lines = []
 
             desc = tag.get("description", [])
-            if isinstance(desc, list):
+            if isinstance(desc, tuple):
                 desc_lines += desc
             elif len(desc.strip()) > 0:
                 desc_lines.append(desc)
@@ -300,6 +391,27 @@ env.globals["material_certification_columns"] = [
 ]
 
 # Examples support
+# The outputs of the {% python %} blocks are cached by a hash of the code and the interpreter version.
+# Cache misses are executed in separate processes (in parallel, not affecting the generator state), the rendered pages contain placeholders
+# that are replaced by the outputs once the execution finishes (see write_pages).
+python_examples_cache_dir = f"{vars.build_dir}/python_examples"
+python_examples_executor = concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count())
+
+# Placeholder -> future of the output
+pending_python_examples = {}
+
+
+@traced("python_example", "docs")
+def run_python_example(code, cache_file):
+    process = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=vars.root_dir)
+    assert process.returncode == 0, f"Python example failed:\n{code}\n{process.stderr}"
+
+    os.makedirs(python_examples_cache_dir, exist_ok=True)
+    with open(f"{cache_file}.tmp", "w") as f:
+        f.write(process.stdout)
+    os.replace(f"{cache_file}.tmp", cache_file)
+
+    return process.stdout
 
 
 class PythonCodeExtension(jinja2.ext.Extension):
@@ -314,13 +426,22 @@ class PythonCodeExtension(jinja2.ext.Extension):
         code = caller()
         result = f"> ```python\n> {code.strip().replace('\n', '\n> ')}\n> ```\n"
 
-        out_buf = io.StringIO()
-        old_stdout = sys.stdout
-        sys.stdout = out_buf
-        exec(code, globals().copy())
-        sys.stdout = old_stdout
+        hash = hashlib.sha256(f"{sys.version}\n{code}".encode()).hexdigest()
+        cache_file = f"{python_examples_cache_dir}/{hash}.txt"
+
+        if os.path.isfile(cache_file):
+            with open(cache_file) as f:
+                output = f.read()
+
+            count("python_examples_cache.hits")
+
+        else:
+            output = f"\0python_example:{hash}\0"
+            count("python_examples_cache.misses")
+            if output not in pending_python_examples:
+                pending_python_examples[output] = python_examples_executor.submit(run_python_example, code, cache_file)
 
-        result += f"```\n{out_buf.getvalue()}```"
+        result += f"```\n{output}```"
 
         return result
 
@@ -333,24 +454,187 @@ env.globals["repo"] = vars.repo
 
 # Generate documentation files
 def gen_doc_file(source_file):
-    with open(f"{vars.out_dir}/{source_file}.md", "w") as f:
-        f.write(env.get_template(f"markdown/{source_file}.md").render(jinja_args))
+    # Returns the manifest record of the page
+    global current_page
+    current_page = {"dependencies": set(), "outputs": [f"{source_file}.md"]}
 
+    # The documented sets are per page, build merges them over all the pages (including the ones that were not re-rendered)
+    plantuml_generated_entities.clear()
+    documentation_generated_entities.clear()
+    table_generated_enums.clear()
 
-def generate(files: list[str], project_tag_list: dict[str, ProjectTag]):
-    global _project_tag_list
-    _project_tag_list = project_tag_list
+    try:
+        with span("render_template", "docs", template=f"markdown/{source_file}.md"):
+            pending_pages[source_file] = env.get_template(f"markdown/{source_file}.md").render(jinja_args)
+
+        return {
+            "dependencies": {path: file_hash(f"{vars.root_dir}/{path}") for path in sorted(current_page["dependencies"])},
+            "outputs": current_page["outputs"],
+            "plantuml_entities": sorted(plantuml_generated_entities),
+            "documented_entities": sorted(documentation_generated_entities),
+            "enums": sorted(table_generated_enums),
+        }
+
+    finally:
+        current_page = None
+
+
+# Rendered pages waiting for the python example outputs
+pending_pages = {}
+
+
+@traced("write_pages", "docs")
+def write_pages():
+    try:
+        for source_file, content in pending_pages.items():
+            for placeholder, future in pending_python_examples.items():
+                if placeholder in content:
+                    content = content.replace(placeholder, future.result())
+
+            with open(f"{vars.out_dir}/{source_file}.md", "w") as f:
+                f.write(content)
+
+    finally:
+        pending_pages.clear()
+        pending_python_examples.clear()
+
+
+def page_up_to_date(record):
+    return all(os.path.isfile(f"{vars.out_dir}/{output}") for output in record["outputs"]) and all(file_hash(f"{vars.root_dir}/{path}") == hash for path, hash in record["dependencies"].items())
+
+
+def read_docs_manifest():
+    try:
+        with open(docs_manifest_file) as f:
+            return json.load(f)
+
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def check_documented(pages):
+    documented = {"plantuml_entities": set(), "documented_entities": set(), "enums": set()}
+    calls = {"plantuml_entities": "plantuml_entity", "documented_entities": "class_documentation", "enums": "enum_table"}
+
+    for file, record in pages.items():
+        for key, items in documented.items():
+            duplicates = items & set(record[key])
+            assert not duplicates, f"Double {calls[key]} call for {', '.join(sorted(duplicates))} (in {file})"
+            items |= set(record[key])
+
+    for enum in spec.enums:
+        assert enum in documented["enums"], f"Enum {enum}.yaml does not have any corresponding enum_table call"
+
+    for obj in spec.entities:
+        assert obj in documented["plantuml_entities"], f"Entity {obj} does not have any corresponding plantuml_entity call"
+        assert obj in documented["documented_entities"], f"Entity {obj} does not have any corresponding class_documentation call"
+
+
+@traced("build", "docs")
+def build(files: list[str], force=False):
+    start = time.perf_counter()
+
+    generator_hashes = {os.path.relpath(file, vars.root_dir): file_hash(file) for file in generator_files}
+    manifest = read_docs_manifest()
+
+    pages = dict()
+    if not force and manifest.get("version") == docs_manifest_version and manifest.get("generator") == generator_hashes:
+        pages = manifest["pages"]
 
     # Uses project_tag_list
     env.globals["plantuml_common"] = env.get_template("plantuml/_common.plantuml").render(jinja_args)
 
+    # Leftovers of a failed build (in the watch mode)
+    pending_pages.clear()
+    pending_python_examples.clear()
+
+    rendered = []
     for file in files:
-        gen_doc_file(file)
+        if file in pages and page_up_to_date(pages[file]):
+            continue
+
+        pages[file] = gen_doc_file(file)
+        rendered.append(file)
+
+    count("pages.rendered", len(rendered))
+    count("pages.skipped", len(files) - len(rendered))
+
+    write_pages()
+
+    # Remove outputs of the pages that are not generated anymore
+    for file in set(pages) - set(files):
+        for output in pages.pop(file)["outputs"]:
+            if os.path.isfile(path := f"{vars.out_dir}/{output}"):
+                os.remove(path)
+
+    render_plantuml()
+
+    os.makedirs(vars.build_dir, exist_ok=True)
+    with open(f"{docs_manifest_file}.tmp", "w") as f:
+        json.dump({"version": docs_manifest_version, "generator": generator_hashes, "pages": pages}, f, indent=2)
+    os.replace(f"{docs_manifest_file}.tmp", docs_manifest_file)
+
+    check_documented(pages)
+
+    print(f"Rendered {len(rendered)} of {len(files)} pages ({', '.join(rendered) or 'all up to date'}) in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+def watched_files():
+    return [
+        *glob.glob(f"{vars.data_dir}/*.yaml"),
+        *glob.glob(f"{vars.dir}/markdown/*"),
+        *glob.glob(f"{vars.dir}/plantuml/*"),
+        *generator_files,
+    ]
+
+
+def snapshot():
+    result = dict()
+    for file in watched_files():
+        try:
+            result[file] = os.stat(file).st_mtime_ns
+        except FileNotFoundError:
+            pass
+
+    return result
+
+
+def watch(files: list[str], interval=0.1):
+    # Keeps the environment loaded and rebuilds the affected pages whenever a watched file changes
+    global spec
+    print(f"Watching for changes (polling every {interval * 1000:.0f} ms)")
+
+    last = snapshot()
+    while True:
+        time.sleep(interval)
+
+        current = snapshot()
+        if current == last:
+            continue
+
+        changed = {file for file in current.keys() | last.keys() if current.get(file) != last.get(file)}
+        last = current
+
+        # The generator code cannot be reloaded in place
+        if changed & set(generator_files):
+            print("Generator code changed, restarting")
+            os.execv(sys.executable, [sys.executable, *sys.argv])
+
+        if any(file.startswith(f"{vars.data_dir}/") for file in changed):
+            load_spec.cache_clear()
+            spec = load_spec(vars.data_dir)
+
+        try:
+            build(files)
+        except Exception:
+            traceback.print_exc()
+
+
+def generate(files: list[str], project_tag_list: dict[str, ProjectTag]):
+    global _project_tag_list
+    _project_tag_list = project_tag_list
 
-    for enum, data in enum_yamls.items():
-        assert data.get("table_generated", False), f"Enum {os.path.basename(enum)} does not have any corresponding enum_table call"
+    build(files, force="--force" in sys.argv)
 
-    for data in entity_yamls.values():
-        for obj in data["objects"]:
-            assert obj.get("plantuml_entity_generated", False), f"Entity {obj['name']} does not have any corresponding plantuml_entity call"
-            assert obj.get("documentation_generated", False), f"Entity {obj['name']} does not have any corresponding class_documentation call"
+    if "--watch" in sys.argv:
+        watch(files)
@@ -10,7 +10,7 @@ def default_transform(data: any):
         case bool():
             return "yes" if data else "no"
 
-        case list():
+        case list() | tuple():
             return "<br>".join(str(x) for x in data)
 
         case _:
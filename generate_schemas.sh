@@ -6,7 +6,7 @@ SCRIPT=$(realpath "$0")
 BASE_PATH=$(dirname "$SCRIPT")
 
 cd "$BASE_PATH/schema"
-rm -rf "generated"
-mkdir "generated"
+mkdir -p "generated"
 
-python3 "$BASE_PATH/schema/generate_db_schema.py"
+# Incremental - only changed schemas get rewritten, pass --force to regenerate regardless of the build manifest
+python3 "$BASE_PATH/schema/generate_db_schema.py" "$@"
@@ -1,17 +1,23 @@
+import argparse
+import os
+
 from generate_schema_common import (
     array_schema,
-    entity_schema,
-    entity_yaml,
+    entity,
+    enum_items,
     enum_schema,
-    generate_schema_file,
+    generate_profiles,
     object_ref_schema,
-    read_yaml,
-    register_type_schema,
-    setup,
-    type_schema,
+    recursive_merge,
+    SchemaGenerator,
 )
 
-setup("opt_db_schema", "required_in_opt_db", "in_opt_db")
+# Profile name (output directory) -> (required field, field filters), see SchemaGenerator
+profiles = {
+    "opt_db_schema": ("required_in_opt_db", ("in_opt_db",)),
+    # The SLx workflow database holds the same entities, without the fields marked in_slx_workflow_db: false
+    "slx_workflow_db_schema": ("required_in_opt_db", ("in_opt_db", "in_slx_workflow_db")),
+}
 
 
 def object_ref_or_link_schema(object_schema_file: str):
@@ -24,12 +30,18 @@ def object_ref_or_link_schema(object_schema_file: str):
     }
 
 
-def add_slug_property(schema: dict):
-    schema["properties"]["slug"] = {
-        "type": "string",
-        "description": "Identifier within the material database directory structure. Has to correspond with entity yaml the filename.",
-    }
-    return schema
+def add_slug_property(schema):
+    return recursive_merge(
+        schema,
+        {
+            "properties": {
+                "slug": {
+                    "type": "string",
+                    "description": "Identifier within the material database directory structure. Has to correspond with entity yaml the filename.",
+                }
+            }
+        },
+    )
 
 
 material_class_schema = {
@@ -37,175 +49,192 @@ material_class_schema = {
     "enum": ["FFF", "SLA"],
 }
 
-materials_yaml = read_yaml("materials")
-
-generate_schema_file(
-    "uuid_reference",
-    {
-        "type": "object",
-        "properties": {
-            "uuid": {
-                "type": "string",
-                "format": "uuid",
-                "description": "Reference to the entity",
-            },
-        },
-        "required": ["uuid"],
-        "unevaluatedProperties": False,
-    },
-)
-generate_schema_file(
-    "slug_reference",
-    {
-        "type": "object",
-        "properties": {
-            "slug": {
-                "type": "string",
-                "description": "Location of the entity within the openprinttag-database directory structure",
-            },
-        },
-        "required": ["slug"],
-        "unevaluatedProperties": False,
-    },
-)
-
-register_type_schema("Country", {"type": "string", "minLength": 2, "maxLength": 2})
-register_type_schema("list(Country)", array_schema(type_schema("Country", None)))
-
-register_type_schema("Brand", object_ref_or_link_schema("brand"))
-register_type_schema("Material", object_ref_or_link_schema("material"))
-register_type_schema("MaterialClass", material_class_schema)
-register_type_schema("FFFMaterialType", enum_schema(read_yaml("fff_material_types"), name_item="abbreviation"))
-register_type_schema("MaterialContainer", object_ref_or_link_schema("material_container"))
-register_type_schema(
-    "SLAMaterialContainerConnector",
-    object_ref_or_link_schema("sla_material_container_connector"),
-)
-
-register_type_schema("set(MaterialTag)", array_schema(enum_schema(read_yaml("material_tags"))))
-register_type_schema("MaterialPhotoType", enum_schema(read_yaml("material_photo_types")))
-register_type_schema(
-    "set(MaterialPhoto)",
-    array_schema(entity_schema(entity_yaml(materials_yaml, "MaterialPhoto"))),
-)
-register_type_schema(
-    "set(MaterialCertification)",
-    array_schema(enum_schema(read_yaml("material_certifications"))),
-)
-register_type_schema("MaterialProperties", object_ref_schema("material_properties"))
-register_type_schema("FFFMaterialProperties", object_ref_schema("fff_material_properties"))
-
-register_type_schema("MaterialColor", object_ref_schema("material_color"))
-register_type_schema("set(MaterialColor)", array_schema(type_schema("MaterialColor", None)))
-
-generate_schema_file(
-    "material",
-    add_slug_property(entity_schema(entity_yaml(materials_yaml, "Material"))),
-    {
-        "allOf": [
-            {
-                "if": {"properties": {"class": {"const": "FFF"}}},
-                "then": {
-                    "$ref": "fff_material.schema.json",
-                    "properties": {"properties": {"$ref": "fff_material_properties.schema.json"}},
-                },
-            },
-            {
-                "if": {"properties": {"class": {"const": "SLA"}}},
-                "then": {"properties": {"properties": {"$ref": "sla_material_properties.schema.json"}}},
-            },
-        ],
-    },
-)
-generate_schema_file(
-    "fff_material",
-    entity_schema(entity_yaml(materials_yaml, "FFFMaterial"), include_inherits=False),
-)
-generate_schema_file("material_type", entity_schema(entity_yaml(materials_yaml, "FFFMaterialType")))
-
-generate_schema_file(
-    "fff_material_properties",
-    entity_schema(entity_yaml(materials_yaml, "FFFMaterialProperties"), include_inherits=True),
-)
-generate_schema_file(
-    "sla_material_properties",
-    entity_schema(entity_yaml(materials_yaml, "SLAMaterialProperties"), include_inherits=True),
-)
 
+def class_schemas(generator: SchemaGenerator, entity_name: str, schemas: dict):
+    # Applies the class-specific schemas (material class -> schema) by the class field of the entity.
+    # Profiles that leave the class field out cannot tell the classes apart, the entity has to match at least one of the schemas instead
+    # (if conditions on a missing field are always true, all the schemas would apply at once).
+    field = entity(entity_name).fields_by_name["class"]
+    if not generator.includes_field(field):
+        return {"anyOf": list(schemas.values())}
 
-generate_schema_file("material_properties", entity_schema(entity_yaml(materials_yaml, "MaterialProperties"), include_inherits=False))
-
-brands_yaml = read_yaml("brands")
-
-register_type_schema("BrandLinkPatternType", enum_schema(read_yaml("brand_link_pattern_types")))
-register_type_schema(
-    "set(BrandLinkPattern)",
-    array_schema(entity_schema(entity_yaml(brands_yaml, "BrandLinkPattern"))),
-)
+    return {
+        "allOf": [{"if": {"properties": {"class": {"const": material_class}}}, "then": schema} for material_class, schema in schemas.items()],
+    }
 
-generate_schema_file("brand", add_slug_property(entity_schema(entity_yaml(brands_yaml, "Brand"))))
 
-packaging_yaml = read_yaml("packaging")
+def define_schemas(generator: SchemaGenerator):
+    basename = generator.name.removesuffix("_schema")
 
-generate_schema_file(
-    "material_package",
-    add_slug_property(entity_schema(entity_yaml(packaging_yaml, "MaterialPackage"))),
-    {
-        "oneOf": [
-            {
-                "properties": {"class": {"const": "FFF"}},
-                "$ref": "fff_material_package.schema.json",
+    generator.generate_schema_file(
+        "uuid_reference",
+        {
+            "type": "object",
+            "properties": {
+                "uuid": {
+                    "type": "string",
+                    "format": "uuid",
+                    "description": "Reference to the entity",
+                },
             },
-            {
-                "properties": {"class": {"const": "SLA"}},
-                "$ref": "sla_material_package.schema.json",
+            "required": ["uuid"],
+            "unevaluatedProperties": False,
+        },
+    )
+    generator.generate_schema_file(
+        "slug_reference",
+        {
+            "type": "object",
+            "properties": {
+                "slug": {
+                    "type": "string",
+                    "description": "Location of the entity within the openprinttag-database directory structure",
+                },
             },
-        ],
-    },
-)
-generate_schema_file(
-    "fff_material_package",
-    entity_schema(entity_yaml(packaging_yaml, "FFFMaterialPackage"), include_inherits=False),
-)
-generate_schema_file(
-    "sla_material_package",
-    entity_schema(entity_yaml(packaging_yaml, "SLAMaterialPackage"), include_inherits=False),
-)
-
-register_type_schema("Container", entity_schema(entity_yaml(packaging_yaml, "Container")))
-
-generate_schema_file(
-    "material_container",
-    add_slug_property(entity_schema(entity_yaml(packaging_yaml, "MaterialContainer"), include_inherits=True)),
-    {
-        "properties": {
-            "class": material_class_schema,
+            "required": ["slug"],
+            "unevaluatedProperties": False,
         },
-        "allOf": [
+    )
+
+    generator.register_type_schema("Country", {"type": "string", "minLength": 2, "maxLength": 2})
+    generator.register_type_schema("list(Country)", array_schema(generator.type_schema("Country", None)))
+
+    generator.register_type_schema("Brand", object_ref_or_link_schema("brand"))
+    generator.register_type_schema("Material", object_ref_or_link_schema("material"))
+    generator.register_type_schema("MaterialClass", material_class_schema)
+    generator.register_type_schema("FFFMaterialType", enum_schema(enum_items("fff_material_types"), name_item="abbreviation"))
+    generator.register_type_schema("MaterialContainer", object_ref_or_link_schema("material_container"))
+    generator.register_type_schema(
+        "SLAMaterialContainerConnector",
+        object_ref_or_link_schema("sla_material_container_connector"),
+    )
+
+    generator.register_type_schema("set(MaterialTag)", array_schema(enum_schema(enum_items("material_tags"))))
+    generator.register_type_schema("MaterialPhotoType", enum_schema(enum_items("material_photo_types")))
+    generator.register_type_schema(
+        "set(MaterialPhoto)",
+        array_schema(generator.entity_schema(entity("MaterialPhoto"))),
+    )
+    generator.register_type_schema(
+        "set(MaterialCertification)",
+        array_schema(enum_schema(enum_items("material_certifications"))),
+    )
+    generator.register_type_schema("MaterialProperties", object_ref_schema("material_properties"))
+    generator.register_type_schema("FFFMaterialProperties", object_ref_schema("fff_material_properties"))
+
+    generator.register_type_schema("MaterialColor", object_ref_schema("material_color"))
+    generator.register_type_schema("set(MaterialColor)", array_schema(generator.type_schema("MaterialColor", None)))
+
+    generator.generate_schema_file(
+        "material",
+        add_slug_property(generator.entity_schema(entity("Material"))),
+        class_schemas(
+            generator,
+            "Material",
             {
-                "if": {"properties": {"class": {"const": "FFF"}}},
-                "then": {"$ref": "fff_material_container.schema.json"},
+                "FFF": {
+                    "$ref": "fff_material.schema.json",
+                    "properties": {"properties": {"$ref": "fff_material_properties.schema.json"}},
+                },
+                "SLA": {"properties": {"properties": {"$ref": "sla_material_properties.schema.json"}}},
             },
+        ),
+    )
+    generator.generate_schema_file(
+        "fff_material",
+        generator.entity_schema(entity("FFFMaterial"), include_inherits=False),
+    )
+    generator.generate_schema_file("material_type", generator.entity_schema(entity("FFFMaterialType")))
+
+    generator.generate_schema_file(
+        "fff_material_properties",
+        generator.entity_schema(entity("FFFMaterialProperties"), include_inherits=True),
+    )
+    generator.generate_schema_file(
+        "sla_material_properties",
+        generator.entity_schema(entity("SLAMaterialProperties"), include_inherits=True),
+    )
+
+    generator.generate_schema_file("material_properties", generator.entity_schema(entity("MaterialProperties"), include_inherits=False))
+
+    generator.register_type_schema("BrandLinkPatternType", enum_schema(enum_items("brand_link_pattern_types")))
+    generator.register_type_schema(
+        "set(BrandLinkPattern)",
+        array_schema(generator.entity_schema(entity("BrandLinkPattern"))),
+    )
+
+    generator.generate_schema_file("brand", add_slug_property(generator.entity_schema(entity("Brand"))))
+
+    generator.generate_schema_file(
+        "material_package",
+        add_slug_property(generator.entity_schema(entity("MaterialPackage"))),
+        {
+            "oneOf": [
+                {
+                    "properties": {"class": {"const": "FFF"}},
+                    "$ref": "fff_material_package.schema.json",
+                },
+                {
+                    "properties": {"class": {"const": "SLA"}},
+                    "$ref": "sla_material_package.schema.json",
+                },
+            ],
+        },
+    )
+    generator.generate_schema_file(
+        "fff_material_package",
+        generator.entity_schema(entity("FFFMaterialPackage"), include_inherits=False),
+    )
+    generator.generate_schema_file(
+        "sla_material_package",
+        generator.entity_schema(entity("SLAMaterialPackage"), include_inherits=False),
+    )
+
+    generator.register_type_schema("Container", generator.entity_schema(entity("Container")))
+
+    generator.generate_schema_file(
+        "material_container",
+        add_slug_property(generator.entity_schema(entity("MaterialContainer"), include_inherits=True)),
+        class_schemas(
+            generator,
+            "MaterialContainer",
             {
-                "if": {"properties": {"class": {"const": "SLA"}}},
-                "then": {"$ref": "sla_material_container.schema.json"},
+                "FFF": {"$ref": "fff_material_container.schema.json"},
+                "SLA": {"$ref": "sla_material_container.schema.json"},
             },
-        ],
-    },
-)
-generate_schema_file(
-    "fff_material_container",
-    entity_schema(entity_yaml(packaging_yaml, "FFFMaterialContainer"), include_inherits=False),
-)
-generate_schema_file(
-    "sla_material_container",
-    entity_schema(entity_yaml(packaging_yaml, "SLAMaterialContainer"), include_inherits=False),
-)
-generate_schema_file(
-    "sla_material_container_connector",
-    entity_schema(entity_yaml(packaging_yaml, "SLAMaterialContainerConnector")),
-)
-
-generate_schema_file("material_color", entity_schema(entity_yaml(materials_yaml, "MaterialColor")))
-
-generate_schema_file("country", entity_schema(entity_yaml(brands_yaml, "Country")))
+        ),
+    )
+    generator.generate_schema_file(
+        "fff_material_container",
+        generator.entity_schema(entity("FFFMaterialContainer"), include_inherits=False),
+    )
+    generator.generate_schema_file(
+        "sla_material_container",
+        generator.entity_schema(entity("SLAMaterialContainer"), include_inherits=False),
+    )
+    generator.generate_schema_file(
+        "sla_material_container_connector",
+        generator.entity_schema(entity("SLAMaterialContainerConnector")),
+    )
+
+    generator.generate_schema_file("material_color", generator.entity_schema(entity("MaterialColor")))
+
+    generator.generate_schema_file("country", generator.entity_schema(entity("Country")))
+
+    generator.generate_bundle(basename)
+    generator.generate_validators(basename)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generates the database JSON schemas (and native validators) from the spec")
+    parser.add_argument("--force", action="store_true", help="Regenerate regardless of the build manifest")
+    parser.add_argument("--profile", nargs="*", choices=sorted(profiles), help="Generate only the selected profiles")
+    parser.add_argument("--output", help="Directory the profiles are generated into (default: schema/generated)")
+    args = parser.parse_args()
+
+    selected = {name: profiles[name] for name in args.profile or profiles}
+    generate_profiles(selected, define_schemas, force=args.force, output_dir=os.path.abspath(args.output) if args.output else None)
+
+
+if __name__ == "__main__":
+    main()
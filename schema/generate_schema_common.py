@@ -1,43 +1,51 @@
-import shutil
+import concurrent.futures
+import functools
+import glob
+import hashlib
 import os
-import yaml
-import copy
+import sys
 import json
+import types
 
 dir = os.path.abspath(os.path.dirname(__file__) + "/../")
 data_dir = f"{dir}/data"
+build_dir = f"{dir}/build"
+default_output_dir = f"{dir}/schema/generated"
 
-out_dir = None
-required_field = None
-filter_field = None
+sys.path.insert(0, f"{dir}/tools")
+from spec import freeze, load_spec  # noqa: E402
+from tracing import count, traced  # noqa: E402
 
-schema_base = ""
+# Parsed once, shared (read-only) by all the generators
+spec = load_spec(data_dir)
 
+schema_base = ""
 
-def setup(out_dir_, required_field_, filter_field_):
-    global out_dir, required_field, filter_field
-    out_dir = f"{dir}/schema/generated/{out_dir_}"
-    required_field = required_field_
-    filter_field = filter_field_
+# Schema fragments are immutable (read-only mappings and tuples, see spec.freeze) and shared between the schemas that use them,
+# nothing is copied while the schemas are being built. They are only turned into plain dicts/lists once per generated file (materialize).
 
-    # Re-create output directory
-    shutil.rmtree(out_dir, ignore_errors=True)
-    os.makedirs(out_dir)
+# Concrete types, isinstance with collections.abc.Mapping is considerably slower
+mapping_types = (dict, types.MappingProxyType)
+sequence_types = (list, tuple)
 
+# Field attributes the type schema functions may depend on, type schemas are memoized by the type and the values of these
+constraint_keys = ("opt_db_regex", "max_length", "min_length", "min", "max")
 
-type_schemas = {}
 
+def content_hash(data: bytes):
+    return hashlib.sha256(data).hexdigest()
 
-def register_type_schema(name, schema):
-    type_schemas[name] = schema
 
+def file_hash(path):
+    with open(path, "rb") as f:
+        return content_hash(f.read())
 
-def type_schema(type, field_yaml):
-    result = type_schemas[type]
-    if callable(result):
-        result = result(field_yaml)
 
-    return result
+@functools.cache
+def generator_inputs():
+    # All the data yamls plus the generator code itself
+    files = sorted(glob.glob(f"{data_dir}/*.yaml")) + sorted(glob.glob(f"{dir}/schema/*.py")) + [f"{dir}/tools/spec.py", f"{dir}/tools/yaml_loader.py"]
+    return {os.path.relpath(file, dir): file_hash(file) for file in files}
 
 
 uuid_schema = {"type": "string", "format": "uuid"}
@@ -47,19 +55,18 @@ def object_ref_schema(object_schema_file):
     return {"$ref": f"{object_schema_file}.schema.json"}
 
 
-def read_yaml(yaml_file):
-    yaml_file = f"{data_dir}/{yaml_file}.yaml"
-    return yaml.safe_load(open(os.path.join(data_dir, yaml_file), "r"))
+def entity(class_name):
+    return spec.entity(class_name)
 
 
-def entity_yaml(source_yaml, class_name):
-    return next((item for item in source_yaml["objects"] if item["name"] == class_name))
+def enum_items(enum_file):
+    return spec.enum(enum_file).items
 
 
-def enum_schema(yaml, name_item="name"):
+def enum_schema(items, name_item="name"):
     return {
         "type": "string",
-        "enum": [item[name_item] for item in yaml if not item.get("deprecated", False)],
+        "enum": [item[name_item] for item in items if not item.get("deprecated", False)],
     }
 
 
@@ -70,138 +77,63 @@ def array_schema(entity_schema):
     }
 
 
-def entity_schema(
-    yaml,
-    include_inherits: bool | None = None,
-    fields_whitelist: set[str] | None = None,
-    fields_blacklist: set[str] = set(),
-):
-    result = {
-        "type": "object",
-        "title": yaml["name"],
-        "properties": {},
-        "required": [],
-        "x-recommended": [],
-    }
-
-    if include_inherits is not False:
-        result["unevaluatedProperties"] = False
-
-    def is_field_excluded(field_name):
-        if "(" in field_name:
-            # Exclude "function" fields
-            return True
-
-        if (fields_whitelist is not None) and (field_name not in fields_whitelist):
-            return True
-
-        if field_name in fields_blacklist:
-            return True
-
-        return False
-
-    all_field_names = set()
-    for field in yaml["fields"]:
-        if not field.get(filter_field, True):
-            continue
-
-        field_name = field["name"]
-
-        # Consider excluded fields in all_field_names
-        all_field_names.add(field_name)
-
-        if is_field_excluded(field_name):
-            continue
-
-        data = copy.deepcopy(type_schema(field["type"], field))
-        desc = ""
-
-        if unit := field.get("unit"):
-            data["x-unit"] = unit
-
-        # Do not copy over examples for references, they do not make sense (for example Brand UUID example "Prusament")
-        if (example := field.get("example")) and (data.get("format") != "uuid") and ("$ref" not in data):
-            data["x-example"] = example
-
-        if "description" in field:
-            desc_val = field["description"]
-            if isinstance(desc_val, list):
-                desc_val = "\n".join(desc_val)
+def recursive_merge(a, b):
+    # Structurally shared - the result references the unchanged subtrees of a and b instead of copying them
+    if a is None:
+        return b
 
-            desc += "\n"
-            desc += desc_val
+    elif isinstance(a, mapping_types) and isinstance(b, mapping_types):
+        result = dict(a)
+        for key, value in b.items():
+            result[key] = recursive_merge(result.get(key), value)
 
-        desc = desc.strip()
-        if len(desc):
-            data["description"] = desc
+        return types.MappingProxyType(result)
 
-        result["properties"][field_name] = data
+    elif isinstance(a, sequence_types) and isinstance(b, sequence_types):
+        return tuple(a) + tuple(b)
 
-        match field.get(required_field, False):
-            case True:
-                result["required"].append(field_name)
+    else:
+        return a
 
-            case "recommended":
-                result["x-recommended"].append(field_name)
 
-    if parent := yaml.get("inherits", None):
-        assert include_inherits is not None, f"Entity {yaml['name']} has a parent, please specify whether to include it or not"
-        if include_inherits:
-            result = recursive_merge(result, type_schema(parent, []))
+def materialize(fragment):
+    # Plain (mutable, JSON serializable) copy of a schema fragment
+    if isinstance(fragment, mapping_types):
+        return {key: materialize(value) for key, value in fragment.items()}
 
-    # Also consider field names from parent in all_field_names
-    all_field_names |= result["properties"].keys()
+    elif isinstance(fragment, sequence_types):
+        return [materialize(value) for value in fragment]
 
-    assert len(fields_blacklist - all_field_names) == 0, f"{yaml['name']}: Nonexistent field blacklisted: {fields_blacklist - all_field_names}"
-    assert (fields_whitelist is None) or len(fields_whitelist - all_field_names) == 0, f"{yaml['name']}: Nonexistent field whitelisted: {fields_whitelist - all_field_names}"
+    else:
+        return fragment
 
-    # Filter out inherited fields as well
-    result["properties"] = dict(filter(lambda item: not is_field_excluded(item[0]), result["properties"].items()))
-    result["required"] = list(filter(lambda key: not is_field_excluded(key), result["required"]))
-    result["x-recommended"] = list(filter(lambda key: not is_field_excluded(key), result["x-recommended"]))
 
-    assert yaml.get(filter_field, False), f"{yaml['name']} is not marked {filter_field}"
+def constraint_signature(field_yaml):
+    if not field_yaml:
+        return ()
 
-    return result
+    return tuple((key, field_yaml[key]) for key in constraint_keys if key in field_yaml)
 
 
-def recursive_merge(a, b):
-    if a is None:
-        return b
+def bundle_refs(data, schemas):
+    # Rewrites references to the generated schema files to references into the bundle $defs
+    if isinstance(data, dict):
+        result = {key: bundle_refs(value, schemas) for key, value in data.items()}
 
-    elif isinstance(a, dict) and isinstance(b, dict):
-        result = copy.deepcopy(a)
-        for key, value in b.items():
-            result[key] = recursive_merge(result.get(key), value)
+        ref = result.get("$ref")
+        if isinstance(ref, str):
+            file, _, fragment = ref.partition("#")
+            basename = file.removesuffix(".schema.json")
+            if file.endswith(".schema.json") and basename in schemas:
+                result["$ref"] = f"#/$defs/{basename}{fragment.rstrip('/')}"
 
         return result
 
-    elif isinstance(a, list) and isinstance(b, list):
-        result = copy.deepcopy(a)
-        for value in b:
-            result.append(value)
-
-        return result
+    elif isinstance(data, list):
+        return [bundle_refs(value, schemas) for value in data]
 
     else:
-        return a
-
-
-def generate_schema_file(basename, data, extra_data=None):
-    filename = f"{basename}.schema.json"
-    print(f"Generating {filename}")
-
-    result = {
-        "$id": f"{schema_base}/{basename}",
-        "$schema": "https://json-schema.org/draft/2020-12/schema",
-    }
-
-    result = recursive_merge(result, data)
-    result = recursive_merge(result, extra_data)
-
-    with open(f"{out_dir}/{filename}", "w") as f:
-        json.dump(result, f, indent=2)
-        f.write("\n")  # To satisfy precommit autoformatters
+        return data
 
 
 def string_schema(yaml):
@@ -219,12 +151,6 @@ def string_schema(yaml):
     return result
 
 
-register_type_schema("string", string_schema)
-register_type_schema("set(string)", lambda yaml: array_schema(string_schema(yaml)))
-
-register_type_schema("bytes", string_schema)
-
-
 def number_schema(yaml):
     result = {"type": "number"}
 
@@ -238,21 +164,15 @@ def number_schema(yaml):
 
 
 def uint_schema(yaml):
-    yaml["min"] = 0
-    number_schema(yaml)
-
-
-register_type_schema("number", number_schema)
-register_type_schema("int", number_schema)
-register_type_schema("uint", uint_schema)
+    result = number_schema(yaml)
+    result["minimum"] = 0
+    return result
 
-register_type_schema("UUID", uuid_schema)
 
 color_rgba_schema = {
     "type": "string",
     "pattern": "^#[a-f0-9]{6}([a-f0-9]{2})?$",
 }
-register_type_schema("color_rgba", color_rgba_schema)
 
 color_lab_schema = {
     "type": "array",
@@ -265,14 +185,293 @@ color_lab_schema = {
     "minItems": 3,
     "maxItems": 3,
 }
-register_type_schema("color_lab", color_lab_schema)
-
-register_type_schema("bool", {"type": "boolean"})
 
 timestamp_schema = {
     "type": "number",
     "description": "Unix timestamp (seconds since epoch, UTC)",
 }
-register_type_schema("timestamp", timestamp_schema)
 
-register_type_schema("Signature", string_schema)
+# Schemas of the types that do not depend on the generated profile
+base_type_schemas = {
+    "string": string_schema,
+    "set(string)": lambda yaml: array_schema(string_schema(yaml)),
+    "bytes": string_schema,
+    "number": number_schema,
+    "int": number_schema,
+    "uint": uint_schema,
+    "UUID": uuid_schema,
+    "color_rgba": color_rgba_schema,
+    "color_lab": color_lab_schema,
+    "bool": {"type": "boolean"},
+    "timestamp": timestamp_schema,
+    "Signature": string_schema,
+}
+
+
+class SchemaGenerator:
+    # Generates one schema profile into schema/generated/<name> (or <output_dir>/<name>).
+    # Entities have to be marked with the first of filter_fields, fields are included unless any of filter_fields is false on them.
+    # All the state is kept on the instance, so that multiple profiles can be generated at once (see generate_profiles).
+
+    def __init__(self, name: str, required_field: str, filter_fields: tuple[str, ...], force=False, output_dir=None):
+        self.name = name
+        self.out_dir = f"{output_dir or default_output_dir}/{name}"
+        self.required_field = required_field
+        self.filter_fields = filter_fields
+        self.force = force
+
+        # Build manifest - content hashes of the generator inputs and of the files generated from them
+        # Manifests of other output directories are kept next to the outputs, so that they do not invalidate the default one
+        self.manifest_file = f"{build_dir}/schema/{name}.manifest.json" if output_dir is None else f"{output_dir}/{name}.manifest.json"
+        self.manifest_inputs = {}
+        self.manifest_outputs = {}
+
+        self.type_schemas = {name: schema if callable(schema) else freeze(schema) for name, schema in base_type_schemas.items()}
+        self.type_schema_cache = {}  # (type, constraint signature) -> fragment
+
+        # Basename -> materialized schema
+        self.generated_schemas = {}
+
+    @property
+    def filter_field(self):
+        return self.filter_fields[0]
+
+    def log(self, message):
+        # A single write, so that the lines of the profiles generated in parallel do not interleave
+        print(f"{self.name}: {message}\n", end="")
+
+    def read_manifest(self):
+        try:
+            with open(self.manifest_file, "r") as f:
+                return json.load(f)
+
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def outputs_intact(self, outputs):
+        for filename, hash in outputs.items():
+            path = f"{self.out_dir}/{filename}"
+            if not os.path.isfile(path) or file_hash(path) != hash:
+                return False
+
+        return True
+
+    # Returns False if the generated files are up to date with the inputs and there is nothing to generate
+    @traced("setup", "schema", args=lambda self: {"profile": self.name})
+    def setup(self):
+        self.manifest_inputs = generator_inputs()
+        self.manifest_outputs = {}
+
+        manifest = self.read_manifest()
+        if not self.force and manifest.get("inputs") == self.manifest_inputs and self.outputs_intact(manifest.get("outputs", {})):
+            self.log("up to date")
+            return False
+
+        # Do not re-create the output directory, so that unchanged files keep their mtimes
+        os.makedirs(self.out_dir, exist_ok=True)
+        return True
+
+    @traced("finish", "schema", args=lambda self: {"profile": self.name})
+    def finish(self):
+        # Remove files that are no longer generated (schemas, bundles and native validators)
+        for path in sorted(glob.glob(f"{self.out_dir}/*.schema.json") + glob.glob(f"{self.out_dir}/*_validators.py")):
+            if os.path.basename(path) not in self.manifest_outputs:
+                self.log(f"Removing {os.path.basename(path)}")
+                os.remove(path)
+
+        os.makedirs(os.path.dirname(self.manifest_file), exist_ok=True)
+        with open(f"{self.manifest_file}.tmp", "w") as f:
+            json.dump({"inputs": self.manifest_inputs, "outputs": self.manifest_outputs}, f, indent=2, sort_keys=True)
+
+        os.replace(f"{self.manifest_file}.tmp", self.manifest_file)
+
+    def register_type_schema(self, name, schema):
+        self.type_schemas[name] = schema if callable(schema) else freeze(schema)
+        self.type_schema_cache.clear()
+
+    def type_schema(self, type, field_yaml):
+        result = self.type_schemas[type]
+        if not callable(result):
+            return result
+
+        key = (type, constraint_signature(field_yaml))
+        if (cached := self.type_schema_cache.get(key)) is None:
+            cached = self.type_schema_cache[key] = freeze(result(field_yaml))
+
+        return cached
+
+    def includes_field(self, field):
+        return all(field.get(filter_field, True) for filter_field in self.filter_fields)
+
+    @traced("entity_schema", "schema", args=lambda self, entity, *args, **kwargs: {"profile": self.name, "entity": entity.name})
+    def entity_schema(
+        self,
+        entity,
+        include_inherits: bool | None = None,
+        fields_whitelist: set[str] | None = None,
+        fields_blacklist: set[str] = set(),
+    ):
+        result = {
+            "type": "object",
+            "title": entity.name,
+            "properties": {},
+            "required": [],
+            "x-recommended": [],
+        }
+
+        if include_inherits is not False:
+            result["unevaluatedProperties"] = False
+
+        def is_field_excluded(field_name):
+            if "(" in field_name:
+                # Exclude "function" fields
+                return True
+
+            if (fields_whitelist is not None) and (field_name not in fields_whitelist):
+                return True
+
+            if field_name in fields_blacklist:
+                return True
+
+            return False
+
+        all_field_names = set()
+        for field in entity.fields:
+            if not self.includes_field(field):
+                continue
+
+            field_name = field.name
+
+            # Consider excluded fields in all_field_names
+            all_field_names.add(field_name)
+
+            if is_field_excluded(field_name):
+                continue
+
+            # Only the top level is copied, the rest of the type schema is shared
+            data = dict(self.type_schema(field.type, field))
+            desc = ""
+
+            if unit := field.get("unit"):
+                data["x-unit"] = unit
+
+            # Do not copy over examples for references, they do not make sense (for example Brand UUID example "Prusament")
+            if (example := field.get("example")) and (data.get("format") != "uuid") and ("$ref" not in data):
+                data["x-example"] = example
+
+            if "description" in field:
+                desc += "\n"
+                desc += field.description
+
+            desc = desc.strip()
+            if len(desc):
+                data["description"] = desc
+
+            result["properties"][field_name] = types.MappingProxyType(data)
+
+            match field.get(self.required_field, False):
+                case True:
+                    result["required"].append(field_name)
+
+                case "recommended":
+                    result["x-recommended"].append(field_name)
+
+        if parent := entity.inherits:
+            assert include_inherits is not None, f"Entity {entity.name} has a parent, please specify whether to include it or not"
+            if include_inherits:
+                result = recursive_merge(result, self.type_schema(parent, []))
+
+        # Also consider field names from parent in all_field_names
+        all_field_names |= result["properties"].keys()
+
+        assert len(fields_blacklist - all_field_names) == 0, f"{entity.name}: Nonexistent field blacklisted: {fields_blacklist - all_field_names}"
+        assert (fields_whitelist is None) or len(fields_whitelist - all_field_names) == 0, f"{entity.name}: Nonexistent field whitelisted: {fields_whitelist - all_field_names}"
+
+        # Filter out inherited fields as well
+        result = dict(result)
+        result["properties"] = types.MappingProxyType(dict(filter(lambda item: not is_field_excluded(item[0]), result["properties"].items())))
+        result["required"] = tuple(filter(lambda key: not is_field_excluded(key), result["required"]))
+        result["x-recommended"] = tuple(filter(lambda key: not is_field_excluded(key), result["x-recommended"]))
+
+        assert entity.get(self.filter_field, False), f"{entity.name} is not marked {self.filter_field}"
+
+        return types.MappingProxyType(result)
+
+    @traced("generate_schema_file", "schema", args=lambda self, basename, *args, **kwargs: {"profile": self.name, "basename": basename})
+    def generate_schema_file(self, basename, data, extra_data=None):
+        filename = f"{basename}.schema.json"
+
+        result = {
+            "$id": f"{schema_base}/{basename}",
+            "$schema": "https://json-schema.org/draft/2020-12/schema",
+        }
+
+        result = recursive_merge(result, data)
+        result = materialize(recursive_merge(result, extra_data))
+
+        self.generated_schemas[basename] = result
+
+        content = json.dumps(result, indent=2)
+        content += "\n"  # To satisfy precommit autoformatters
+        self.write_output(filename, content)
+
+    def write_output(self, filename, content: str):
+        data = content.encode("utf-8")
+        hash = content_hash(data)
+        self.manifest_outputs[filename] = hash
+
+        # Only touch the file if the content changed, so that downstream caches stay warm
+        path = f"{self.out_dir}/{filename}"
+        if os.path.isfile(path) and file_hash(path) == hash:
+            self.log(f"Unchanged {filename}")
+            count("schema.unchanged")
+            return
+
+        self.log(f"Generating {filename}")
+        count("schema.generated")
+        with open(path, "wb") as f:
+            f.write(data)
+
+    @traced("generate_bundle", "schema", args=lambda self, basename: {"profile": self.name})
+    def generate_bundle(self, basename):
+        # Single self-contained schema with all the generated schemas inlined under $defs, so that it can be used without any $ref resolution
+        defs = {}
+        for name, schema in sorted(self.generated_schemas.items()):
+            defs[name] = bundle_refs({key: value for key, value in schema.items() if key not in ("$id", "$schema")}, self.generated_schemas)
+
+        result = {
+            "$id": f"{schema_base}/{basename}.bundle",
+            "$schema": "https://json-schema.org/draft/2020-12/schema",
+            "$defs": defs,
+        }
+
+        content = json.dumps(result, indent=2)
+        content += "\n"
+        self.write_output(f"{basename}.bundle.schema.json", content)
+
+    @traced("generate_validators", "schema", args=lambda self, basename: {"profile": self.name})
+    def generate_validators(self, basename):
+        # Native Python validators, equivalent to the generated schemas
+        from native_validators import generate_native_validators
+
+        self.write_output(f"{basename}_validators.py", generate_native_validators(self.generated_schemas))
+
+
+def generate_profiles(profiles: dict, define, force=False, parallel=True, output_dir=None):
+    # Generates the profiles (name -> (required_field, filter_fields)) with define(generator), in threads sharing the parsed spec.
+    # The profiles are generated into <output_dir>/<name>, schema/generated by default.
+    # Returns the names of the profiles that were (re)generated
+    def run(name):
+        generator = SchemaGenerator(name, *profiles[name], force=force, output_dir=output_dir)
+        if not generator.setup():
+            return False
+
+        define(generator)
+        generator.finish()
+        return True
+
+    if not parallel:
+        return [name for name in profiles if run(name)]
+
+    with concurrent.futures.ThreadPoolExecutor(len(profiles)) as executor:
+        return [name for name, generated in zip(profiles, executor.map(run, profiles)) if generated]
@@ -0,0 +1,1313 @@
+# Generated by schema/generate_db_schema.py from the data/*.yaml spec, do not edit.
+# Native equivalents of the generated JSON schemas - validate_<schema>(document) returns a list of errors (empty if the document is valid).
+import re
+import uuid
+
+
+def _is_number(v):
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def _is_integer(v):
+    return (isinstance(v, int) and not isinstance(v, bool)) or (isinstance(v, float) and v.is_integer())
+
+
+def _is_uuid(v):
+    if not isinstance(v, str):
+        return True
+
+    try:
+        uuid.UUID(v)
+    except ValueError:
+        return False
+
+    return all(v[position] == "-" for position in (8, 13, 18, 23))
+
+
+def _path(p):
+    parts = []
+    while p is not None:
+        p, key = p
+        parts.append(f"[{key}]" if isinstance(key, int) else f".{key}")
+
+    return "$" + "".join(reversed(parts))
+
+
+_enum0 = frozenset(['brand', 'material', 'material_package', 'material_package_instance'])
+_enum1 = frozenset(['ABS', 'ASA', 'BVOH', 'CPE', 'EVA', 'HIPS', 'OBC', 'PA11', 'PA12', 'PA6', 'PA612', 'PA66', 'PBT', 'PC', 'PCL', 'PCTG', 'PEBA', 'PEEK', 'PEI', 'PEKK', 'PES', 'PET', 'PETG', 'PHA', 'PLA', 'PMMA', 'POM', 'PP', 'PPA', 'PPE', 'PPS', 'PPSU', 'PS', 'PSU', 'PVA', 'PVB', 'PVC', 'PVDF', 'SBS', 'TPC', 'TPE', 'TPI', 'TPU'])
+_enum2 = frozenset(['FFF', 'SLA'])
+_enum3 = frozenset(['abrasive', 'air_filtering', 'antibacterial', 'bio_based', 'biocompatible', 'blend', 'castable', 'coextruded', 'conductive', 'contains_algae', 'contains_aluminium', 'contains_bamboo', 'contains_boron_carbide', 'contains_brass', 'contains_bronze', 'contains_carbon', 'contains_carbon_fiber', 'contains_carbon_nano_tubes', 'contains_ceramic', 'contains_copper', 'contains_cork', 'contains_glass', 'contains_glass_fiber', 'contains_graphene', 'contains_iron', 'contains_kevlar', 'contains_magnetite', 'contains_metal', 'contains_organic_material', 'contains_pine', 'contains_ptfe', 'contains_silver', 'contains_steel', 'contains_stone', 'contains_tungsten', 'contains_wax', 'contains_wood', 'emi_shielding', 'esd_safe', 'filtration_recommended', 'foaming', 'glitter', 'glow_in_the_dark', 'gradual_color_change', 'high_speed', 'high_temperature', 'home_compostable', 'illuminescent_color_change', 'imitates_marble', 'imitates_metal', 'imitates_stone', 'imitates_wood', 'industrially_compostable', 'ipa_soluble', 'iridescent', 'limited_edition', 'limonene_soluble', 'lithophane', 'low_outgassing', 'matte', 'neon', 'paramagnetic', 'pearlescent', 'radiation_shielding', 'recycled', 'self_extinguishing', 'silk', 'temperature_color_change', 'translucent', 'transparent', 'water_soluble', 'without_pigments'])
+_enum4 = frozenset(['ul_2818', 'ul_2904', 'ul_94_v0'])
+_enum5 = frozenset(['filament_colors_sample', 'package', 'print', 'unspecified'])
+_re6 = re.compile('^#[a-f0-9]{6}([a-f0-9]{2})?$')
+
+
+def _node0(v, p, e):
+    ev = set()
+    if not (isinstance(v, str)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'string'")
+        return ev
+    if not _is_uuid(v):
+        e.append(f"{_path(p)}: {v!r} is not a 'uuid'")
+    return ev
+
+
+def _node1(v, p, e):
+    ev = set()
+    if not (isinstance(v, str)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'string'")
+        return ev
+    return ev
+
+
+def _node3(v, p, e):
+    ev = set()
+    if not (isinstance(v, str)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'string'")
+        return ev
+    if len(v) < 2:
+        e.append(f"{_path(p)}: {v!r} is shorter than 2 characters")
+    if len(v) > 2:
+        e.append(f"{_path(p)}: {v!r} is longer than 2 characters")
+    return ev
+
+
+def _node2(v, p, e):
+    ev = set()
+    if not (isinstance(v, list)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'array'")
+        return ev
+    for i in range(0, len(v)):
+        _node3(v[i], (p, i), e)
+    return ev
+
+
+def _node4(v, p, e):
+    ev = set()
+    if not (isinstance(v, list)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'array'")
+        return ev
+    for i in range(0, len(v)):
+        _node1(v[i], (p, i), e)
+    return ev
+
+
+def _node8(v, p, e):
+    ev = set()
+    ev |= _schema_brand(v, p, e)
+    return ev
+
+
+def _node9(v, p, e):
+    ev = set()
+    ev |= _schema_slug_reference(v, p, e)
+    return ev
+
+
+def _node10(v, p, e):
+    ev = set()
+    ev |= _schema_uuid_reference(v, p, e)
+    return ev
+
+
+def _node7(v, p, e):
+    ev = set()
+    passed = []
+    sub_e = []
+    sub_ev = _node8(v, p, sub_e)
+    if not sub_e:
+        passed.append(sub_ev)
+    sub_e = []
+    sub_ev = _node9(v, p, sub_e)
+    if not sub_e:
+        passed.append(sub_ev)
+    sub_e = []
+    sub_ev = _node10(v, p, sub_e)
+    if not sub_e:
+        passed.append(sub_ev)
+    if len(passed) == 1:
+        ev |= passed[0]
+    elif passed:
+        e.append(f"{_path(p)}: {v!r} is valid under each of multiple oneOf subschemas")
+    else:
+        e.append(f"{_path(p)}: {v!r} is not valid under any of the oneOf subschemas")
+    return ev
+
+
+def _node11(v, p, e):
+    ev = set()
+    if not (isinstance(v, str)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'string'")
+        return ev
+    if not (isinstance(v, str) and v in _enum0):
+        e.append(f"{_path(p)}: {v!r} is not one of ['brand', 'material', 'material_package', 'material_package_instance']")
+    return ev
+
+
+def _node6(v, p, e):
+    ev = set()
+    if not (isinstance(v, dict)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'object'")
+        return ev
+    if 'brand' in v:
+        ev.add('brand')
+        _node7(v['brand'], (p, 'brand'), e)
+    if 'type' in v:
+        ev.add('type')
+        _node11(v['type'], (p, 'type'), e)
+    if 'pattern' in v:
+        ev.add('pattern')
+        _node1(v['pattern'], (p, 'pattern'), e)
+    unevaluated = [key for key in v if key not in ev]
+    if unevaluated:
+        e.append(f"{_path(p)}: Unevaluated properties are not allowed ({', '.join(map(repr, unevaluated))} was unexpected)")
+    ev = set(v)
+    return ev
+
+
+def _node5(v, p, e):
+    ev = set()
+    if not (isinstance(v, list)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'array'")
+        return ev
+    for i in range(0, len(v)):
+        _node6(v[i], (p, i), e)
+    return ev
+
+
+def _schema_brand(v, p, e):
+    ev = set()
+    if not (isinstance(v, dict)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'object'")
+        return ev
+    if 'uuid' not in v:
+        e.append(f"{_path(p)}: 'uuid' is a required property")
+    if 'name' not in v:
+        e.append(f"{_path(p)}: 'name' is a required property")
+    if 'uuid' in v:
+        ev.add('uuid')
+        _node0(v['uuid'], (p, 'uuid'), e)
+    if 'name' in v:
+        ev.add('name')
+        _node1(v['name'], (p, 'name'), e)
+    if 'countries_of_origin' in v:
+        ev.add('countries_of_origin')
+        _node2(v['countries_of_origin'], (p, 'countries_of_origin'), e)
+    if 'keywords' in v:
+        ev.add('keywords')
+        _node4(v['keywords'], (p, 'keywords'), e)
+    if 'material_url_template' in v:
+        ev.add('material_url_template')
+        _node1(v['material_url_template'], (p, 'material_url_template'), e)
+    if 'material_package_url_template' in v:
+        ev.add('material_package_url_template')
+        _node1(v['material_package_url_template'], (p, 'material_package_url_template'), e)
+    if 'material_package_instance_url_template' in v:
+        ev.add('material_package_instance_url_template')
+        _node1(v['material_package_instance_url_template'], (p, 'material_package_instance_url_template'), e)
+    if 'link_patterns' in v:
+        ev.add('link_patterns')
+        _node5(v['link_patterns'], (p, 'link_patterns'), e)
+    if 'slug' in v:
+        ev.add('slug')
+        _node1(v['slug'], (p, 'slug'), e)
+    unevaluated = [key for key in v if key not in ev]
+    if unevaluated:
+        e.append(f"{_path(p)}: Unevaluated properties are not allowed ({', '.join(map(repr, unevaluated))} was unexpected)")
+    ev = set(v)
+    return ev
+
+
+def _schema_country(v, p, e):
+    ev = set()
+    if not (isinstance(v, dict)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'object'")
+        return ev
+    if 'code' in v:
+        ev.add('code')
+        _node1(v['code'], (p, 'code'), e)
+    if 'name' in v:
+        ev.add('name')
+        _node1(v['name'], (p, 'name'), e)
+    if 'flag' in v:
+        ev.add('flag')
+        _node1(v['flag'], (p, 'flag'), e)
+    unevaluated = [key for key in v if key not in ev]
+    if unevaluated:
+        e.append(f"{_path(p)}: Unevaluated properties are not allowed ({', '.join(map(repr, unevaluated))} was unexpected)")
+    ev = set(v)
+    return ev
+
+
+def _node12(v, p, e):
+    ev = set()
+    if not (isinstance(v, str)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'string'")
+        return ev
+    if not (isinstance(v, str) and v in _enum1):
+        e.append(f"{_path(p)}: {v!r} is not one of ['PLA', 'PETG', 'TPU', 'ABS', 'ASA', 'PC', 'PCTG', 'PP', 'PA6', 'PA11', 'PA12', 'PA612', 'PA66', 'CPE', 'TPE', 'HIPS', 'PHA', 'PET', 'PEI', 'PBT', 'PVB', 'PVA', 'PEKK', 'PEEK', 'BVOH', 'TPC', 'PPS', 'PPSU', 'PVC', 'PEBA', 'PVDF', 'PPA', 'PCL', 'PES', 'PMMA', 'POM', 'PPE', 'PS', 'PSU', 'TPI', 'SBS', 'OBC', 'EVA']")
+    return ev
+
+
+def _schema_fff_material(v, p, e):
+    ev = set()
+    if not (isinstance(v, dict)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'object'")
+        return ev
+    if 'type' in v:
+        ev.add('type')
+        _node12(v['type'], (p, 'type'), e)
+    return ev
+
+
+def _node13(v, p, e):
+    ev = set()
+    if not (_is_number(v)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'number'")
+        return ev
+    return ev
+
+
+def _schema_fff_material_container(v, p, e):
+    ev = set()
+    if not (isinstance(v, dict)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'object'")
+        return ev
+    if 'hole_diameter' in v:
+        ev.add('hole_diameter')
+        _node13(v['hole_diameter'], (p, 'hole_diameter'), e)
+    if 'inner_diameter' in v:
+        ev.add('inner_diameter')
+        _node13(v['inner_diameter'], (p, 'inner_diameter'), e)
+    if 'outer_diameter' in v:
+        ev.add('outer_diameter')
+        _node13(v['outer_diameter'], (p, 'outer_diameter'), e)
+    if 'width' in v:
+        ev.add('width')
+        _node13(v['width'], (p, 'width'), e)
+    return ev
+
+
+def _schema_fff_material_package(v, p, e):
+    ev = set()
+    if not (isinstance(v, dict)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'object'")
+        return ev
+    if 'filament_diameter' not in v:
+        e.append(f"{_path(p)}: 'filament_diameter' is a required property")
+    if 'filament_diameter' in v:
+        ev.add('filament_diameter')
+        _node13(v['filament_diameter'], (p, 'filament_diameter'), e)
+    if 'filament_diameter_tolerance' in v:
+        ev.add('filament_diameter_tolerance')
+        _node13(v['filament_diameter_tolerance'], (p, 'filament_diameter_tolerance'), e)
+    if 'nominal_full_length' in v:
+        ev.add('nominal_full_length')
+        _node13(v['nominal_full_length'], (p, 'nominal_full_length'), e)
+    return ev
+
+
+def _node14(v, p, e):
+    ev = set()
+    if not (_is_number(v)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'number'")
+        return ev
+    if v < -273:
+        e.append(f"{_path(p)}: {v!r} is less than the minimum of -273")
+    if v > 500:
+        e.append(f"{_path(p)}: {v!r} is greater than the maximum of 500")
+    return ev
+
+
+def _node15(v, p, e):
+    ev = set()
+    if not (_is_number(v)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'number'")
+        return ev
+    if v < 0:
+        e.append(f"{_path(p)}: {v!r} is less than the minimum of 0")
+    if v > 500000:
+        e.append(f"{_path(p)}: {v!r} is greater than the maximum of 500000")
+    return ev
+
+
+def _node16(v, p, e):
+    ev = set()
+    if not (_is_number(v)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'number'")
+        return ev
+    if v < 200:
+        e.append(f"{_path(p)}: {v!r} is less than the minimum of 200")
+    if v > 2000:
+        e.append(f"{_path(p)}: {v!r} is greater than the maximum of 2000")
+    return ev
+
+
+def _schema_fff_material_properties(v, p, e):
+    ev = set()
+    ev |= _schema_material_properties(v, p, e)
+    if not (isinstance(v, dict)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'object'")
+        return ev
+    if 'min_print_temperature' in v:
+        ev.add('min_print_temperature')
+        _node14(v['min_print_temperature'], (p, 'min_print_temperature'), e)
+    if 'max_print_temperature' in v:
+        ev.add('max_print_temperature')
+        _node14(v['max_print_temperature'], (p, 'max_print_temperature'), e)
+    if 'preheat_temperature' in v:
+        ev.add('preheat_temperature')
+        _node13(v['preheat_temperature'], (p, 'preheat_temperature'), e)
+    if 'min_bed_temperature' in v:
+        ev.add('min_bed_temperature')
+        _node14(v['min_bed_temperature'], (p, 'min_bed_temperature'), e)
+    if 'max_bed_temperature' in v:
+        ev.add('max_bed_temperature')
+        _node14(v['max_bed_temperature'], (p, 'max_bed_temperature'), e)
+    if 'heatbreak_temperature' in v:
+        ev.add('heatbreak_temperature')
+        _node14(v['heatbreak_temperature'], (p, 'heatbreak_temperature'), e)
+    if 'chamber_temperature' in v:
+        ev.add('chamber_temperature')
+        _node14(v['chamber_temperature'], (p, 'chamber_temperature'), e)
+    if 'min_chamber_temperature' in v:
+        ev.add('min_chamber_temperature')
+        _node14(v['min_chamber_temperature'], (p, 'min_chamber_temperature'), e)
+    if 'max_chamber_temperature' in v:
+        ev.add('max_chamber_temperature')
+        _node14(v['max_chamber_temperature'], (p, 'max_chamber_temperature'), e)
+    if 'drying_temperature' in v:
+        ev.add('drying_temperature')
+        _node14(v['drying_temperature'], (p, 'drying_temperature'), e)
+    if 'drying_time' in v:
+        ev.add('drying_time')
+        _node15(v['drying_time'], (p, 'drying_time'), e)
+    if 'min_nozzle_diameter' in v:
+        ev.add('min_nozzle_diameter')
+        _node16(v['min_nozzle_diameter'], (p, 'min_nozzle_diameter'), e)
+    unevaluated = [key for key in v if key not in ev]
+    if unevaluated:
+        e.append(f"{_path(p)}: Unevaluated properties are not allowed ({', '.join(map(repr, unevaluated))} was unexpected)")
+    ev = set(v)
+    return ev
+
+
+def _node17(v, p, e):
+    ev = set()
+    if not (isinstance(v, str)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'string'")
+        return ev
+    if not (isinstance(v, str) and v in _enum2):
+        e.append(f"{_path(p)}: {v!r} is not one of ['FFF', 'SLA']")
+    return ev
+
+
+def _node18(v, p, e):
+    ev = set()
+    if not (isinstance(v, str)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'string'")
+        return ev
+    if len(v) > 7:
+        e.append(f"{_path(p)}: {v!r} is longer than 7 characters")
+    return ev
+
+
+def _node19(v, p, e):
+    ev = set()
+    ev |= _schema_material_properties(v, p, e)
+    return ev
+
+
+def _node20(v, p, e):
+    ev = set()
+    ev |= _schema_material_color(v, p, e)
+    return ev
+
+
+def _node21(v, p, e):
+    ev = set()
+    if not (isinstance(v, list)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'array'")
+        return ev
+    for i in range(0, len(v)):
+        _node20(v[i], (p, i), e)
+    return ev
+
+
+def _node23(v, p, e):
+    ev = set()
+    if not (isinstance(v, str)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'string'")
+        return ev
+    if not (isinstance(v, str) and v in _enum3):
+        e.append(f"{_path(p)}: {v!r} is not one of ['filtration_recommended', 'biocompatible', 'home_compostable', 'industrially_compostable', 'bio_based', 'antibacterial', 'air_filtering', 'abrasive', 'foaming', 'castable', 'self_extinguishing', 'paramagnetic', 'radiation_shielding', 'high_temperature', 'high_speed', 'esd_safe', 'conductive', 'emi_shielding', 'blend', 'water_soluble', 'ipa_soluble', 'limonene_soluble', 'low_outgassing', 'matte', 'silk', 'translucent', 'transparent', 'without_pigments', 'iridescent', 'pearlescent', 'glitter', 'glow_in_the_dark', 'neon', 'illuminescent_color_change', 'temperature_color_change', 'gradual_color_change', 'coextruded', 'contains_carbon', 'contains_carbon_fiber', 'contains_carbon_nano_tubes', 'contains_graphene', 'contains_glass', 'contains_glass_fiber', 'contains_kevlar', 'contains_ptfe', 'contains_stone', 'contains_magnetite', 'contains_organic_material', 'contains_cork', 'contains_wax', 'contains_wood', 'contains_algae', 'contains_bamboo', 'contains_pine', 'contains_ceramic', 'contains_boron_carbide', 'contains_metal', 'contains_bronze', 'contains_iron', 'contains_steel', 'contains_silver', 'contains_copper', 'contains_aluminium', 'contains_brass', 'contains_tungsten', 'imitates_wood', 'imitates_metal', 'imitates_marble', 'imitates_stone', 'lithophane', 'recycled', 'limited_edition']")
+    return ev
+
+
+def _node22(v, p, e):
+    ev = set()
+    if not (isinstance(v, list)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'array'")
+        return ev
+    for i in range(0, len(v)):
+        _node23(v[i], (p, i), e)
+    return ev
+
+
+def _node24(v, p, e):
+    ev = set()
+    if not (_is_number(v)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'number'")
+        return ev
+    if v < 0:
+        e.append(f"{_path(p)}: {v!r} is less than the minimum of 0")
+    if v > 100:
+        e.append(f"{_path(p)}: {v!r} is greater than the maximum of 100")
+    return ev
+
+
+def _node25(v, p, e):
+    ev = set()
+    if not (_is_number(v)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'number'")
+        return ev
+    if v < 1:
+        e.append(f"{_path(p)}: {v!r} is less than the minimum of 1")
+    if v > 4:
+        e.append(f"{_path(p)}: {v!r} is greater than the maximum of 4")
+    return ev
+
+
+def _node27(v, p, e):
+    ev = set()
+    if not (isinstance(v, str)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'string'")
+        return ev
+    if not (isinstance(v, str) and v in _enum4):
+        e.append(f"{_path(p)}: {v!r} is not one of ['ul_2818', 'ul_94_v0', 'ul_2904']")
+    return ev
+
+
+def _node26(v, p, e):
+    ev = set()
+    if not (isinstance(v, list)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'array'")
+        return ev
+    for i in range(0, len(v)):
+        _node27(v[i], (p, i), e)
+    return ev
+
+
+def _node30(v, p, e):
+    ev = set()
+    if not (isinstance(v, str)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'string'")
+        return ev
+    if not (isinstance(v, str) and v in _enum5):
+        e.append(f"{_path(p)}: {v!r} is not one of ['unspecified', 'print', 'package', 'filament_colors_sample']")
+    return ev
+
+
+def _node29(v, p, e):
+    ev = set()
+    if not (isinstance(v, dict)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'object'")
+        return ev
+    if 'url' not in v:
+        e.append(f"{_path(p)}: 'url' is a required property")
+    if 'type' not in v:
+        e.append(f"{_path(p)}: 'type' is a required property")
+    if 'url' in v:
+        ev.add('url')
+        _node1(v['url'], (p, 'url'), e)
+    if 'type' in v:
+        ev.add('type')
+        _node30(v['type'], (p, 'type'), e)
+    unevaluated = [key for key in v if key not in ev]
+    if unevaluated:
+        e.append(f"{_path(p)}: Unevaluated properties are not allowed ({', '.join(map(repr, unevaluated))} was unexpected)")
+    ev = set(v)
+    return ev
+
+
+def _node28(v, p, e):
+    ev = set()
+    if not (isinstance(v, list)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'array'")
+        return ev
+    for i in range(0, len(v)):
+        _node29(v[i], (p, i), e)
+    return ev
+
+
+def _node33(v, p, e):
+    ev = set()
+    if not (isinstance(v, str) and v == 'FFF'):
+        e.append(f"{_path(p)}: 'FFF' was expected")
+    return ev
+
+
+def _node32(v, p, e):
+    ev = set()
+    if isinstance(v, dict):
+        if 'class' in v:
+            ev.add('class')
+            _node33(v['class'], (p, 'class'), e)
+    return ev
+
+
+def _node35(v, p, e):
+    ev = set()
+    ev |= _schema_fff_material_properties(v, p, e)
+    return ev
+
+
+def _node34(v, p, e):
+    ev = set()
+    ev |= _schema_fff_material(v, p, e)
+    if isinstance(v, dict):
+        if 'properties' in v:
+            ev.add('properties')
+            _node35(v['properties'], (p, 'properties'), e)
+    return ev
+
+
+def _node31(v, p, e):
+    ev = set()
+    sub_e = []
+    sub_ev = _node32(v, p, sub_e)
+    if not sub_e:
+        ev |= sub_ev
+        ev |= _node34(v, p, e)
+    return ev
+
+
+def _node38(v, p, e):
+    ev = set()
+    if not (isinstance(v, str) and v == 'SLA'):
+        e.append(f"{_path(p)}: 'SLA' was expected")
+    return ev
+
+
+def _node37(v, p, e):
+    ev = set()
+    if isinstance(v, dict):
+        if 'class' in v:
+            ev.add('class')
+            _node38(v['class'], (p, 'class'), e)
+    return ev
+
+
+def _node40(v, p, e):
+    ev = set()
+    ev |= _schema_sla_material_properties(v, p, e)
+    return ev
+
+
+def _node39(v, p, e):
+    ev = set()
+    if isinstance(v, dict):
+        if 'properties' in v:
+            ev.add('properties')
+            _node40(v['properties'], (p, 'properties'), e)
+    return ev
+
+
+def _node36(v, p, e):
+    ev = set()
+    sub_e = []
+    sub_ev = _node37(v, p, sub_e)
+    if not sub_e:
+        ev |= sub_ev
+        ev |= _node39(v, p, e)
+    return ev
+
+
+def _schema_material(v, p, e):
+    ev = set()
+    if not (isinstance(v, dict)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'object'")
+        return ev
+    if 'uuid' not in v:
+        e.append(f"{_path(p)}: 'uuid' is a required property")
+    if 'brand' not in v:
+        e.append(f"{_path(p)}: 'brand' is a required property")
+    if 'class' not in v:
+        e.append(f"{_path(p)}: 'class' is a required property")
+    if 'name' not in v:
+        e.append(f"{_path(p)}: 'name' is a required property")
+    if 'abbreviation' not in v:
+        e.append(f"{_path(p)}: 'abbreviation' is a required property")
+    if 'uuid' in v:
+        ev.add('uuid')
+        _node0(v['uuid'], (p, 'uuid'), e)
+    if 'brand' in v:
+        ev.add('brand')
+        _node7(v['brand'], (p, 'brand'), e)
+    if 'brand_specific_id' in v:
+        ev.add('brand_specific_id')
+        _node1(v['brand_specific_id'], (p, 'brand_specific_id'), e)
+    if 'class' in v:
+        ev.add('class')
+        _node17(v['class'], (p, 'class'), e)
+    if 'name' in v:
+        ev.add('name')
+        _node1(v['name'], (p, 'name'), e)
+    if 'abbreviation' in v:
+        ev.add('abbreviation')
+        _node18(v['abbreviation'], (p, 'abbreviation'), e)
+    if 'url' in v:
+        ev.add('url')
+        _node1(v['url'], (p, 'url'), e)
+    if 'properties' in v:
+        ev.add('properties')
+        _node19(v['properties'], (p, 'properties'), e)
+    if 'primary_color' in v:
+        ev.add('primary_color')
+        _node20(v['primary_color'], (p, 'primary_color'), e)
+    if 'secondary_colors' in v:
+        ev.add('secondary_colors')
+        _node21(v['secondary_colors'], (p, 'secondary_colors'), e)
+    if 'tags' in v:
+        ev.add('tags')
+        _node22(v['tags'], (p, 'tags'), e)
+    if 'transmission_distance' in v:
+        ev.add('transmission_distance')
+        _node24(v['transmission_distance'], (p, 'transmission_distance'), e)
+    if 'refractive_index' in v:
+        ev.add('refractive_index')
+        _node25(v['refractive_index'], (p, 'refractive_index'), e)
+    if 'certifications' in v:
+        ev.add('certifications')
+        _node26(v['certifications'], (p, 'certifications'), e)
+    if 'photos' in v:
+        ev.add('photos')
+        _node28(v['photos'], (p, 'photos'), e)
+    if 'slug' in v:
+        ev.add('slug')
+        _node1(v['slug'], (p, 'slug'), e)
+    ev |= _node31(v, p, e)
+    ev |= _node36(v, p, e)
+    unevaluated = [key for key in v if key not in ev]
+    if unevaluated:
+        e.append(f"{_path(p)}: Unevaluated properties are not allowed ({', '.join(map(repr, unevaluated))} was unexpected)")
+    ev = set(v)
+    return ev
+
+
+def _node41(v, p, e):
+    ev = set()
+    if not (isinstance(v, str)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'string'")
+        return ev
+    if not _re6.search(v):
+        e.append(f"{_path(p)}: {v!r} does not match '^#[a-f0-9]{{6}}([a-f0-9]{{2}})?$'")
+    return ev
+
+
+def _node43(v, p, e):
+    ev = set()
+    if not (_is_number(v)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'number'")
+        return ev
+    if v < -150:
+        e.append(f"{_path(p)}: {v!r} is less than the minimum of -150")
+    if v > 150:
+        e.append(f"{_path(p)}: {v!r} is greater than the maximum of 150")
+    return ev
+
+
+def _node42(v, p, e):
+    ev = set()
+    if not (isinstance(v, list)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'array'")
+        return ev
+    if len(v) < 3:
+        e.append(f"{_path(p)}: {v!r} should have at least 3 items")
+    if len(v) > 3:
+        e.append(f"{_path(p)}: {v!r} should have at most 3 items")
+    if len(v) > 0:
+        _node24(v[0], (p, 0), e)
+    if len(v) > 1:
+        _node43(v[1], (p, 1), e)
+    if len(v) > 2:
+        _node43(v[2], (p, 2), e)
+    if len(v) > 3:
+        e.append(f"{_path(p)}: Expected at most 3 items but found {len(v) - 3} extra")
+    return ev
+
+
+def _schema_material_color(v, p, e):
+    ev = set()
+    if not (isinstance(v, dict)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'object'")
+        return ev
+    if 'color_rgba' not in v:
+        e.append(f"{_path(p)}: 'color_rgba' is a required property")
+    if 'color_rgba' in v:
+        ev.add('color_rgba')
+        _node41(v['color_rgba'], (p, 'color_rgba'), e)
+    if 'color_lab' in v:
+        ev.add('color_lab')
+        _node42(v['color_lab'], (p, 'color_lab'), e)
+    if 'color_ral' in v:
+        ev.add('color_ral')
+        _node1(v['color_ral'], (p, 'color_ral'), e)
+    unevaluated = [key for key in v if key not in ev]
+    if unevaluated:
+        e.append(f"{_path(p)}: Unevaluated properties are not allowed ({', '.join(map(repr, unevaluated))} was unexpected)")
+    ev = set(v)
+    return ev
+
+
+def _node45(v, p, e):
+    ev = set()
+    ev |= _schema_fff_material_container(v, p, e)
+    return ev
+
+
+def _node44(v, p, e):
+    ev = set()
+    sub_e = []
+    sub_ev = _node32(v, p, sub_e)
+    if not sub_e:
+        ev |= sub_ev
+        ev |= _node45(v, p, e)
+    return ev
+
+
+def _node47(v, p, e):
+    ev = set()
+    ev |= _schema_sla_material_container(v, p, e)
+    return ev
+
+
+def _node46(v, p, e):
+    ev = set()
+    sub_e = []
+    sub_ev = _node37(v, p, sub_e)
+    if not sub_e:
+        ev |= sub_ev
+        ev |= _node47(v, p, e)
+    return ev
+
+
+def _schema_material_container(v, p, e):
+    ev = set()
+    if not (isinstance(v, dict)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'object'")
+        return ev
+    if 'class' not in v:
+        e.append(f"{_path(p)}: 'class' is a required property")
+    if 'uuid' not in v:
+        e.append(f"{_path(p)}: 'uuid' is a required property")
+    if 'name' not in v:
+        e.append(f"{_path(p)}: 'name' is a required property")
+    if 'class' in v:
+        ev.add('class')
+        _node17(v['class'], (p, 'class'), e)
+    if 'uuid' in v:
+        ev.add('uuid')
+        _node0(v['uuid'], (p, 'uuid'), e)
+    if 'brand' in v:
+        ev.add('brand')
+        _node7(v['brand'], (p, 'brand'), e)
+    if 'brand_specific_id' in v:
+        ev.add('brand_specific_id')
+        _node1(v['brand_specific_id'], (p, 'brand_specific_id'), e)
+    if 'name' in v:
+        ev.add('name')
+        _node1(v['name'], (p, 'name'), e)
+    if 'volumetric_capacity' in v:
+        ev.add('volumetric_capacity')
+        _node13(v['volumetric_capacity'], (p, 'volumetric_capacity'), e)
+    if 'empty_weight' in v:
+        ev.add('empty_weight')
+        _node13(v['empty_weight'], (p, 'empty_weight'), e)
+    if 'slug' in v:
+        ev.add('slug')
+        _node1(v['slug'], (p, 'slug'), e)
+    ev |= _node44(v, p, e)
+    ev |= _node46(v, p, e)
+    unevaluated = [key for key in v if key not in ev]
+    if unevaluated:
+        e.append(f"{_path(p)}: Unevaluated properties are not allowed ({', '.join(map(repr, unevaluated))} was unexpected)")
+    ev = set(v)
+    return ev
+
+
+def _node49(v, p, e):
+    ev = set()
+    ev |= _schema_material_container(v, p, e)
+    return ev
+
+
+def _node48(v, p, e):
+    ev = set()
+    passed = []
+    sub_e = []
+    sub_ev = _node49(v, p, sub_e)
+    if not sub_e:
+        passed.append(sub_ev)
+    sub_e = []
+    sub_ev = _node9(v, p, sub_e)
+    if not sub_e:
+        passed.append(sub_ev)
+    sub_e = []
+    sub_ev = _node10(v, p, sub_e)
+    if not sub_e:
+        passed.append(sub_ev)
+    if len(passed) == 1:
+        ev |= passed[0]
+    elif passed:
+        e.append(f"{_path(p)}: {v!r} is valid under each of multiple oneOf subschemas")
+    else:
+        e.append(f"{_path(p)}: {v!r} is not valid under any of the oneOf subschemas")
+    return ev
+
+
+def _node51(v, p, e):
+    ev = set()
+    ev |= _schema_material(v, p, e)
+    return ev
+
+
+def _node50(v, p, e):
+    ev = set()
+    passed = []
+    sub_e = []
+    sub_ev = _node51(v, p, sub_e)
+    if not sub_e:
+        passed.append(sub_ev)
+    sub_e = []
+    sub_ev = _node9(v, p, sub_e)
+    if not sub_e:
+        passed.append(sub_ev)
+    sub_e = []
+    sub_ev = _node10(v, p, sub_e)
+    if not sub_e:
+        passed.append(sub_ev)
+    if len(passed) == 1:
+        ev |= passed[0]
+    elif passed:
+        e.append(f"{_path(p)}: {v!r} is valid under each of multiple oneOf subschemas")
+    else:
+        e.append(f"{_path(p)}: {v!r} is not valid under any of the oneOf subschemas")
+    return ev
+
+
+def _node52(v, p, e):
+    ev = set()
+    ev |= _schema_fff_material_package(v, p, e)
+    if isinstance(v, dict):
+        if 'class' in v:
+            ev.add('class')
+            _node33(v['class'], (p, 'class'), e)
+    return ev
+
+
+def _node53(v, p, e):
+    ev = set()
+    ev |= _schema_sla_material_package(v, p, e)
+    if isinstance(v, dict):
+        if 'class' in v:
+            ev.add('class')
+            _node38(v['class'], (p, 'class'), e)
+    return ev
+
+
+def _schema_material_package(v, p, e):
+    ev = set()
+    if not (isinstance(v, dict)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'object'")
+        return ev
+    if 'material' not in v:
+        e.append(f"{_path(p)}: 'material' is a required property")
+    if 'nominal_netto_full_weight' not in v:
+        e.append(f"{_path(p)}: 'nominal_netto_full_weight' is a required property")
+    if 'uuid' in v:
+        ev.add('uuid')
+        _node0(v['uuid'], (p, 'uuid'), e)
+    if 'class' in v:
+        ev.add('class')
+        _node17(v['class'], (p, 'class'), e)
+    if 'brand_specific_id' in v:
+        ev.add('brand_specific_id')
+        _node1(v['brand_specific_id'], (p, 'brand_specific_id'), e)
+    if 'gtin' in v:
+        ev.add('gtin')
+        _node13(v['gtin'], (p, 'gtin'), e)
+    if 'container' in v:
+        ev.add('container')
+        _node48(v['container'], (p, 'container'), e)
+    if 'material' in v:
+        ev.add('material')
+        _node50(v['material'], (p, 'material'), e)
+    if 'url' in v:
+        ev.add('url')
+        _node1(v['url'], (p, 'url'), e)
+    if 'nominal_netto_full_weight' in v:
+        ev.add('nominal_netto_full_weight')
+        _node13(v['nominal_netto_full_weight'], (p, 'nominal_netto_full_weight'), e)
+    if 'slug' in v:
+        ev.add('slug')
+        _node1(v['slug'], (p, 'slug'), e)
+    passed = []
+    sub_e = []
+    sub_ev = _node52(v, p, sub_e)
+    if not sub_e:
+        passed.append(sub_ev)
+    sub_e = []
+    sub_ev = _node53(v, p, sub_e)
+    if not sub_e:
+        passed.append(sub_ev)
+    if len(passed) == 1:
+        ev |= passed[0]
+    elif passed:
+        e.append(f"{_path(p)}: {v!r} is valid under each of multiple oneOf subschemas")
+    else:
+        e.append(f"{_path(p)}: {v!r} is not valid under any of the oneOf subschemas")
+    unevaluated = [key for key in v if key not in ev]
+    if unevaluated:
+        e.append(f"{_path(p)}: Unevaluated properties are not allowed ({', '.join(map(repr, unevaluated))} was unexpected)")
+    ev = set(v)
+    return ev
+
+
+def _node54(v, p, e):
+    ev = set()
+    if not (_is_number(v)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'number'")
+        return ev
+    if v < 0.01:
+        e.append(f"{_path(p)}: {v!r} is less than the minimum of 0.01")
+    if v > 100:
+        e.append(f"{_path(p)}: {v!r} is greater than the maximum of 100")
+    return ev
+
+
+def _schema_material_properties(v, p, e):
+    ev = set()
+    if not (isinstance(v, dict)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'object'")
+        return ev
+    if 'density' in v:
+        ev.add('density')
+        _node54(v['density'], (p, 'density'), e)
+    if 'hardness_shore_a' in v:
+        ev.add('hardness_shore_a')
+        _node13(v['hardness_shore_a'], (p, 'hardness_shore_a'), e)
+    if 'hardness_shore_d' in v:
+        ev.add('hardness_shore_d')
+        _node13(v['hardness_shore_d'], (p, 'hardness_shore_d'), e)
+    return ev
+
+
+def _schema_material_type(v, p, e):
+    ev = set()
+    if not (isinstance(v, dict)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'object'")
+        return ev
+    if 'abbreviation' not in v:
+        e.append(f"{_path(p)}: 'abbreviation' is a required property")
+    if 'name' not in v:
+        e.append(f"{_path(p)}: 'name' is a required property")
+    if 'abbreviation' in v:
+        ev.add('abbreviation')
+        _node18(v['abbreviation'], (p, 'abbreviation'), e)
+    if 'id' in v:
+        ev.add('id')
+        _node13(v['id'], (p, 'id'), e)
+    if 'name' in v:
+        ev.add('name')
+        _node1(v['name'], (p, 'name'), e)
+    if 'default_properties' in v:
+        ev.add('default_properties')
+        _node35(v['default_properties'], (p, 'default_properties'), e)
+    unevaluated = [key for key in v if key not in ev]
+    if unevaluated:
+        e.append(f"{_path(p)}: Unevaluated properties are not allowed ({', '.join(map(repr, unevaluated))} was unexpected)")
+    ev = set(v)
+    return ev
+
+
+def _node56(v, p, e):
+    ev = set()
+    ev |= _schema_sla_material_container_connector(v, p, e)
+    return ev
+
+
+def _node55(v, p, e):
+    ev = set()
+    passed = []
+    sub_e = []
+    sub_ev = _node56(v, p, sub_e)
+    if not sub_e:
+        passed.append(sub_ev)
+    sub_e = []
+    sub_ev = _node9(v, p, sub_e)
+    if not sub_e:
+        passed.append(sub_ev)
+    sub_e = []
+    sub_ev = _node10(v, p, sub_e)
+    if not sub_e:
+        passed.append(sub_ev)
+    if len(passed) == 1:
+        ev |= passed[0]
+    elif passed:
+        e.append(f"{_path(p)}: {v!r} is valid under each of multiple oneOf subschemas")
+    else:
+        e.append(f"{_path(p)}: {v!r} is not valid under any of the oneOf subschemas")
+    return ev
+
+
+def _schema_sla_material_container(v, p, e):
+    ev = set()
+    if not (isinstance(v, dict)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'object'")
+        return ev
+    if 'width' in v:
+        ev.add('width')
+        _node13(v['width'], (p, 'width'), e)
+    if 'length' in v:
+        ev.add('length')
+        _node13(v['length'], (p, 'length'), e)
+    if 'height' in v:
+        ev.add('height')
+        _node13(v['height'], (p, 'height'), e)
+    if 'connector' in v:
+        ev.add('connector')
+        _node55(v['connector'], (p, 'connector'), e)
+    return ev
+
+
+def _schema_sla_material_container_connector(v, p, e):
+    ev = set()
+    if not (isinstance(v, dict)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'object'")
+        return ev
+    if 'uuid' not in v:
+        e.append(f"{_path(p)}: 'uuid' is a required property")
+    if 'name' not in v:
+        e.append(f"{_path(p)}: 'name' is a required property")
+    if 'uuid' in v:
+        ev.add('uuid')
+        _node0(v['uuid'], (p, 'uuid'), e)
+    if 'name' in v:
+        ev.add('name')
+        _node1(v['name'], (p, 'name'), e)
+    unevaluated = [key for key in v if key not in ev]
+    if unevaluated:
+        e.append(f"{_path(p)}: Unevaluated properties are not allowed ({', '.join(map(repr, unevaluated))} was unexpected)")
+    ev = set(v)
+    return ev
+
+
+def _schema_sla_material_package(v, p, e):
+    ev = set()
+    if not (isinstance(v, dict)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'object'")
+        return ev
+    return ev
+
+
+def _node57(v, p, e):
+    ev = set()
+    if not (_is_number(v)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'number'")
+        return ev
+    if v < 0:
+        e.append(f"{_path(p)}: {v!r} is less than the minimum of 0")
+    return ev
+
+
+def _schema_sla_material_properties(v, p, e):
+    ev = set()
+    ev |= _schema_material_properties(v, p, e)
+    if not (isinstance(v, dict)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'object'")
+        return ev
+    if 'cure_wavelength' in v:
+        ev.add('cure_wavelength')
+        _node13(v['cure_wavelength'], (p, 'cure_wavelength'), e)
+    if 'viscosity_18c' in v:
+        ev.add('viscosity_18c')
+        _node57(v['viscosity_18c'], (p, 'viscosity_18c'), e)
+    if 'viscosity_25c' in v:
+        ev.add('viscosity_25c')
+        _node57(v['viscosity_25c'], (p, 'viscosity_25c'), e)
+    if 'viscosity_40c' in v:
+        ev.add('viscosity_40c')
+        _node57(v['viscosity_40c'], (p, 'viscosity_40c'), e)
+    if 'viscosity_60c' in v:
+        ev.add('viscosity_60c')
+        _node57(v['viscosity_60c'], (p, 'viscosity_60c'), e)
+    unevaluated = [key for key in v if key not in ev]
+    if unevaluated:
+        e.append(f"{_path(p)}: Unevaluated properties are not allowed ({', '.join(map(repr, unevaluated))} was unexpected)")
+    ev = set(v)
+    return ev
+
+
+def _schema_slug_reference(v, p, e):
+    ev = set()
+    if not (isinstance(v, dict)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'object'")
+        return ev
+    if 'slug' not in v:
+        e.append(f"{_path(p)}: 'slug' is a required property")
+    if 'slug' in v:
+        ev.add('slug')
+        _node1(v['slug'], (p, 'slug'), e)
+    unevaluated = [key for key in v if key not in ev]
+    if unevaluated:
+        e.append(f"{_path(p)}: Unevaluated properties are not allowed ({', '.join(map(repr, unevaluated))} was unexpected)")
+    ev = set(v)
+    return ev
+
+
+def _schema_uuid_reference(v, p, e):
+    ev = set()
+    if not (isinstance(v, dict)):
+        e.append(f"{_path(p)}: {v!r} is not of type 'object'")
+        return ev
+    if 'uuid' not in v:
+        e.append(f"{_path(p)}: 'uuid' is a required property")
+    if 'uuid' in v:
+        ev.add('uuid')
+        _node0(v['uuid'], (p, 'uuid'), e)
+    unevaluated = [key for key in v if key not in ev]
+    if unevaluated:
+        e.append(f"{_path(p)}: Unevaluated properties are not allowed ({', '.join(map(repr, unevaluated))} was unexpected)")
+    ev = set(v)
+    return ev
+
+
+def validate_brand(document):
+    e = []
+    _schema_brand(document, None, e)
+    return e
+
+
+def validate_country(document):
+    e = []
+    _schema_country(document, None, e)
+    return e
+
+
+def validate_fff_material(document):
+    e = []
+    _schema_fff_material(document, None, e)
+    return e
+
+
+def validate_fff_material_container(document):
+    e = []
+    _schema_fff_material_container(document, None, e)
+    return e
+
+
+def validate_fff_material_package(document):
+    e = []
+    _schema_fff_material_package(document, None, e)
+    return e
+
+
+def validate_fff_material_properties(document):
+    e = []
+    _schema_fff_material_properties(document, None, e)
+    return e
+
+
+def validate_material(document):
+    e = []
+    _schema_material(document, None, e)
+    return e
+
+
+def validate_material_color(document):
+    e = []
+    _schema_material_color(document, None, e)
+    return e
+
+
+def validate_material_container(document):
+    e = []
+    _schema_material_container(document, None, e)
+    return e
+
+
+def validate_material_package(document):
+    e = []
+    _schema_material_package(document, None, e)
+    return e
+
+
+def validate_material_properties(document):
+    e = []
+    _schema_material_properties(document, None, e)
+    return e
+
+
+def validate_material_type(document):
+    e = []
+    _schema_material_type(document, None, e)
+    return e
+
+
+def validate_sla_material_container(document):
+    e = []
+    _schema_sla_material_container(document, None, e)
+    return e
+
+
+def validate_sla_material_container_connector(document):
+    e = []
+    _schema_sla_material_container_connector(document, None, e)
+    return e
+
+
+def validate_sla_material_package(document):
+    e = []
+    _schema_sla_material_package(document, None, e)
+    return e
+
+
+def validate_sla_material_properties(document):
+    e = []
+    _schema_sla_material_properties(document, None, e)
+    return e
+
+
+def validate_slug_reference(document):
+    e = []
+    _schema_slug_reference(document, None, e)
+    return e
+
+
+def validate_uuid_reference(document):
+    e = []
+    _schema_uuid_reference(document, None, e)
+    return e
+
+
+validators = {
+    'brand': validate_brand,
+    'country': validate_country,
+    'fff_material': validate_fff_material,
+    'fff_material_container': validate_fff_material_container,
+    'fff_material_package': validate_fff_material_package,
+    'fff_material_properties': validate_fff_material_properties,
+    'material': validate_material,
+    'material_color': validate_material_color,
+    'material_container': validate_material_container,
+    'material_package': validate_material_package,
+    'material_properties': validate_material_properties,
+    'material_type': validate_material_type,
+    'sla_material_container': validate_sla_material_container,
+    'sla_material_container_connector': validate_sla_material_container_connector,
+    'sla_material_package': validate_sla_material_package,
+    'sla_material_properties': validate_sla_material_properties,
+    'slug_reference': validate_slug_reference,
+    'uuid_reference': validate_uuid_reference,
+}
@@ -0,0 +1,332 @@
+import json
+
+# Compiles the generated JSON schemas into plain Python validator functions.
+# Only the subset of JSON Schema the generator emits is supported, anything else fails the generation.
+
+annotation_keywords = {"$id", "$schema", "title", "description"}
+
+type_checks = {
+    "string": "isinstance(v, str)",
+    "number": "_is_number(v)",
+    "integer": "_is_integer(v)",
+    "boolean": "isinstance(v, bool)",
+    "array": "isinstance(v, list)",
+    "object": "isinstance(v, dict)",
+}
+
+header = """# Generated by schema/generate_db_schema.py from the data/*.yaml spec, do not edit.
+# Native equivalents of the generated JSON schemas - validate_<schema>(document) returns a list of errors (empty if the document is valid).
+import re
+import uuid
+
+
+def _is_number(v):
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def _is_integer(v):
+    return (isinstance(v, int) and not isinstance(v, bool)) or (isinstance(v, float) and v.is_integer())
+
+
+def _is_uuid(v):
+    if not isinstance(v, str):
+        return True
+
+    try:
+        uuid.UUID(v)
+    except ValueError:
+        return False
+
+    return all(v[position] == "-" for position in (8, 13, 18, 23))
+
+
+def _path(p):
+    parts = []
+    while p is not None:
+        p, key = p
+        parts.append(f"[{key}]" if isinstance(key, int) else f".{key}")
+
+    return "$" + "".join(reversed(parts))
+"""
+
+
+def literal(text):
+    # Escapes text for use in the generated f-strings
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def strip_annotations(schema):
+    if isinstance(schema, dict):
+        return {key: strip_annotations(value) for key, value in schema.items() if key not in annotation_keywords and not key.startswith("x-")}
+
+    elif isinstance(schema, list):
+        return [strip_annotations(value) for value in schema]
+
+    else:
+        return schema
+
+
+class Compiler:
+    def __init__(self, schemas: dict[str, dict]):
+        self.schemas = schemas
+        self.constants = []
+        self.functions = []
+        self.nodes = {}
+        self.constant_names = {}
+
+    def constant(self, prefix, expr):
+        if expr not in self.constant_names:
+            name = f"_{prefix}{len(self.constant_names)}"
+            self.constant_names[expr] = name
+            self.constants.append(f"{name} = {expr}")
+
+        return self.constant_names[expr]
+
+    def ref(self, ref: str):
+        file, _, fragment = ref.partition("#")
+        basename = file.removesuffix(".schema.json")
+        assert file.endswith(".schema.json") and basename in self.schemas and fragment in ("", "/"), f"Unsupported $ref {ref}"
+        return f"_schema_{basename}"
+
+    def node(self, schema) -> str:
+        # Returns name of the function validating the schema, schemas differing only in annotations share the function
+        key = json.dumps(strip_annotations(schema), sort_keys=True)
+        if key not in self.nodes:
+            name = f"_node{len(self.nodes)}"
+            self.nodes[key] = name
+            self.emit_function(name, schema)
+
+        return self.nodes[key]
+
+    def emit_function(self, name, schema):
+        # Every function validates value v at path p, appends errors to e and returns the set of evaluated properties (for unevaluatedProperties)
+        body = []
+
+        def line(indent, text):
+            body.append("    " * indent + text)
+
+        def error(indent, message):
+            line(indent, f"e.append(f{json.dumps('{_path(p)}: ' + message)})")
+
+        if schema is True or schema == {}:
+            line(1, "return set()")
+            self.functions.append(f"def {name}(v, p, e):\n" + "\n".join(body))
+            return
+
+        if schema is False:
+            error(1, "False schema does not allow {v!r}")
+            line(1, "return set()")
+            self.functions.append(f"def {name}(v, p, e):\n" + "\n".join(body))
+            return
+
+        unknown = {key for key in schema if key not in annotation_keywords and not key.startswith("x-")} - {
+            "$ref",
+            "type",
+            "enum",
+            "const",
+            "format",
+            "pattern",
+            "minLength",
+            "maxLength",
+            "minimum",
+            "maximum",
+            "required",
+            "properties",
+            "prefixItems",
+            "items",
+            "minItems",
+            "maxItems",
+            "allOf",
+            "anyOf",
+            "oneOf",
+            "if",
+            "then",
+            "else",
+            "unevaluatedProperties",
+        }
+        assert not unknown, f"Unsupported keywords {unknown}"
+
+        line(1, "ev = set()")
+
+        # If the type is checked (and returned on mismatch) already, the type-specific keywords do not need a type guard
+        known_type = schema.get("type") if isinstance(schema.get("type"), str) else None
+
+        def guard(type, check):
+            if known_type == type:
+                return 1
+
+            line(1, f"if {check}:")
+            return 2
+
+        if "$ref" in schema:
+            line(1, f"ev |= {self.ref(schema['$ref'])}(v, p, e)")
+
+        if "type" in schema:
+            types = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+            check = " or ".join(type_checks[t] for t in types)
+            line(1, f"if not ({check}):")
+            error(2, f"{{v!r}} is not of type {', '.join(repr(t) for t in types)}")
+            line(2, "return ev")
+
+        if "enum" in schema:
+            values = schema["enum"]
+            assert all(isinstance(value, str) for value in values), "Only string enums are supported"
+            enum = self.constant("enum", f"frozenset({sorted(values)!r})")
+            line(1, f"if not (isinstance(v, str) and v in {enum}):")
+            error(2, "{v!r} is not one of " + literal(repr(values)))
+
+        if "const" in schema:
+            value = schema["const"]
+            assert isinstance(value, str), "Only string consts are supported"
+            line(1, f"if not (isinstance(v, str) and v == {value!r}):")
+            error(2, literal(repr(value)) + " was expected")
+
+        if "format" in schema:
+            assert schema["format"] == "uuid", f"Unsupported format {schema['format']}"
+            line(1, "if not _is_uuid(v):")
+            error(2, "{v!r} is not a 'uuid'")
+
+        string_checks = []
+        if "minLength" in schema:
+            string_checks.append((f"len(v) < {schema['minLength']}", f"{{v!r}} is shorter than {schema['minLength']} characters"))
+        if "maxLength" in schema:
+            string_checks.append((f"len(v) > {schema['maxLength']}", f"{{v!r}} is longer than {schema['maxLength']} characters"))
+        if "pattern" in schema:
+            pattern = self.constant("re", f"re.compile({schema['pattern']!r})")
+            string_checks.append((f"not {pattern}.search(v)", "{v!r} does not match " + literal(repr(schema["pattern"]))))
+
+        if string_checks:
+            indent = guard("string", "isinstance(v, str)")
+            for check, message in string_checks:
+                line(indent, f"if {check}:")
+                error(indent + 1, message)
+
+        number_checks = []
+        if "minimum" in schema:
+            number_checks.append((f"v < {schema['minimum']!r}", f"{{v!r}} is less than the minimum of {schema['minimum']!r}"))
+        if "maximum" in schema:
+            number_checks.append((f"v > {schema['maximum']!r}", f"{{v!r}} is greater than the maximum of {schema['maximum']!r}"))
+
+        if number_checks:
+            indent = guard("number", "_is_number(v)")
+            for check, message in number_checks:
+                line(indent, f"if {check}:")
+                error(indent + 1, message)
+
+        array_keywords = {"prefixItems", "items", "minItems", "maxItems"} & schema.keys()
+        if array_keywords:
+            i0 = guard("array", "isinstance(v, list)")
+            if "minItems" in schema:
+                line(i0, f"if len(v) < {schema['minItems']}:")
+                error(i0 + 1, f"{{v!r}} should have at least {schema['minItems']} items")
+            if "maxItems" in schema:
+                line(i0, f"if len(v) > {schema['maxItems']}:")
+                error(i0 + 1, f"{{v!r}} should have at most {schema['maxItems']} items")
+
+            prefix_items = schema.get("prefixItems", [])
+            for i, item_schema in enumerate(prefix_items):
+                line(i0, f"if len(v) > {i}:")
+                line(i0 + 1, f"{self.node(item_schema)}(v[{i}], (p, {i}), e)")
+
+            if "items" in schema:
+                items = schema["items"]
+                if items is False:
+                    line(i0, f"if len(v) > {len(prefix_items)}:")
+                    error(i0 + 1, "Expected at most " + str(len(prefix_items)) + " items but found {len(v) - " + str(len(prefix_items)) + "} extra")
+                else:
+                    item_node = self.node(items)
+                    line(i0, f"for i in range({len(prefix_items)}, len(v)):")
+                    line(i0 + 1, f"{item_node}(v[i], (p, i), e)")
+
+        if ("required" in schema) or ("properties" in schema):
+            i0 = guard("object", "isinstance(v, dict)")
+            if i0 > 1 and not schema.get("required") and not schema.get("properties"):
+                line(i0, "pass")
+
+            for key in schema.get("required", []):
+                line(i0, f"if {key!r} not in v:")
+                error(i0 + 1, f"{key!r} is a required property")
+
+            for key, prop_schema in schema.get("properties", {}).items():
+                line(i0, f"if {key!r} in v:")
+                line(i0 + 1, f"ev.add({key!r})")
+                line(i0 + 1, f"{self.node(prop_schema)}(v[{key!r}], (p, {key!r}), e)")
+
+        for sub_schema in schema.get("allOf", []):
+            line(1, f"ev |= {self.node(sub_schema)}(v, p, e)")
+
+        if "anyOf" in schema:
+            # Annotations (evaluated properties) are collected from all the passing subschemas
+            line(1, "passed = False")
+            for sub_schema in schema["anyOf"]:
+                line(1, "sub_e = []")
+                line(1, f"sub_ev = {self.node(sub_schema)}(v, p, sub_e)")
+                line(1, "if not sub_e:")
+                line(2, "passed = True")
+                line(2, "ev |= sub_ev")
+            line(1, "if not passed:")
+            error(2, "{v!r} is not valid under any of the anyOf subschemas")
+
+        if "oneOf" in schema:
+            line(1, "passed = []")
+            for sub_schema in schema["oneOf"]:
+                line(1, "sub_e = []")
+                line(1, f"sub_ev = {self.node(sub_schema)}(v, p, sub_e)")
+                line(1, "if not sub_e:")
+                line(2, "passed.append(sub_ev)")
+            line(1, "if len(passed) == 1:")
+            line(2, "ev |= passed[0]")
+            line(1, "elif passed:")
+            error(2, "{v!r} is valid under each of multiple oneOf subschemas")
+            line(1, "else:")
+            error(2, "{v!r} is not valid under any of the oneOf subschemas")
+
+        if "if" in schema:
+            line(1, "sub_e = []")
+            line(1, f"sub_ev = {self.node(schema['if'])}(v, p, sub_e)")
+            line(1, "if not sub_e:")
+            line(2, "ev |= sub_ev")
+            if "then" in schema:
+                line(2, f"ev |= {self.node(schema['then'])}(v, p, e)")
+            if "else" in schema:
+                line(1, "else:")
+                line(2, f"ev |= {self.node(schema['else'])}(v, p, e)")
+
+        if "unevaluatedProperties" in schema:
+            assert schema["unevaluatedProperties"] is False, "Only unevaluatedProperties: false is supported"
+            i0 = guard("object", "isinstance(v, dict)")
+            line(i0, "unevaluated = [key for key in v if key not in ev]")
+            line(i0, "if unevaluated:")
+            error(i0 + 1, "Unevaluated properties are not allowed ({', '.join(map(repr, unevaluated))} was unexpected)")
+            line(i0, "ev = set(v)")
+
+        line(1, "return ev")
+
+        self.functions.append(f"def {name}(v, p, e):\n" + "\n".join(body))
+
+    def compile(self):
+        for basename, schema in sorted(self.schemas.items()):
+            self.emit_function(f"_schema_{basename}", schema)
+
+        result = header
+        result += "\n\n" + "\n".join(self.constants) + "\n"
+
+        for function in self.functions:
+            result += "\n\n" + function + "\n"
+
+        for basename in sorted(self.schemas):
+            result += f"\n\ndef validate_{basename}(document):\n"
+            result += "    e = []\n"
+            result += f"    _schema_{basename}(document, None, e)\n"
+            result += "    return e\n"
+
+        result += "\n\nvalidators = {\n"
+        for basename in sorted(self.schemas):
+            result += f"    {basename!r}: validate_{basename},\n"
+        result += "}\n"
+
+        return result
+
+
+def generate_native_validators(schemas: dict[str, dict]):
+    return Compiler(schemas).compile()
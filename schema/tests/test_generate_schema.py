@@ -0,0 +1,33 @@
+from pathlib import Path
+import filecmp
+import subprocess
+import sys
+import tempfile
+
+script_dir = Path(__file__).parent
+generator = script_dir / ".." / "generate_db_schema.py"
+generated_dir = script_dir / ".." / "generated"
+
+with tempfile.TemporaryDirectory() as output:
+    subprocess.run([sys.executable, generator, "--output", output], check=True, capture_output=True)
+
+    # The same output as the checked in schemas
+    for profile in generated_dir.iterdir():
+        files = sorted(path.name for path in profile.iterdir() if path.is_file())
+        assert sorted(path.name for path in Path(output, profile.name).iterdir()) == files, profile.name
+        assert filecmp.cmpfiles(profile, Path(output, profile.name), files, shallow=False)[0] == files, profile.name
+
+    # Files that are no longer generated are removed, other files are left alone
+    profile = Path(output, "opt_db_schema")
+    for name in ("removed.schema.json", "removed.bundle.schema.json", "removed_validators.py", "notes.txt"):
+        (profile / name).write_text("\n")
+
+    result = subprocess.run([sys.executable, generator, "--output", output, "--force"], check=True, capture_output=True, text=True)
+    assert sorted(line for line in result.stdout.splitlines() if "Removing" in line) == [
+        "opt_db_schema: Removing removed.bundle.schema.json",
+        "opt_db_schema: Removing removed.schema.json",
+        "opt_db_schema: Removing removed_validators.py",
+    ], result.stdout
+    assert (profile / "notes.txt").exists()
+
+print("OK")
@@ -0,0 +1,144 @@
+# Differential test - the generated native validators have to agree with the JSON schemas on the fixtures and on their mutations
+from pathlib import Path
+import copy
+import importlib.util
+import random
+import sys
+import time
+
+script_dir = Path(__file__).parent
+
+sys.path.insert(0, str(script_dir / ".." / ".." / "tools"))
+import validate_db  # noqa: E402
+from yaml_loader import load_yaml  # noqa: E402
+
+# Values that exercise the type, range, length, enum, format and pattern checks
+sample_values = [
+    None,
+    True,
+    0,
+    -1000,
+    1.5,
+    1e9,
+    "",
+    "x",
+    "x" * 300,
+    "FFF",
+    "SLA",
+    "PLA",
+    "CZ",
+    "#ff0000",
+    "#FF0000",
+    "carbon_fiber",
+    "unspecified",
+    "3fa85f64-5717-4562-b3fc-2c963f66afa6",
+    "3fa85f645717-4562-b3fc-2c963f66afa6-",
+    [],
+    ["x"],
+    [50, 0, 0],
+    [50, 0, 0, 0],
+    [101, 0, 0],
+    {},
+    {"slug": "x"},
+    {"uuid": "3fa85f64-5717-4562-b3fc-2c963f66afa6"},
+    {"uuid": "nope"},
+    {"slug": "x", "uuid": "3fa85f64-5717-4562-b3fc-2c963f66afa6"},
+]
+
+
+def paths(document, prefix=()):
+    yield prefix
+    if isinstance(document, dict):
+        for key, value in document.items():
+            yield from paths(value, prefix + (key,))
+
+    elif isinstance(document, list):
+        for i, value in enumerate(document):
+            yield from paths(value, prefix + (i,))
+
+
+def replaced(document, path, value):
+    if not path:
+        return value
+
+    result = copy.deepcopy(document)
+    target = result
+    for key in path[:-1]:
+        target = target[key]
+
+    if value is KeyError:
+        del target[path[-1]]
+    else:
+        target[path[-1]] = value
+
+    return result
+
+
+def mutations(document, rng):
+    yield document
+
+    for path in paths(document):
+        if path:
+            yield replaced(document, path, KeyError)
+
+        for value in rng.sample(sample_values, 8):
+            yield replaced(document, path, value)
+
+        target = document
+        for key in path:
+            target = target[key]
+
+        if isinstance(target, dict):
+            yield replaced(document, path, {**target, "unknown_property": 1})
+
+        if isinstance(target, (int, float)) and not isinstance(target, bool):
+            for delta in (-1e6, -1, 1, 1e6):
+                yield replaced(document, path, target + delta)
+
+
+# Profile -> basename of the native validators module, the fixtures are in the directory of the same name as the profile
+profiles = {
+    "opt_db_schema": "opt_db",
+    "slx_workflow_db_schema": "slx_workflow_db",
+}
+
+for profile, basename in profiles.items():
+    schema_dir = script_dir / ".." / "generated" / profile
+    tests_dir = script_dir / profile
+
+    spec = importlib.util.spec_from_file_location(f"{basename}_validators", schema_dir / f"{basename}_validators.py")
+    native = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(native)
+
+    validators = validate_db.load_validators(schema_dir, use_bundle=False)
+    assert validators.keys() == native.validators.keys()
+
+    rng = random.Random(1)
+    documents = [load_yaml(f) for f in sorted(tests_dir.glob("*.yaml"))]
+
+    cases = 0
+    mismatches = []
+    native_time = 0
+    jsonschema_time = 0
+
+    for document in documents:
+        for mutated in mutations(document, rng):
+            # Check every document against every schema to also cover the mismatching-kind cases
+            for kind, validator in validators.items():
+                t = time.perf_counter()
+                expected = validator.is_valid(mutated)
+                jsonschema_time += time.perf_counter() - t
+
+                t = time.perf_counter()
+                errors = native.validators[kind](mutated)
+                native_time += time.perf_counter() - t
+
+                cases += 1
+                if expected != (len(errors) == 0):
+                    mismatches.append((kind, mutated, errors))
+
+    for kind, document, errors in mismatches[:20]:
+        print(f"Mismatch for {kind}: {document!r}, native errors: {errors}")
+
+    print(f"{profile}: {cases} cases, {len(mismatches)} mismatches, native validators {jsonschema_time / native_time:.1f}x faster")
+    assert not mismatches
@@ -1,23 +1,18 @@
 from pathlib import Path
-import json
-import referencing
-import jsonschema.validators
-import urllib
-import yaml
+import sys
 
 script_dir = Path(__file__).parent
 schema_dir = script_dir / ".." / "generated" / "opt_db_schema"
 tests_dir = script_dir / "opt_db_schema"
 
+sys.path.insert(0, str(script_dir / ".." / ".." / "tools"))
+import validate_db  # noqa: E402
+from yaml_loader import load_yaml  # noqa: E402
 
-def file_retrieve(uri):
-    print(urllib.parse.urlparse(uri).path)
-    path = schema_dir / urllib.parse.urlparse(uri).path.removeprefix("/")
-    result = json.loads(path.read_text(encoding="utf-8"))
-    return referencing.Resource.from_contents(result)
+validators = validate_db.load_validators(schema_dir, use_bundle=False)
+bundle_validators = validate_db.load_bundle_validators(schema_dir / validate_db.bundle_file)
 
-
-registry = referencing.Registry(retrieve=file_retrieve)
+assert validators.keys() == bundle_validators.keys()
 
 
 for f in tests_dir.glob("*.yaml"):
@@ -25,6 +20,6 @@ for f in tests_dir.glob("*.yaml"):
 
     print(f"Testing {f.name} against {schema_name}")
 
-    schema = registry.get_or_retrieve(schema_name).value.contents
-    validator = jsonschema.validators.validator_for(schema)(schema, registry=registry)
-    validator.validate(yaml.safe_load(f.read_bytes()))
+    document = load_yaml(f)
+    validators[f.stem].validate(document)
+    bundle_validators[f.stem].validate(document)
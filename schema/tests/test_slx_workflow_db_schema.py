@@ -0,0 +1,50 @@
+from pathlib import Path
+import importlib.util
+import sys
+
+script_dir = Path(__file__).parent
+schema_dir = script_dir / ".." / "generated" / "slx_workflow_db_schema"
+tests_dir = script_dir / "slx_workflow_db_schema"
+
+sys.path.insert(0, str(script_dir / ".." / ".." / "tools"))
+import validate_db  # noqa: E402
+from yaml_loader import load_yaml  # noqa: E402
+
+validators = validate_db.load_validators(schema_dir, use_bundle=False)
+bundle_validators = validate_db.load_bundle_validators(schema_dir / "slx_workflow_db.bundle.schema.json")
+
+spec = importlib.util.spec_from_file_location("slx_workflow_db_validators", schema_dir / "slx_workflow_db_validators.py")
+native = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(native)
+
+assert validators.keys() == bundle_validators.keys() == native.validators.keys()
+
+
+def is_valid(kind, document):
+    results = {validators[kind].is_valid(document), bundle_validators[kind].is_valid(document), not native.validators[kind](document)}
+    assert len(results) == 1, (kind, document)
+    return results.pop()
+
+
+# The fixtures are named <schema>[.<variant>].yaml
+for f in sorted(tests_dir.glob("*.yaml")):
+    kind = f.name.split(".")[0]
+    print(f"Testing {f.name} against {kind}.schema.json")
+
+    document = load_yaml(f)
+    validators[kind].validate(document)
+    bundle_validators[kind].validate(document)
+    assert native.validators[kind](document) == [], native.validators[kind](document)
+
+# Fields the profile leaves out are rejected
+fff_material = load_yaml(tests_dir / "material.yaml")
+sla_material = load_yaml(tests_dir / "material.sla.yaml")
+assert not is_valid("material", fff_material | {"class": "FFF"})
+assert not is_valid("material", fff_material | {"type": "PLA"})
+assert not is_valid("material_container", load_yaml(tests_dir / "material_container.yaml") | {"class": "FFF"})
+
+# Without the class, the material properties still have to be either the FFF or the SLA ones
+assert not is_valid("material", fff_material | {"properties": fff_material["properties"] | sla_material["properties"]})
+assert not is_valid("material", sla_material | {"properties": {"cure_wavelength": "405"}})
+
+print("OK")
@@ -0,0 +1,332 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import typing
+
+import yaml
+
+import database
+import opt_uuid
+from export_sqlite import open_snapshot
+from integrity import kind_entities
+from spec import load_spec
+from yaml_loader import Dumper, load_yaml
+
+# Changesets between two versions of the database, so that clients can sync only what changed.
+#
+# Entities are identified by their kind and primary key (the uuid of all the kinds, derived as in uuid.md if not stored).
+# A changeset is a JSON document with an ordered list of changes:
+#   {"op": "add", "kind", "uuid", "path", "document", "hash"}
+#   {"op": "change", "kind", "uuid", "path", "base_hash", "hash", "set": {field: value}, "unset": [field]} (+ "new_path" if the file moved)
+#   {"op": "remove", "kind", "uuid", "path", "base_hash"}
+# Adds and changes go in the reference order (brands first), removes in the reverse order, so that references resolve at every step.
+#
+# The database hash is the sum (mod 2^256) of the hashes of its entities, so it can be updated with the changed entities only:
+# applying a changeset checks the hashes of the touched entities and computes the resulting database hash incrementally,
+# the cost of a sync depends on the number of changes, not on the size of the database.
+
+changeset_version = 1
+
+hash_modulus = 1 << 256
+
+
+class Entry(typing.NamedTuple):
+    # Path relative to the data directory
+    path: str
+
+    document: dict
+
+
+def canonical(document) -> bytes:
+    return json.dumps(document, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def entity_hash(kind: str, key: str, document) -> int:
+    return int.from_bytes(hashlib.sha256(kind.encode() + b"\0" + key.encode() + b"\0" + canonical(document)).digest())
+
+
+def combine(hashes) -> int:
+    return sum(hashes) % hash_modulus
+
+
+def format_hash(value: int) -> str:
+    return f"{value:064x}"
+
+
+def load_directory(root: str):
+    # (kind, uuid) -> Entry of a database checkout
+    data_root = database.data_root(root)
+
+    result = dict()
+    for derivation in opt_uuid.derive_database(root):
+        key = derivation.stored or derivation.derived
+        if key is None:
+            print(f"Skipping {derivation.file.path}: no UUID", file=sys.stderr)
+            continue
+
+        file = derivation.file
+        assert (file.kind, str(key)) not in result, f"Duplicate UUID {key} ({file.path})"
+        result[file.kind, str(key)] = Entry(os.path.relpath(file.path, data_root), derivation.document)
+
+    return result
+
+
+def load_snapshot(path: str):
+    # (kind, uuid) -> Entry of a SQLite snapshot (tools/export_sqlite.py)
+    connection = open_snapshot(path)
+    try:
+        result = dict()
+        for kind in opt_uuid.derivation_order:
+            for row in connection.execute(f'SELECT uuid, path, document FROM "{kind}" WHERE uuid IS NOT NULL'):
+                result[kind, row["uuid"]] = Entry(row["path"], json.loads(row["document"]))
+
+        return result
+
+    finally:
+        connection.close()
+
+
+def load_entities(source: str):
+    if os.path.isdir(source):
+        return load_directory(source)
+
+    try:
+        return load_snapshot(source)
+    except sqlite3.DatabaseError as e:
+        raise ValueError(f"{source} is neither a database checkout nor a snapshot: {e}")
+
+
+def database_hash(entities: dict) -> int:
+    return combine(entity_hash(kind, key, entry.document) for (kind, key), entry in entities.items())
+
+
+def field_order(kind: str, spec=None):
+    # Field name -> position in the spec (fields of the class-specific subclasses included)
+    spec = spec or load_spec()
+    entity_name = kind_entities[kind]
+
+    result = dict()
+    for entity in spec.with_subclasses(entity_name):
+        for field in entity.all_fields:
+            result.setdefault(field.name, len(result))
+
+    return result
+
+
+def patch(kind: str, old: dict, new: dict, order: dict):
+    # Top-level field patch, in the spec field order (fields not in the spec last)
+    key = lambda name: (order.get(name, len(order)), name)  # noqa: E731
+    changed = {name: new[name] for name in sorted(new.keys(), key=key) if name not in old or canonical(old[name]) != canonical(new[name])}
+    removed = [name for name in sorted(old.keys(), key=key) if name not in new]
+    return changed, removed
+
+
+def diff(base: dict, target: dict, spec=None):
+    spec = spec or load_spec()
+    orders = {kind: field_order(kind, spec) for kind in opt_uuid.derivation_order}
+    rank = {kind: i for i, kind in enumerate(opt_uuid.derivation_order)}
+
+    base_hash = database_hash(base)
+    target_hash = base_hash
+
+    changes = []
+    for kind, key in sorted(target.keys(), key=lambda item: (rank[item[0]], item[1])):
+        new = target[kind, key]
+        new_hash = entity_hash(kind, key, new.document)
+
+        if (kind, key) not in base:
+            changes.append({"op": "add", "kind": kind, "uuid": key, "path": new.path, "document": new.document, "hash": format_hash(new_hash)})
+            target_hash += new_hash
+            continue
+
+        old = base[kind, key]
+        old_hash = entity_hash(kind, key, old.document)
+        if old_hash == new_hash and old.path == new.path:
+            continue
+
+        changed, removed = patch(kind, old.document, new.document, orders[kind])
+        change = {"op": "change", "kind": kind, "uuid": key, "path": old.path, "base_hash": format_hash(old_hash), "hash": format_hash(new_hash), "set": changed, "unset": removed}
+        if new.path != old.path:
+            change["new_path"] = new.path
+
+        changes.append(change)
+        target_hash += new_hash - old_hash
+
+    for kind, key in sorted(base.keys() - target.keys(), key=lambda item: (-rank[item[0]], item[1])):
+        old = base[kind, key]
+        old_hash = entity_hash(kind, key, old.document)
+        changes.append({"op": "remove", "kind": kind, "uuid": key, "path": old.path, "base_hash": format_hash(old_hash)})
+        target_hash -= old_hash
+
+    return {
+        "version": changeset_version,
+        "base": format_hash(base_hash),
+        "target": format_hash(target_hash % hash_modulus),
+        "changes": changes,
+    }
+
+
+class ChangesetError(Exception):
+    pass
+
+
+def read_document(path: str):
+    try:
+        return load_yaml(path)
+    except FileNotFoundError:
+        return None
+
+
+def write_document(path: str, document: dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.tmp", "w") as f:
+        yaml.dump(document, f, Dumper=Dumper, sort_keys=False, allow_unicode=True)
+
+    os.replace(f"{path}.tmp", path)
+
+
+def apply(root: str, changeset: dict, base_hash: str | None = None, dry_run: bool = False):
+    # Applies the changeset to a database checkout, touching only the changed files.
+    # Every entity is checked against its hash in the changeset before anything is written, so a changeset made against another version is rejected as a whole.
+    # base_hash is the hash of the checkout (the target of the previously applied changeset), computed if not given.
+    # Returns the hash of the resulting database - the changed files are hashed again after writing and checked against the changeset target.
+    if changeset.get("version") != changeset_version:
+        raise ChangesetError(f"Unsupported changeset version {changeset.get('version')}")
+
+    data_root = database.data_root(root)
+    if base_hash is None:
+        base_hash = format_hash(database_hash(load_directory(root)))
+
+    if base_hash != changeset["base"]:
+        raise ChangesetError(f"The database ({base_hash}) is not the base of the changeset ({changeset['base']})")
+
+    # Paths left by the removed and moved entities, they can be taken by other entities of the changeset
+    vacated = set()
+    for change in changeset["changes"]:
+        if change["op"] == "remove" or "new_path" in change:
+            vacated.add(os.path.join(data_root, change["path"]))
+
+    # Plan of the resulting files: path -> (kind, uuid, document), or None for the files to be removed
+    plan = {path: None for path in vacated}
+    written = set()
+    unchanged_hash = int(base_hash, 16)
+
+    for change in changeset["changes"]:
+        kind, key, op = change["kind"], change["uuid"], change["op"]
+        path = os.path.join(data_root, change["path"])
+        current = read_document(path)
+
+        if op == "add":
+            document = change["document"]
+            if current is not None and path not in vacated:
+                raise ChangesetError(f"Cannot add {kind} {key}: {change['path']} already exists")
+
+        else:
+            if current is None or format_hash(entity_hash(kind, key, current)) != change["base_hash"]:
+                raise ChangesetError(f"Cannot {op} {kind} {key}: {change['path']} differs from the changeset base")
+
+            unchanged_hash -= int(change["base_hash"], 16)
+
+        if op == "remove":
+            continue
+
+        if op == "change":
+            document = {name: value for name, value in current.items() if name not in change["unset"]}
+            document.update(change["set"])
+            path = os.path.join(data_root, change.get("new_path", change["path"]))
+
+        if format_hash(entity_hash(kind, key, document)) != change["hash"]:
+            raise ChangesetError(f"Patched {kind} {key} does not match the changeset")
+
+        if path in written:
+            raise ChangesetError(f"Multiple entities of the changeset are written to {os.path.relpath(path, data_root)}")
+
+        written.add(path)
+        plan[path] = (kind, key, document)
+
+    if dry_run:
+        expected = unchanged_hash + sum(entity_hash(*item) for item in plan.values() if item is not None)
+        result = format_hash(expected % hash_modulus)
+
+    else:
+        # Removes first, the plan has a single operation per path, so the order of the changes does not matter
+        for path, item in plan.items():
+            if item is None and os.path.exists(path):
+                os.remove(path)
+
+        for path, item in plan.items():
+            if item is not None:
+                write_document(path, item[2])
+
+        # Hash what actually ended up on the disk
+        result_hash = unchanged_hash
+        for path, item in plan.items():
+            document = read_document(path)
+            if item is None:
+                if document is not None:
+                    raise ChangesetError(f"{os.path.relpath(path, data_root)} was not removed")
+
+                continue
+
+            result_hash += entity_hash(item[0], item[1], document)
+
+        result = format_hash(result_hash % hash_modulus)
+
+    if result != changeset["target"]:
+        raise ChangesetError(f"The result ({result}) does not match the changeset target ({changeset['target']})")
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Changesets between versions of the openprinttag-database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    p = subparsers.add_parser("diff", help="Changeset between two database checkouts or SQLite snapshots")
+    p.add_argument("base")
+    p.add_argument("target")
+    p.add_argument("-o", "--output", help="Output file (default: stdout)")
+
+    p = subparsers.add_parser("apply", help="Apply a changeset to a database checkout")
+    p.add_argument("database")
+    p.add_argument("changeset")
+    p.add_argument("--base-hash", help="Hash of the checkout (printed by the previous apply), computed from the whole checkout if not given")
+    p.add_argument("--dry-run", action="store_true", help="Only verify that the changeset applies")
+
+    p = subparsers.add_parser("hash", help="Print the hash of a database checkout or snapshot")
+    p.add_argument("database")
+
+    args = parser.parse_args()
+
+    match args.command:
+        case "diff":
+            changeset = diff(load_entities(args.base), load_entities(args.target))
+            data = json.dumps(changeset, ensure_ascii=False, default=str)
+            if args.output:
+                with open(args.output, "w") as f:
+                    f.write(data)
+            else:
+                print(data)
+
+            counts = {op: sum(change["op"] == op for change in changeset["changes"]) for op in ("add", "change", "remove")}
+            print(", ".join(f"{count} {op}" for op, count in counts.items()), file=sys.stderr)
+
+        case "apply":
+            with open(args.changeset) as f:
+                changeset = json.load(f)
+
+            try:
+                print(apply(args.database, changeset, args.base_hash, args.dry_run))
+            except ChangesetError as e:
+                print(f"Error: {e}", file=sys.stderr)
+                sys.exit(1)
+
+        case "hash":
+            print(format_hash(database_hash(load_entities(args.database))))
+
+
+if __name__ == "__main__":
+    main()
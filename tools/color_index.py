@@ -0,0 +1,275 @@
+import argparse
+import json
+import math
+import sys
+import typing
+
+import numpy as np
+
+import database
+from yaml_loader import load_yaml
+
+# Nearest-color search over MaterialColor values.
+# All L*a*b* values are packed into one contiguous (n, 3) array, sorted by the cells of a uniform grid over the L*a*b* space.
+# ΔE76 queries only visit the grid cells that can contain a result, ΔE2000 (not a metric compatible with the grid) is evaluated vectorized over all entries.
+
+# D65/2° reference white, matching the color_lab field definition
+d65_white = np.array([0.95047, 1.0, 1.08883])
+
+srgb_to_xyz = np.array(
+    [
+        [0.4124564, 0.3575761, 0.1804375],
+        [0.2126729, 0.7151522, 0.0721750],
+        [0.0193339, 0.1191920, 0.9503041],
+    ]
+)
+
+
+def rgba_to_lab(rgba: typing.Sequence[str]) -> np.ndarray:
+    # Batch conversion of '#rrggbb(aa)' colors to CIE L*a*b* (the alpha channel is ignored)
+    # Only an approximation - color_lab values MUST be measured, this is only used for searching colors without one
+    if len(rgba) == 0:
+        return np.zeros((0, 3))
+
+    values = np.array([int(color[1:7], 16) for color in rgba], dtype=np.uint32)
+    rgb = np.stack([(values >> 16) & 0xFF, (values >> 8) & 0xFF, values & 0xFF], axis=1) / 255.0
+
+    linear = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    xyz = linear @ srgb_to_xyz.T / d65_white
+
+    epsilon = 216 / 24389
+    kappa = 24389 / 27
+    f = np.where(xyz > epsilon, np.cbrt(xyz), (kappa * xyz + 16) / 116)
+
+    return np.stack([116 * f[:, 1] - 16, 500 * (f[:, 0] - f[:, 1]), 200 * (f[:, 1] - f[:, 2])], axis=1)
+
+
+def delta_e76(lab: np.ndarray, reference) -> np.ndarray:
+    return np.sqrt(((lab - np.asarray(reference, dtype=float)) ** 2).sum(axis=1))
+
+
+def delta_e2000(lab: np.ndarray, reference) -> np.ndarray:
+    # CIEDE2000 color difference (Sharma, Wu, Dalal 2005), vectorized over the rows of lab
+    L1, a1, b1 = lab[:, 0], lab[:, 1], lab[:, 2]
+    L2, a2, b2 = (float(x) for x in reference)
+
+    C1 = np.hypot(a1, b1)
+    C2 = math.hypot(a2, b2)
+    C_mean7 = ((C1 + C2) / 2) ** 7
+    G = 0.5 * (1 - np.sqrt(C_mean7 / (C_mean7 + 25.0**7)))
+
+    a1p = (1 + G) * a1
+    a2p = (1 + G) * a2
+    C1p = np.hypot(a1p, b1)
+    C2p = np.hypot(a2p, b2)
+    h1p = np.degrees(np.arctan2(b1, a1p)) % 360
+    h2p = np.degrees(np.arctan2(b2, a2p)) % 360
+
+    C_product = C1p * C2p
+    no_hue = C_product == 0
+
+    dLp = L2 - L1
+    dCp = C2p - C1p
+    dhp = h2p - h1p
+    dhp = np.where(dhp > 180, dhp - 360, np.where(dhp < -180, dhp + 360, dhp))
+    dhp = np.where(no_hue, 0, dhp)
+    dHp = 2 * np.sqrt(C_product) * np.sin(np.radians(dhp / 2))
+
+    Lp_mean = (L1 + L2) / 2
+    Cp_mean = (C1p + C2p) / 2
+    h_sum = h1p + h2p
+    hp_mean = np.where(np.abs(h1p - h2p) <= 180, h_sum / 2, np.where(h_sum < 360, (h_sum + 360) / 2, (h_sum - 360) / 2))
+    hp_mean = np.where(no_hue, h_sum, hp_mean)
+
+    T = 1 - 0.17 * np.cos(np.radians(hp_mean - 30)) + 0.24 * np.cos(np.radians(2 * hp_mean)) + 0.32 * np.cos(np.radians(3 * hp_mean + 6)) - 0.20 * np.cos(np.radians(4 * hp_mean - 63))
+    d_theta = 30 * np.exp(-(((hp_mean - 275) / 25) ** 2))
+    Cp_mean7 = Cp_mean**7
+    R_C = 2 * np.sqrt(Cp_mean7 / (Cp_mean7 + 25.0**7))
+    S_L = 1 + 0.015 * (Lp_mean - 50) ** 2 / np.sqrt(20 + (Lp_mean - 50) ** 2)
+    S_C = 1 + 0.045 * Cp_mean
+    S_H = 1 + 0.015 * Cp_mean * T
+    R_T = -np.sin(np.radians(2 * d_theta)) * R_C
+
+    return np.sqrt((dLp / S_L) ** 2 + (dCp / S_C) ** 2 + (dHp / S_H) ** 2 + R_T * (dCp / S_C) * (dHp / S_H))
+
+
+metrics = {"de76": delta_e76, "de2000": delta_e2000}
+
+
+class ColorEntry(typing.NamedTuple):
+    material: str
+
+    # "primary_color" or "secondary_colors[i]"
+    field: str
+
+    color_rgba: str | None
+
+    # False if color_lab was converted from color_rgba
+    measured: bool
+
+
+class ColorIndex:
+    def __init__(self, entries: list[ColorEntry], lab: np.ndarray, cell_size: float = 10.0):
+        self.cell_size = cell_size
+
+        # Sort the entries by the grid cell so that each cell is a contiguous slice of the array
+        cells = np.floor(lab / cell_size).astype(np.int64) if len(lab) else np.zeros((0, 3), dtype=np.int64)
+        order = np.lexsort((cells[:, 2], cells[:, 1], cells[:, 0]))
+
+        self.entries = [entries[i] for i in order]
+        self.lab = np.ascontiguousarray(lab[order], dtype=np.float64)
+        cells = cells[order]
+
+        self.cells = dict()
+        if len(cells):
+            boundaries = np.flatnonzero(np.any(cells[1:] != cells[:-1], axis=1)) + 1
+            starts = np.concatenate([[0], boundaries])
+            ends = np.concatenate([boundaries, [len(cells)]])
+            for start, end in zip(starts, ends):
+                self.cells[tuple(int(x) for x in cells[start])] = (int(start), int(end))
+
+            self.cell_min = cells.min(axis=0)
+            self.cell_max = cells.max(axis=0)
+
+    @staticmethod
+    def build(root: str, cell_size: float = 10.0):
+        entries = []
+        lab = []
+        convert = []  # Indexes of entries that only have color_rgba
+
+        for file in database.entity_files(root, {"material"}):
+            document = load_yaml(file.path)
+            if not isinstance(document, dict):
+                continue
+
+            colors = [("primary_color", document.get("primary_color"))]
+            colors += [(f"secondary_colors[{i}]", color) for i, color in enumerate(document.get("secondary_colors", []))]
+
+            for field, color in colors:
+                if not isinstance(color, dict):
+                    continue
+
+                if "color_lab" in color:
+                    lab.append(color["color_lab"])
+                    entries.append(ColorEntry(file.slug, field, color.get("color_rgba"), True))
+
+                elif "color_rgba" in color:
+                    lab.append([0, 0, 0])
+                    convert.append(len(entries))
+                    entries.append(ColorEntry(file.slug, field, color["color_rgba"], False))
+
+        lab = np.array(lab, dtype=np.float64).reshape(-1, 3)
+        if convert:
+            lab[convert] = rgba_to_lab([entries[i].color_rgba for i in convert])
+
+        return ColorIndex(entries, lab, cell_size)
+
+    def _cell_slices(self, center, ring: int, exact=True):
+        # Slices of the cells at the Chebyshev distance `ring` (exact=True) or up to `ring` (exact=False) from the center cell
+        cx, cy, cz = center
+        result = []
+
+        zs = range(max(cz - ring, self.cell_min[2]), min(cz + ring, self.cell_max[2]) + 1)
+        z_faces = [z for z in (cz - ring, cz + ring) if z in zs] if ring else list(zs)
+
+        for x in range(max(cx - ring, self.cell_min[0]), min(cx + ring, self.cell_max[0]) + 1):
+            for y in range(max(cy - ring, self.cell_min[1]), min(cy + ring, self.cell_max[1]) + 1):
+                # Inside of the shell, only its two z faces are at the distance `ring`
+                on_shell = not exact or max(abs(x - cx), abs(y - cy)) == ring
+                for z in zs if on_shell else z_faces:
+                    if (cell := self.cells.get((x, y, z))) is not None:
+                        result.append(cell)
+
+        return result
+
+    def _gather(self, slices):
+        if not slices:
+            return np.zeros(0, dtype=np.int64)
+
+        return np.concatenate([np.arange(start, end) for start, end in slices])
+
+    def _max_ring(self, center):
+        return int(max(np.max(np.abs(self.cell_min - center)), np.max(np.abs(self.cell_max - center))))
+
+    def nearest(self, lab, k: int = 10, metric: str = "de76"):
+        # Returns [(distance, entry)] of the k nearest entries
+        if k < 0:
+            raise ValueError(f"k must not be negative, got {k}")
+
+        if not self.entries or k == 0:
+            return []
+
+        lab = np.asarray(lab, dtype=np.float64)
+        k = min(k, len(self.entries))
+
+        if metric != "de76":
+            distances = metrics[metric](self.lab, lab)
+            indexes = np.argpartition(distances, k - 1)[:k]
+            indexes = indexes[np.argsort(distances[indexes])]
+            return [(float(distances[i]), self.entries[i]) for i in indexes]
+
+        center = np.floor(lab / self.cell_size).astype(np.int64)
+        candidates = np.zeros(0, dtype=np.int64)
+        distances = np.zeros(0)
+
+        for ring in range(self._max_ring(center) + 1):
+            indexes = self._gather(self._cell_slices(tuple(int(x) for x in center), ring))
+            if len(indexes):
+                candidates = np.concatenate([candidates, indexes])
+                distances = np.concatenate([distances, delta_e76(self.lab[indexes], lab)])
+
+            # Anything in the cells further away is at least ring * cell_size away
+            if len(candidates) >= k and np.partition(distances, k - 1)[k - 1] <= ring * self.cell_size:
+                break
+
+        order = np.argsort(distances, kind="stable")[:k]
+        return [(float(distances[i]), self.entries[candidates[i]]) for i in order]
+
+    def within(self, lab, radius: float, metric: str = "de76"):
+        # Returns [(distance, entry)] of all the entries within the radius, nearest first
+        if not self.entries:
+            return []
+
+        lab = np.asarray(lab, dtype=np.float64)
+
+        if metric == "de76":
+            center = np.floor(lab / self.cell_size).astype(np.int64)
+            rings = int(math.ceil(radius / self.cell_size))
+            indexes = self._gather(self._cell_slices(tuple(int(x) for x in center), rings, exact=False))
+        else:
+            indexes = np.arange(len(self.entries))
+
+        distances = metrics[metric](self.lab[indexes], lab)
+        mask = distances <= radius
+        indexes = indexes[mask]
+        distances = distances[mask]
+
+        order = np.argsort(distances, kind="stable")
+        return [(float(distances[i]), self.entries[indexes[i]]) for i in order]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Finds the materials with colors closest to the given one")
+    parser.add_argument("database")
+    parser.add_argument("color", nargs="+", help="'#rrggbb' or L* a* b*")
+    parser.add_argument("-k", type=int, default=10, help="Number of results")
+    parser.add_argument("--radius", type=float, help="Return all the colors within the ΔE radius instead of the k nearest")
+    parser.add_argument("--metric", choices=sorted(metrics), default="de2000")
+    args = parser.parse_args()
+
+    if len(args.color) == 1:
+        lab = rgba_to_lab(args.color)[0]
+    else:
+        lab = np.array([float(x) for x in args.color])
+
+    index = ColorIndex.build(args.database)
+    results = index.within(lab, args.radius, args.metric) if args.radius is not None else index.nearest(lab, args.k, args.metric)
+
+    for distance, entry in results:
+        print(json.dumps({"delta_e": round(distance, 3), **entry._asdict()}))
+
+    print(f"{len(results)} of {len(index.entries)} colors", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
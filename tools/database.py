@@ -0,0 +1,58 @@
+import os
+import typing
+
+# Maps top-level directories of the openprinttag-database data tree to the entity kinds (schema basenames)
+kind_directories = {
+    "brands": "brand",
+    "materials": "material",
+    "material-packages": "material_package",
+    "material_packages": "material_package",
+    "material-containers": "material_container",
+    "material_containers": "material_container",
+}
+
+# All entity kinds stored in the database
+kinds = sorted(set(kind_directories.values()))
+
+
+class EntityFile(typing.NamedTuple):
+    kind: str
+    slug: str
+    path: str
+
+
+def data_root(root: str):
+    # Accept both the database repository root and its data directory
+    if os.path.isdir(os.path.join(root, "data")):
+        return os.path.join(root, "data")
+
+    return root
+
+
+def _scan_yamls(dir: str):
+    with os.scandir(dir) as it:
+        entries = sorted(it, key=lambda e: e.name)
+
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from _scan_yamls(entry.path)
+
+        elif entry.name.endswith(".yaml") or entry.name.endswith(".yml"):
+            yield entry.path
+
+
+def entity_files(root: str, kinds_filter: set[str] | None = None):
+    root = data_root(root)
+
+    for dir_name, kind in kind_directories.items():
+        if kinds_filter is not None and kind not in kinds_filter:
+            continue
+
+        dir = os.path.join(root, dir_name)
+        if not os.path.isdir(dir):
+            continue
+
+        for path in _scan_yamls(dir):
+            # The slug has to correspond with the entity yaml filename
+            slug = os.path.splitext(os.path.basename(path))[0]
+            yield EntityFile(kind, slug, path)
@@ -0,0 +1,254 @@
+import argparse
+import datetime
+import json
+import os
+import sqlite3
+import sys
+import time
+
+import database
+import opt_uuid
+from integrity import kind_entities, reference_types
+from spec import load_spec
+from yaml_loader import load_yaml
+
+# Compiles a database checkout into a single SQLite snapshot, so that consumers do not have to walk and parse the YAML tree.
+# There is a table per entity kind, with columns derived from the in_opt_db fields of the entity (and its class-specific subclasses):
+# - scalar fields map to scalar columns
+# - references map to <field>_uuid and <field>_slug columns (resolved, whichever way the reference was written)
+# - sets, lists and inline objects are stored as JSON (queryable with the SQLite json functions)
+# Every row also has the slug, the path within the database and the whole document as JSON.
+
+snapshot_version = 1
+
+column_types = {
+    "string": "TEXT",
+    "UUID": "TEXT",
+    "number": "NUMERIC",
+    "int": "INTEGER",
+    "uint": "INTEGER",
+    "bool": "INTEGER",
+    "timestamp": "NUMERIC",
+    "color_rgba": "TEXT",
+    "MaterialClass": "TEXT",
+}
+
+indexed_columns = ["uuid", "slug", "gtin", "brand_uuid", "material_uuid", "container_uuid"]
+
+
+class Column:
+    def __init__(self, name: str, type: str, field: str, mode: str):
+        self.name = name
+        self.type = type
+        self.field = field
+
+        # "value", "json", "ref_uuid" or "ref_slug"
+        self.mode = mode
+
+
+def column_type(field, spec):
+    if field.type in column_types:
+        return column_types[field.type]
+
+    # Enums are stored as their names
+    if (entity := spec.entities.get(field.type)) is not None and entity.is_enum:
+        return "TEXT"
+
+    return None
+
+
+def table_columns(kind: str, spec=None, filter_field="in_opt_db"):
+    # Columns of the kind table, in the field definition order
+    spec = spec or load_spec()
+    entity_name = kind_entities[kind]
+    entities = spec.with_subclasses(entity_name)
+
+    result = {"slug": Column("slug", "TEXT", "slug", "value")}
+    for entity in entities:
+        for field in entity.all_fields:
+            if not field.get(filter_field, True) or field.type is None or field.is_function or field.name in result:
+                continue
+
+            if field.type in reference_types:
+                result[field.name] = Column(f"{field.name}_uuid", "TEXT", field.name, "ref_uuid")
+                result[f"{field.name}_slug"] = Column(f"{field.name}_slug", "TEXT", field.name, "ref_slug")
+
+            elif (type := column_type(field, spec)) is not None:
+                result[field.name] = Column(field.name, type, field.name, "value")
+
+            else:
+                result[field.name] = Column(field.name, "TEXT", field.name, "json")
+
+    return list(result.values())
+
+
+def quote(name: str):
+    return '"' + name.replace('"', '""') + '"'
+
+
+class Exporter:
+    def __init__(self, connection: sqlite3.Connection, spec=None):
+        self.connection = connection
+        self.spec = spec or load_spec()
+        self.columns = {kind: table_columns(kind, self.spec) for kind in opt_uuid.derivation_order}
+        self.field_types = {kind: {column.field: self.field_type(kind, column.field) for column in columns} for kind, columns in self.columns.items()}
+
+        # Kind -> slug -> uuid and uuid -> slug, for resolving the references
+        self.slug_uuids = {kind: dict() for kind in reference_types.values()}
+        self.uuid_slugs = {kind: dict() for kind in reference_types.values()}
+
+        self.counts = {kind: 0 for kind in opt_uuid.derivation_order}
+
+    def create_tables(self):
+        for kind, columns in self.columns.items():
+            definitions = ", ".join(f"{quote(column.name)} {column.type}" for column in columns)
+            self.connection.execute(f"CREATE TABLE {quote(kind)} ({definitions}, path TEXT NOT NULL, document TEXT NOT NULL)")
+
+        self.connection.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def create_indexes(self):
+        # Created after the inserts, which is considerably faster than maintaining them during the inserts
+        for kind, columns in self.columns.items():
+            names = {column.name for column in columns}
+            for column in indexed_columns:
+                if column in names:
+                    self.connection.execute(f"CREATE INDEX {quote(f'{kind}__{column}')} ON {quote(kind)} ({quote(column)})")
+
+    def field_type(self, kind: str, field_name: str):
+        for entity in self.spec.with_subclasses(kind_entities[kind]):
+            if field_name in entity.fields_by_name:
+                return entity.fields_by_name[field_name].type
+
+        return None
+
+    def resolve(self, field_type: str, ref):
+        # Returns (uuid, slug) of the referenced entity
+        if not isinstance(ref, dict):
+            return None, None
+
+        kind = reference_types[field_type]
+        uuid = str(ref["uuid"]).lower() if "uuid" in ref else None
+        slug = ref.get("slug")
+
+        if uuid is None and slug is not None:
+            uuid = self.slug_uuids[kind].get(slug)
+
+        if slug is None and uuid is not None:
+            slug = self.uuid_slugs[kind].get(uuid)
+
+        return uuid, slug
+
+    def row(self, kind: str, file: database.EntityFile, document: dict):
+        field_types = self.field_types[kind]
+
+        values = []
+        for column in self.columns[kind]:
+            if column.name == "slug":
+                values.append(file.slug)
+                continue
+
+            value = document.get(column.field)
+            if value is None:
+                values.append(None)
+
+            elif column.mode == "value":
+                # UUIDs are normalized to lower case, so that they can be looked up with =
+                values.append(str(value).lower() if field_types[column.field] == "UUID" else value)
+
+            elif column.mode == "json":
+                values.append(json.dumps(value, ensure_ascii=False))
+
+            else:
+                uuid, slug = self.resolve(field_types[column.field], value)
+                values.append(uuid if column.mode == "ref_uuid" else slug)
+
+        return values
+
+    def export(self, root: str):
+        data_root = database.data_root(root)
+        for kind in opt_uuid.derivation_order:
+            columns = self.columns[kind]
+            placeholders = ", ".join("?" * (len(columns) + 2))
+            statement = f"INSERT INTO {quote(kind)} VALUES ({placeholders})"
+
+            rows = []
+            for file in database.entity_files(root, {kind}):
+                document = load_yaml(file.path)
+                if not isinstance(document, dict):
+                    print(f"Skipping {file.path}: not an object", file=sys.stderr)
+                    continue
+
+                if kind in self.slug_uuids and "uuid" in document:
+                    uuid = str(document["uuid"]).lower()
+                    self.slug_uuids[kind][file.slug] = uuid
+                    self.uuid_slugs[kind][uuid] = file.slug
+
+                rows.append(self.row(kind, file, document) + [os.path.relpath(file.path, data_root), json.dumps(document, ensure_ascii=False, default=str)])
+
+                if len(rows) >= 10000:
+                    self.connection.executemany(statement, rows)
+                    rows.clear()
+
+            self.connection.executemany(statement, rows)
+            self.counts[kind] = self.connection.execute(f"SELECT COUNT(*) FROM {quote(kind)}").fetchone()[0]
+
+        return self.counts
+
+
+def export_snapshot(root: str, output: str, spec=None):
+    # Writes into a temporary file that replaces the output at the end, so that readers never see a partial snapshot
+    tmp_output = f"{output}.tmp"
+    if os.path.exists(tmp_output):
+        os.remove(tmp_output)
+
+    connection = sqlite3.connect(tmp_output)
+    try:
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+
+        exporter = Exporter(connection, spec)
+        with connection:
+            exporter.create_tables()
+            counts = exporter.export(root)
+            exporter.create_indexes()
+
+            meta = {
+                "version": snapshot_version,
+                "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+                "counts": counts,
+            }
+            connection.executemany("INSERT INTO meta VALUES (?, ?)", [(key, json.dumps(value)) for key, value in meta.items()])
+
+        connection.execute("VACUUM")
+
+    finally:
+        connection.close()
+
+    os.replace(tmp_output, output)
+    return counts
+
+
+def open_snapshot(path: str):
+    # Read-only connection to a snapshot, rows are accessible by column name
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    connection.row_factory = sqlite3.Row
+
+    version = json.loads(connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0])
+    assert version == snapshot_version, f"Unsupported snapshot version {version}"
+
+    return connection
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exports an openprinttag-database tree into a single SQLite snapshot")
+    parser.add_argument("database", help="Path to the openprinttag-database checkout (or its data directory)")
+    parser.add_argument("-o", "--output", required=True)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = export_snapshot(args.database, args.output)
+    print(f"Exported {', '.join(f'{count} {kind}s' for kind, count in counts.items())} in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
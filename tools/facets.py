@@ -0,0 +1,358 @@
+import argparse
+import collections
+import colorsys
+import json
+import re
+import sys
+import time
+
+import database
+from material_tags import load_tag_graph
+from yaml_loader import load_yaml
+
+# Faceted inverted index over the materials of a database.
+# Materials get dense integer ids, posting lists are stored as sorted id arrays and held in memory as int bitmaps (bit i = material i),
+# so AND/OR/NOT across facets are bitwise operations and counting is int.bit_count().
+# Small results are counted from the facet values of the matched materials instead, which does not depend on the number of values of the facet.
+
+facet_names = ["brand", "class", "type", "tags", "implied_tags", "certifications", "color", "color_family"]
+
+# The exact colors (#rrggbb) are nearly unique per material - they can be filtered on, but are not counted by default, color_family is
+counted_facets = [facet for facet in facet_names if facet != "color"]
+
+# Results with at most this many matches per facet value are counted by iterating the matches instead of a bit_count per value
+count_ids_ratio = 16
+
+
+def bitmap(ids):
+    if not ids:
+        return 0
+
+    data = bytearray(max(ids) // 8 + 1)
+    for i in ids:
+        data[i >> 3] |= 1 << (i & 7)
+
+    return int.from_bytes(data, "little")
+
+
+def bitmap_ids(mask: int):
+    result = []
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+    for byte_index, byte in enumerate(data):
+        while byte:
+            low = byte & -byte
+            result.append(byte_index * 8 + low.bit_length() - 1)
+            byte ^= low
+
+    return result
+
+
+def normalize_color(rgba: str):
+    # Colors are faceted without the alpha channel
+    return rgba.lower()[:7]
+
+
+def color_family(rgba: str):
+    # Named color family of a #rrggbb[aa] color, coarse enough to be a useful facet
+    try:
+        r, g, b = (int(rgba[i : i + 2], 16) / 255 for i in (1, 3, 5))
+    except ValueError:
+        return None
+
+    hue, lightness, saturation = colorsys.rgb_to_hls(r, g, b)
+    hue *= 360
+
+    if lightness < 0.12:
+        return "black"
+
+    if lightness > 0.92:
+        return "white"
+
+    if saturation < 0.15:
+        return "gray"
+
+    if 15 <= hue < 45 and lightness < 0.4:
+        return "brown"
+
+    for limit, name in ((15, "red"), (45, "orange"), (70, "yellow"), (165, "green"), (195, "cyan"), (255, "blue"), (290, "purple"), (345, "pink")):
+        if hue < limit:
+            return name
+
+    return "red"
+
+
+class Query:
+    def __and__(self, other):
+        return And(self, other)
+
+    def __or__(self, other):
+        return Or(self, other)
+
+    def __invert__(self):
+        return Not(self)
+
+
+class Term(Query):
+    def __init__(self, facet: str, value: str):
+        self.facet = facet
+        self.value = value
+
+    def evaluate(self, index):
+        return index.postings.get(self.facet, {}).get(self.value, 0)
+
+
+class All(Query):
+    def evaluate(self, index):
+        return index.all
+
+
+class And(Query):
+    def __init__(self, *queries):
+        self.queries = queries
+
+    def evaluate(self, index):
+        result = index.all
+        for query in self.queries:
+            result &= query.evaluate(index)
+
+        return result
+
+
+class Or(Query):
+    def __init__(self, *queries):
+        self.queries = queries
+
+    def evaluate(self, index):
+        result = 0
+        for query in self.queries:
+            result |= query.evaluate(index)
+
+        return result
+
+
+class Not(Query):
+    def __init__(self, query):
+        self.query = query
+
+    def evaluate(self, index):
+        return index.all & ~self.query.evaluate(index)
+
+
+def parse_query(text: str) -> Query:
+    # Parses queries like 'class=FFF & (tags=glitter | tags=silk) & !brand=prusament'
+    tokens = re.findall(r"\s*([()&|!]|[^()&|!\s]+)", text)
+    pos = 0
+
+    def peek():
+        return tokens[pos] if pos < len(tokens) else None
+
+    def take():
+        nonlocal pos
+        pos += 1
+        return tokens[pos - 1]
+
+    def parse_or():
+        result = parse_and()
+        while peek() == "|":
+            take()
+            result = result | parse_and()
+
+        return result
+
+    def parse_and():
+        result = parse_unary()
+        while peek() == "&":
+            take()
+            result = result & parse_unary()
+
+        return result
+
+    def parse_unary():
+        token = take() if peek() is not None else None
+        if token == "!":
+            return ~parse_unary()
+
+        if token == "(":
+            result = parse_or()
+            if take() != ")":
+                raise ValueError("Expected )")
+
+            return result
+
+        if token is None or "=" not in token:
+            raise ValueError(f"Expected facet=value, got {token!r}")
+
+        facet, value = token.split("=", 1)
+        return Term(facet, value)
+
+    if not tokens:
+        return All()
+
+    result = parse_or()
+    if peek() is not None:
+        raise ValueError(f"Unexpected {peek()!r}")
+
+    return result
+
+
+class FacetIndex:
+    def __init__(self, materials: list[dict], postings: dict[str, dict[str, list[int]]]):
+        # materials: id -> {"slug", "uuid"}
+        self.materials = materials
+        self.all = (1 << len(materials)) - 1
+        self.postings = {facet: {value: bitmap(ids) for value, ids in values.items()} for facet, values in postings.items()}
+
+        # Facet -> id -> facet values of the material, for counting small results
+        self.values = {facet: [[] for _ in materials] for facet in postings}
+        for facet, values in postings.items():
+            for value, ids in values.items():
+                for i in ids:
+                    self.values[facet][i].append(value)
+
+    @staticmethod
+    def build(root: str):
+        tag_graph = load_tag_graph()
+
+        # Brand references can be by slug or by uuid, facet on the slug
+        brand_slugs = dict()
+        for file in database.entity_files(root, {"brand"}):
+            document = load_yaml(file.path)
+            if isinstance(document, dict) and "uuid" in document:
+                brand_slugs[str(document["uuid"]).lower()] = file.slug
+
+        def brand_value(ref):
+            if not isinstance(ref, dict):
+                return None
+
+            if "slug" in ref:
+                return ref["slug"]
+
+            if "uuid" in ref:
+                return brand_slugs.get(str(ref["uuid"]).lower(), str(ref["uuid"]).lower())
+
+            return ref.get("name")
+
+        materials = []
+        postings = {facet: dict() for facet in facet_names}
+
+        def add(facet, value, id):
+            if value is not None:
+                postings[facet].setdefault(str(value), []).append(id)
+
+        for file in database.entity_files(root, {"material"}):
+            document = load_yaml(file.path)
+            if not isinstance(document, dict):
+                continue
+
+            id = len(materials)
+            materials.append({"slug": file.slug, "uuid": document.get("uuid")})
+
+            add("brand", brand_value(document.get("brand")), id)
+            add("class", document.get("class"), id)
+            add("type", document.get("type"), id)
+
+            tags = [tag for tag in document.get("tags", []) if tag in tag_graph.by_name]
+            for tag in document.get("tags", []):
+                add("tags", tag, id)
+
+            for tag in tag_graph.names(tag_graph.expand(tag_graph.mask(tags))):
+                add("implied_tags", tag, id)
+
+            for certification in document.get("certifications", []):
+                add("certifications", certification, id)
+
+            colors = [document.get("primary_color")] + list(document.get("secondary_colors", []))
+            colors = {normalize_color(c["color_rgba"]) for c in colors if isinstance(c, dict) and "color_rgba" in c}
+            for color in colors:
+                add("color", color, id)
+
+            for family in {color_family(color) for color in colors}:
+                add("color_family", family, id)
+
+        return FacetIndex(materials, postings)
+
+    def save(self, path: str):
+        data = {
+            "materials": self.materials,
+            "postings": {facet: {value: bitmap_ids(mask) for value, mask in sorted(values.items())} for facet, values in self.postings.items()},
+        }
+        with open(path, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+
+    @staticmethod
+    def load(path: str):
+        with open(path, "r") as f:
+            data = json.load(f)
+
+        return FacetIndex(data["materials"], data["postings"])
+
+    def query(self, query: Query | str) -> int:
+        if isinstance(query, str):
+            query = parse_query(query)
+
+        return query.evaluate(self)
+
+    def ids(self, mask: int):
+        return bitmap_ids(mask)
+
+    def slugs(self, mask: int):
+        return [self.materials[i]["slug"] for i in bitmap_ids(mask)]
+
+    def facet_counts(self, mask: int, facets=None):
+        # Number of matching materials per facet value, most frequent first
+        result = dict()
+        matched = mask.bit_count()
+        ids = None
+
+        for facet in facets or counted_facets:
+            postings = self.postings.get(facet, {})
+            if matched <= len(postings) * count_ids_ratio:
+                if ids is None:
+                    ids = bitmap_ids(mask)
+
+                values = self.values.get(facet)
+                counts = collections.Counter(value for i in ids for value in values[i]).items() if values else ()
+            else:
+                counts = ((value, (mask & posting).bit_count()) for value, posting in postings.items())
+
+            result[facet] = dict(sorted(((value, count) for value, count in counts if count), key=lambda item: (-item[1], item[0])))
+
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Faceted index over the materials of an openprinttag-database tree")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    p = subparsers.add_parser("build", help="Build the index")
+    p.add_argument("database")
+    p.add_argument("-o", "--output", required=True)
+
+    p = subparsers.add_parser("query", help="Query the index, for example 'class=FFF & implied_tags=contains_carbon & !brand=prusament'")
+    p.add_argument("index")
+    p.add_argument("query", nargs="?", default="")
+    p.add_argument("--facets", nargs="*", help=f"Facets to print the counts for (default: {', '.join(counted_facets)})")
+    p.add_argument("--limit", type=int, default=20, help="Maximum number of materials to print")
+
+    args = parser.parse_args()
+
+    match args.command:
+        case "build":
+            index = FacetIndex.build(args.database)
+            index.save(args.output)
+            print(f"Indexed {len(index.materials)} materials", file=sys.stderr)
+
+        case "query":
+            index = FacetIndex.load(args.index)
+
+            t = time.perf_counter()
+            mask = index.query(args.query)
+            counts = index.facet_counts(mask, args.facets)
+            elapsed = time.perf_counter() - t
+
+            print(json.dumps({"count": mask.bit_count(), "materials": index.slugs(mask)[: args.limit], "facets": counts}, indent=2, ensure_ascii=False))
+            print(f"Query took {elapsed * 1000:.2f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import argparse
+import json
+import os
+import sys
+import typing
+
+import numpy as np
+
+import opt_uuid
+from integrity import Issue
+
+# GTIN (EAN/UPC) handling for MaterialPackage::gtin - check digits, normalization and an index for resolving barcode scans.
+# GTIN-8/12/13/14 are normalized to GTIN-14 by padding with zeros, which keeps the check digit valid, so all of them are stored as one int64.
+# Check digits are verified vectorized over whole batches (numpy), resolution is a hash lookup of the normalized GTINs.
+
+gtin_lengths = (8, 12, 13, 14)
+
+invalid = -1
+
+# GS1 weights of the 13 digits before the check digit, counted from the right: 3, 1, 3, ...
+digit_powers = 10 ** np.arange(1, 14, dtype=np.int64)
+digit_weights = np.where(np.arange(13) % 2 == 0, 3, 1)
+
+
+def parse(values: typing.Sequence) -> np.ndarray:
+    # GTINs as int64, -1 where the value is not a GTIN-8/12/13/14 (check digits are not verified)
+    # Numbers are accepted with any number of digits up to 14, as the leading zeros get lost in YAML/JSON numbers
+    result = np.full(len(values), invalid, dtype=np.int64)
+    for i, value in enumerate(values):
+        if isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+            if 0 < value < 10**14:
+                result[i] = value
+
+        elif isinstance(value, str):
+            text = value.strip()
+            if len(text) in gtin_lengths and text.isascii() and text.isdigit():
+                result[i] = int(text)
+
+    return result
+
+
+def check_digits(gtins: np.ndarray) -> np.ndarray:
+    # Expected check digits of int64 GTINs (the last digit is ignored)
+    digits = (gtins[:, np.newaxis] // digit_powers) % 10
+    return (10 - (digits * digit_weights).sum(axis=1) % 10) % 10
+
+
+def valid(gtins: np.ndarray) -> np.ndarray:
+    # Bool mask of the parsed GTINs with a correct check digit
+    return (gtins != invalid) & (gtins % 10 == check_digits(gtins))
+
+
+def normalize(values: typing.Sequence) -> np.ndarray:
+    # GTIN-14 as int64, -1 where the value is not a valid GTIN
+    gtins = parse(values)
+    return np.where(valid(gtins), gtins, invalid)
+
+
+def format_gtin14(gtin: int) -> str:
+    return f"{gtin:014d}"
+
+
+class Package(typing.NamedTuple):
+    path: str
+    slug: str
+    uuid: str | None
+    brand_uuid: str | None
+    gtin: int
+
+
+class GtinIndex:
+    def __init__(self):
+        self.packages = dict()  # GTIN-14 -> [Package]
+        self.issues = []
+
+    @staticmethod
+    def build(root: str):
+        index = GtinIndex()
+
+        # The packages are linked to the brands through the materials, the deriver resolves them in the same pass
+        files = []
+        deriver = opt_uuid.DatabaseDeriver(root)
+        for derivation in deriver.run():
+            if derivation.file.kind != "material_package":
+                continue
+
+            document = derivation.document
+            if "gtin" not in document:
+                continue
+
+            brand = deriver.resolve_material_brand(document.get("material"))
+            package_uuid = derivation.stored or derivation.derived
+            files.append((derivation.file, document["gtin"], str(package_uuid) if package_uuid else None, str(brand) if brand else None))
+
+        gtins = parse([gtin for _, gtin, _, _ in files])
+        is_valid = valid(gtins)
+
+        for (file, value, package_uuid, brand_uuid), gtin, ok in zip(files, gtins.tolist(), is_valid.tolist()):
+            if gtin == invalid:
+                index.issues.append(Issue(file.path, "$.gtin", f"'{value}' is not a GTIN-8/12/13/14"))
+                continue
+
+            if not ok:
+                index.issues.append(Issue(file.path, "$.gtin", f"Invalid check digit of GTIN {value}"))
+
+            index.packages.setdefault(gtin, []).append(Package(file.path, file.slug, package_uuid, brand_uuid, gtin))
+
+        for gtin, packages in index.packages.items():
+            if len(packages) > 1:
+                brands = {package.brand_uuid for package in packages}
+                where = "across brands" if len(brands) > 1 else "within the brand"
+                for package in packages:
+                    others = ", ".join(other.slug for other in packages if other is not package)
+                    index.issues.append(Issue(package.path, "$.gtin", f"Duplicate GTIN {format_gtin14(gtin)} {where} (also {others})"))
+
+        return index
+
+    def get(self, value) -> list[Package]:
+        return self.resolve([value])[0]
+
+    def resolve(self, values: typing.Sequence) -> list[list[Package]]:
+        # Resolves a batch of scans, invalid GTINs resolve to no packages
+        packages = self.packages
+        return [packages.get(gtin, []) for gtin in normalize(values).tolist()]
+
+
+def check_database(root: str):
+    return GtinIndex.build(root).issues
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GTIN check digits, normalization and resolution of MaterialPackages")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    p = subparsers.add_parser("check", help="Check the GTINs of a database: formats, check digits and duplicates")
+    p.add_argument("database")
+
+    p = subparsers.add_parser("normalize", help="Print the GTIN-14 of the GTINs (arguments or one per line on stdin)")
+    p.add_argument("gtins", nargs="*")
+
+    p = subparsers.add_parser("resolve", help="Resolve GTINs (arguments or one per line on stdin) to packages")
+    p.add_argument("database")
+    p.add_argument("gtins", nargs="*")
+
+    args = parser.parse_args()
+
+    gtins = getattr(args, "gtins", None)
+    if gtins == []:
+        gtins = [line.strip() for line in sys.stdin if line.strip()]
+
+    match args.command:
+        case "check":
+            issues = check_database(args.database)
+            for issue in issues:
+                print(f"{os.path.relpath(issue.path, args.database)}: {issue.location}: {issue.message}")
+
+            if issues:
+                sys.exit(1)
+
+        case "normalize":
+            for value, gtin in zip(gtins, normalize(gtins).tolist()):
+                print(format_gtin14(gtin) if gtin != invalid else f"{value}: invalid")
+
+        case "resolve":
+            index = GtinIndex.build(args.database)
+            for value, packages in zip(gtins, index.resolve(gtins)):
+                print(json.dumps({"gtin": value, "packages": [package._asdict() for package in packages]}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import argparse
+import os
+import sys
+import typing
+
+import database
+from spec import load_spec
+from yaml_loader import load_yaml
+
+# Entity of each database kind
+kind_entities = {
+    "brand": "Brand",
+    "material": "Material",
+    "material_package": "MaterialPackage",
+    "material_container": "MaterialContainer",
+}
+
+# Field types that are stored as an inline object, slug reference or uuid reference (object_ref_or_link_schema in generate_db_schema.py)
+reference_types = {
+    "Brand": "brand",
+    "Material": "material",
+    "MaterialContainer": "material_container",
+    "SLAMaterialContainerConnector": "sla_material_container_connector",
+}
+
+
+def reference_paths(entity_name: str, spec=None, filter_field="in_opt_db", visited=frozenset()):
+    # Returns (path, target kind) of all the reference fields of the entity and its subclasses, "*" in a path stands for all the items of a set
+    spec = spec or load_spec()
+    if entity_name in visited:
+        return []
+
+    visited = visited | {entity_name}
+    entities = spec.with_subclasses(entity_name)
+
+    result = set()
+    for entity in entities:
+        for field in entity.all_fields:
+            if not field.get(filter_field, True) or field.type is None:
+                continue
+
+            if field.type in reference_types:
+                result.add(((field.name,), reference_types[field.type]))
+
+            elif field.type.startswith("set(") and (item_type := field.type.removeprefix("set(").removesuffix(")")) in spec.entities:
+                result |= {((field.name, "*") + path, kind) for path, kind in reference_paths(item_type, spec, filter_field, visited)}
+
+    return sorted(result)
+
+
+class Reference(typing.NamedTuple):
+    file: database.EntityFile
+    path: str
+    kind: str
+    key: str
+    value: str
+
+
+class Issue(typing.NamedTuple):
+    path: str
+    location: str
+    message: str
+
+
+def iter_path(document, path, location="$"):
+    # Yields (json path, value) of all the values on the path
+    if not path:
+        yield location, document
+        return
+
+    key, rest = path[0], path[1:]
+    if key == "*":
+        if isinstance(document, list):
+            for i, item in enumerate(document):
+                yield from iter_path(item, rest, f"{location}[{i}]")
+
+    elif isinstance(document, dict) and key in document:
+        yield from iter_path(document[key], rest, f"{location}.{key}")
+
+
+class IntegrityChecker:
+    def __init__(self, spec=None):
+        self.spec = spec or load_spec()
+        self.reference_paths = {kind: reference_paths(entity, self.spec) for kind, entity in kind_entities.items()}
+        self.reference_paths.update({kind: reference_paths(entity, self.spec) for entity, kind in reference_types.items() if kind not in self.reference_paths})
+
+        # Kind -> uuid/slug -> file path
+        self.uuids = {kind: dict() for kind in self.reference_paths}
+        self.slugs = {kind: dict() for kind in self.reference_paths}
+
+        # Kinds that are not stored as separate entities (connectors) only exist inline - kind -> uuid -> file path of the first inline definition
+        # The same inline object is repeated in every document that uses it, so repeated uuids are not duplicates
+        self.inline_uuids = {kind: dict() for kind in self.reference_paths if kind not in database.kinds}
+
+        self.references = []
+        self.issues = []
+
+    def index(self, kind, key, value, file):
+        index = (self.uuids if key == "uuid" else self.slugs)[kind]
+        value = str(value).lower() if key == "uuid" else str(value)
+
+        if (existing := index.get(value)) is not None and existing != file.path:
+            self.issues.append(Issue(file.path, f"$.{key}", f"Duplicate {kind} {key} '{value}', also in {existing}"))
+            return
+
+        index[value] = file.path
+
+    def collect(self, file, kind, document, location="$"):
+        # Collects references from the document; inline objects are checked recursively against their own reference fields
+        for path, target_kind in self.reference_paths.get(kind, ()):
+            for ref_location, ref in iter_path(document, path, location):
+                if not isinstance(ref, dict):
+                    continue
+
+                if ref.keys() == {"slug"}:
+                    self.references.append(Reference(file, ref_location, target_kind, "slug", str(ref["slug"])))
+
+                elif ref.keys() == {"uuid"}:
+                    self.references.append(Reference(file, ref_location, target_kind, "uuid", str(ref["uuid"]).lower()))
+
+                else:
+                    if target_kind in self.inline_uuids and "uuid" in ref:
+                        self.inline_uuids[target_kind].setdefault(str(ref["uuid"]).lower(), file.path)
+
+                    self.collect(file, target_kind, ref, ref_location)
+
+    def load(self, root):
+        # Single pass over the database - builds the indexes and collects the references, the documents are not kept in memory
+        for file in database.entity_files(root):
+            document = load_yaml(file.path)
+            if not isinstance(document, dict):
+                self.issues.append(Issue(file.path, "$", "Not an object"))
+                continue
+
+            self.index(file.kind, "slug", file.slug, file)
+            if "uuid" in document:
+                self.index(file.kind, "uuid", document["uuid"], file)
+
+            self.collect(file, file.kind, document)
+
+    def resolve(self):
+        for ref in self.references:
+            if ref.kind in database.kinds:
+                index = (self.uuids if ref.key == "uuid" else self.slugs)[ref.kind]
+
+            elif ref.key == "uuid" and ref.kind in self.inline_uuids:
+                # Not stored in the database as separate entities, resolved against the inline objects
+                index = self.inline_uuids[ref.kind]
+
+            else:
+                self.issues.append(Issue(ref.file.path, ref.path, f"Cannot resolve {ref.kind} by {ref.key}: it is not stored in the database"))
+                continue
+
+            if ref.value not in index:
+                self.issues.append(Issue(ref.file.path, ref.path, f"Referenced {ref.kind} with {ref.key} '{ref.value}' does not exist"))
+
+        return self.issues
+
+
+def check_database(root, spec=None):
+    checker = IntegrityChecker(spec)
+    checker.load(root)
+    return checker.resolve()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Checks that all the slug/uuid references in an openprinttag-database tree resolve to existing entities")
+    parser.add_argument("database", help="Path to the openprinttag-database checkout (or its data directory)")
+    args = parser.parse_args()
+
+    checker = IntegrityChecker()
+    checker.load(args.database)
+    issues = checker.resolve()
+
+    for issue in issues:
+        print(f"{os.path.relpath(issue.path, args.database)}: {issue.location}: {issue.message}")
+
+    print(f"Checked {len(checker.references)} references, {len(issues)} issues", file=sys.stderr)
+    sys.exit(1 if issues else 0)
+
+
+if __name__ == "__main__":
+    main()
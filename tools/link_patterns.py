@@ -0,0 +1,193 @@
+import argparse
+import functools
+import json
+import re
+import sys
+import typing
+
+import database
+from yaml_loader import load_yaml
+
+# Resolves URLs using the Brand link_patterns.
+# Patterns match from the start of the URL, so the literal prefix of each pattern (typically the scheme + host + path start) is put into a char trie.
+# A URL is then only tested against the patterns whose prefix it starts with, plus the patterns without any literal prefix.
+
+regex_metachars = set(".^$*+?{}[]|()")
+regex_quantifiers = set("*+?{")
+
+# Escapes that match a single literal character
+regex_escapes = set(".^$*+?{}[]|()\\/-:=&#%~!@,;'\"<> ")
+
+
+@functools.cache
+def compile_pattern(pattern: str) -> re.Pattern:
+    # The spec uses the (?<name>...) group syntax, Python requires (?P<name>...)
+    return re.compile(re.sub(r"\(\?<(?![=!])", "(?P<", pattern))
+
+
+def has_top_level_alternation(pattern: str) -> bool:
+    depth = 0
+    in_class = False
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            i += 1
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return True
+
+        i += 1
+
+    return False
+
+
+def literal_prefix(pattern: str) -> str:
+    # Returns the string every match of the pattern has to start with (possibly empty)
+    if has_top_level_alternation(pattern):
+        return ""
+
+    pattern = pattern.removeprefix("^")
+    chars = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\" and i + 1 < len(pattern) and pattern[i + 1] in regex_escapes:
+            literal, i = pattern[i + 1], i + 2
+        elif char not in regex_metachars and char != "\\":
+            literal, i = char, i + 1
+        else:
+            break
+
+        # A quantified char is optional/repeated, so it does not belong to the prefix
+        if i < len(pattern) and pattern[i] in regex_quantifiers:
+            break
+
+        chars.append(literal)
+
+    return "".join(chars)
+
+
+class LinkPattern(typing.NamedTuple):
+    brand: str
+    type: str
+    pattern: str
+
+
+class LinkMatch(typing.NamedTuple):
+    brand: str
+    type: str
+
+    # Captured properties by object: {"MaterialPackageInstance": {"uuid": "..."}}
+    properties: dict[str, dict[str, str]]
+
+
+def match_properties(match: re.Match) -> dict[str, dict[str, str]]:
+    result = dict()
+    for name, value in match.groupdict().items():
+        if value is None:
+            continue
+
+        object, _, property = name.partition("_")
+        result.setdefault(object, dict())[property] = value
+
+    return result
+
+
+class LinkResolver:
+    def __init__(self, patterns: typing.Iterable[LinkPattern]):
+        self.patterns = list(patterns)
+        self.compiled = []
+
+        # Trie nodes are dicts char -> node, the "" key holds ids of the patterns whose prefix ends at the node
+        self.trie = dict()
+
+        for i, link_pattern in enumerate(self.patterns):
+            try:
+                self.compiled.append(compile_pattern(link_pattern.pattern))
+            except re.error as e:
+                raise ValueError(f"Brand '{link_pattern.brand}': invalid link pattern {link_pattern.pattern!r}: {e}") from e
+
+            node = self.trie
+            for char in literal_prefix(link_pattern.pattern):
+                node = node.setdefault(char, dict())
+
+            node.setdefault("", []).append(i)
+
+    @staticmethod
+    def from_database(root: str):
+        patterns = []
+        for file in database.entity_files(root, {"brand"}):
+            document = load_yaml(file.path)
+            if not isinstance(document, dict):
+                continue
+
+            for link_pattern in document.get("link_patterns", []):
+                patterns.append(LinkPattern(file.slug, link_pattern["type"], link_pattern["pattern"]))
+
+        return LinkResolver(patterns)
+
+    def candidates(self, url: str) -> list[int]:
+        result = []
+        node = self.trie
+        for char in url:
+            result += node.get("", [])
+            node = node.get(char)
+            if node is None:
+                break
+        else:
+            result += node.get("", [])
+
+        # Keep the definition order of the patterns
+        result.sort()
+        return result
+
+    def resolve(self, url: str) -> list[LinkMatch]:
+        result = []
+        for i in self.candidates(url):
+            if match := self.compiled[i].match(url):
+                link_pattern = self.patterns[i]
+                result.append(LinkMatch(link_pattern.brand, link_pattern.type, match_properties(match)))
+
+        return result
+
+    def resolve_many(self, urls: typing.Iterable[str]) -> list[list[LinkMatch]]:
+        # Batches tend to contain the same links repeatedly (scanning the same spools), those are only resolved once
+        resolved = dict()
+        result = []
+        for url in urls:
+            if url not in resolved:
+                resolved[url] = self.resolve(url)
+
+            result.append(resolved[url])
+
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resolves URLs (one per line on stdin) using the brand link_patterns of an openprinttag-database tree")
+    parser.add_argument("database")
+    args = parser.parse_args()
+
+    resolver = LinkResolver.from_database(args.database)
+    urls = [line.strip() for line in sys.stdin if line.strip()]
+
+    unresolved = 0
+    for url, matches in zip(urls, resolver.resolve_many(urls)):
+        unresolved += not matches
+        print(json.dumps({"url": url, "matches": [match._asdict() for match in matches]}, ensure_ascii=False))
+
+    if unresolved:
+        print(f"{unresolved} of {len(urls)} URLs not resolved", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import typing
+import urllib.parse
+
+import yaml
+
+import database
+import gtin
+import opt_uuid
+from yaml_loader import load_yaml
+
+# Local lookup service over a database checkout, for printers and slicers that resolve the same entities over and over.
+# The database is loaded into in-memory indexes (by uuid, by gtin and by kind + slug) and served over HTTP on localhost or a Unix socket:
+#   GET /uuid/<uuid>
+#   GET /gtin/<gtin>
+#   GET /slug/<kind>/<slug>
+#   POST /batch            [{"uuid": ...}, {"gtin": ...}, {"kind": ..., "slug": ...}, ...] -> list of entities (null if not found)
+#   GET /status
+# The checkout is polled for changes and only the changed files are parsed again.
+# A lookup that misses triggers a reload (the entity may have just been added), concurrent requests for the same key share it.
+
+# Misses trigger a reload at most this often (seconds), so that lookups of unknown keys cannot keep the service busy
+miss_reload_interval = 1.0
+
+# Larger request bodies are rejected with 413 (the batches are small JSON lists)
+max_body_size = 4 << 20
+
+
+class Entity(typing.NamedTuple):
+    kind: str
+    uuid: str | None
+    slug: str
+    path: str
+    document: dict
+
+    # GTIN-14 of a material package, None if it has no valid GTIN
+    gtin: int | None = None
+
+    def keys(self):
+        if self.uuid is not None:
+            yield ("uuid", self.uuid)
+
+        yield ("slug", self.kind, self.slug)
+
+        if self.gtin is not None:
+            yield ("gtin", self.gtin)
+
+
+def normalize_gtins(values) -> list[int | None]:
+    # GTIN-14 (check digit verified, see gtin.py) of each value, None where it is not a valid GTIN
+    return [value if value != gtin.invalid else None for value in gtin.normalize(values).tolist()]
+
+
+def normalize_gtin(value):
+    return normalize_gtins([value])[0]
+
+
+def package_gtins(entities: list) -> list[Entity]:
+    # Sets the GTINs of the material packages, normalized in one batch
+    packages = [i for i, entity in enumerate(entities) if entity.kind == "material_package" and "gtin" in entity.document]
+    for i, value in zip(packages, normalize_gtins([entities[i].document["gtin"] for i in packages])):
+        entities[i] = entities[i]._replace(gtin=value)
+
+    return entities
+
+
+def request_key(request: dict):
+    # Lookup key of a batch item / URL, raises ValueError for values of the wrong type
+    for name, types in (("uuid", str), ("gtin", (str, int)), ("kind", str), ("slug", str)):
+        if name in request and (not isinstance(request[name], types) or isinstance(request[name], bool)):
+            raise ValueError(f"Invalid {name} {request[name]!r}")
+
+    if "uuid" in request:
+        parsed = opt_uuid.parse_uuid(request["uuid"])
+        return ("uuid", str(parsed)) if parsed is not None else None
+
+    if "gtin" in request:
+        gtin = normalize_gtin(request["gtin"])
+        return ("gtin", gtin) if gtin is not None else None
+
+    if "slug" in request and request.get("kind") in database.kinds:
+        return ("slug", request["kind"], request["slug"])
+
+    return None
+
+
+class LookupIndex:
+    def __init__(self, root: str):
+        self.root = root
+        self.entities = dict()  # key -> Entity
+        self.files = dict()  # path -> ((mtime_ns, size), Entity)
+        self.encoded = dict()  # path -> JSON of the entity, encoded on the first lookup
+        self.broken = dict()  # path -> signature of the files that failed to parse, they are not parsed again until they change
+
+        # Keeps the brand indexes for deriving the UUIDs of the reloaded files
+        self.deriver = opt_uuid.DatabaseDeriver(root)
+
+    def signature(self, path: str):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self):
+        entities = []
+        for derivation in self.deriver.run():
+            file = derivation.file
+            key = derivation.stored or derivation.derived
+            entities.append(Entity(file.kind, str(key) if key is not None else None, file.slug, file.path, derivation.document))
+
+        for entity in package_gtins(entities):
+            self.add(self.signature(entity.path), entity)
+
+        return len(self.files)
+
+    def add(self, signature, entity: Entity):
+        self.remove(entity.path)
+        self.files[entity.path] = (signature, entity)
+        for key in entity.keys():
+            self.entities[key] = entity
+
+    def remove(self, path: str):
+        if (item := self.files.pop(path, None)) is None:
+            return
+
+        self.encoded.pop(path, None)
+        for key in item[1].keys():
+            # Another file might have taken over the key
+            if self.entities.get(key) is item[1]:
+                del self.entities[key]
+
+    def scan(self):
+        # Changed, new and removed files: [(file, signature, document or None if removed)]
+        # Only stats the files and parses the changed ones, can run in a thread as it does not touch the indexes
+        result = []
+        seen = set()
+        for file in database.entity_files(self.root):
+            seen.add(file.path)
+            signature = self.signature(file.path)
+            if signature is None or (file.path in self.files and self.files[file.path][0] == signature) or self.broken.get(file.path) == signature:
+                continue
+
+            try:
+                document = load_yaml(file.path)
+            except yaml.YAMLError as e:
+                # The last good version (if any) stays in the indexes
+                print(f"Skipping {file.path}: {e}", file=sys.stderr)
+                self.broken[file.path] = signature
+                continue
+
+            self.broken.pop(file.path, None)
+            if isinstance(document, dict):
+                result.append((file, signature, document))
+
+        for path in self.broken.keys() - seen:
+            del self.broken[path]
+
+        for path in self.files.keys() - seen:
+            _, entity = self.files[path]
+            result.append((database.EntityFile(entity.kind, entity.slug, path), None, None))
+
+        return result
+
+    def apply(self, changes):
+        # Brands and materials first, the UUIDs of the other kinds are derived through them
+        changes = sorted(changes, key=lambda change: opt_uuid.derivation_order.index(change[0].kind))
+        index_changed = False
+
+        entities = []
+        for file, signature, document in changes:
+            old = self.files[file.path][1].document if file.path in self.files else None
+            index_changed |= self.deriver.update_index(file.kind, file.slug, old, document)
+
+            if document is None:
+                self.remove(file.path)
+                continue
+
+            stored = opt_uuid.parse_uuid(document["uuid"]) if "uuid" in document else None
+            key = stored or self.deriver.derive(file.kind, document)
+            entities.append((signature, Entity(file.kind, str(key) if key is not None else None, file.slug, file.path, document)))
+
+        for (signature, _), entity in zip(entities, package_gtins([entity for _, entity in entities])):
+            self.add(signature, entity)
+
+        if index_changed:
+            self.derive_again({file.path for file, _, _ in changes})
+
+    def derive_again(self, skip):
+        # A brand or material changed, the UUIDs derived through it (of the files that did not change themselves) have to be derived again
+        rank = {kind: i for i, kind in enumerate(opt_uuid.derivation_order)}
+        for signature, entity in sorted(self.files.values(), key=lambda item: rank[item[1].kind]):
+            if entity.path in skip:
+                continue
+
+            self.deriver.update_index(entity.kind, entity.slug, entity.document, entity.document)
+            if "uuid" not in entity.document:
+                key = self.deriver.derive(entity.kind, entity.document)
+                if (key := str(key) if key is not None else None) != entity.uuid:
+                    self.add(signature, entity._replace(uuid=key))
+
+    def get(self, key):
+        return self.entities.get(key)
+
+    def encode(self, entity: Entity) -> bytes:
+        if (result := self.encoded.get(entity.path)) is None:
+            data = {"kind": entity.kind, "uuid": entity.uuid, "slug": entity.slug, "document": entity.document}
+            result = self.encoded[entity.path] = json.dumps(data, ensure_ascii=False, default=str).encode("utf-8")
+
+        return result
+
+
+class LookupService:
+    def __init__(self, root: str, reload_interval: float = 2.0):
+        self.index = LookupIndex(root)
+        self.reload_interval = reload_interval
+        self.reload_task = None
+        self.last_reload = 0.0
+        self.pending = dict()  # key -> future of an in-flight lookup
+        self.stats = {"requests": 0, "lookups": 0, "hits": 0, "coalesced": 0, "reloads": 0, "reloaded_files": 0}
+
+    async def reload(self):
+        # All the callers during a reload wait for the same one
+        if self.reload_task is None:
+            self.reload_task = asyncio.ensure_future(self.run_reload())
+
+        try:
+            await asyncio.shield(self.reload_task)
+        finally:
+            if self.reload_task is not None and self.reload_task.done():
+                self.reload_task = None
+
+    async def run_reload(self):
+        self.last_reload = time.monotonic()
+        changes = await asyncio.to_thread(self.index.scan)
+
+        # The indexes are only modified in the event loop thread
+        self.index.apply(changes)
+        self.stats["reloads"] += 1
+        self.stats["reloaded_files"] += len(changes)
+        if changes:
+            print(f"Reloaded {len(changes)} files", file=sys.stderr)
+
+    async def try_reload(self):
+        # A failed reload is logged, the service keeps serving the current indexes and tries again on the next one
+        try:
+            await self.reload()
+        except Exception as e:
+            print(f"Reload failed: {e!r}", file=sys.stderr)
+
+    async def reload_loop(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            await self.try_reload()
+
+    async def resolve_miss(self, key):
+        if time.monotonic() - self.last_reload >= miss_reload_interval:
+            await self.try_reload()
+
+        return self.index.get(key)
+
+    async def lookup(self, key):
+        self.stats["lookups"] += 1
+        if key is None:
+            return None
+
+        if (entity := self.index.get(key)) is not None:
+            self.stats["hits"] += 1
+            return entity
+
+        # Concurrent lookups of the same key share the miss (and the reload)
+        if (future := self.pending.get(key)) is not None:
+            self.stats["coalesced"] += 1
+        else:
+            future = self.pending[key] = asyncio.ensure_future(self.resolve_miss(key))
+            future.add_done_callback(lambda _: self.pending.pop(key, None))
+
+        return await asyncio.shield(future)
+
+    async def handle(self, method: str, target: str, body: bytes):
+        # Returns (status, JSON body)
+        path = [urllib.parse.unquote(part) for part in urllib.parse.urlsplit(target).path.strip("/").split("/")]
+
+        match method, path:
+            case "GET", ["uuid", value]:
+                key = request_key({"uuid": value})
+
+            case "GET", ["gtin", value]:
+                key = request_key({"gtin": value})
+
+            case "GET", ["slug", kind, value]:
+                key = request_key({"kind": kind, "slug": value})
+
+            case "POST", ["batch"]:
+                try:
+                    requests = json.loads(body)
+                    assert isinstance(requests, list) and all(isinstance(request, dict) for request in requests)
+                    keys = [request_key(request) for request in requests]
+                except (ValueError, AssertionError):
+                    return 400, b'{"error": "Expected a JSON list of lookups"}'
+
+                entities = await asyncio.gather(*(self.lookup(key) for key in keys))
+                return 200, b"[" + b",".join(self.index.encode(entity) if entity is not None else b"null" for entity in entities) + b"]"
+
+            case "GET", ["status"]:
+                return 200, json.dumps(self.stats | {"files": len(self.index.files)}).encode()
+
+            case _:
+                return 404, b'{"error": "Unknown endpoint"}'
+
+        if (entity := await self.lookup(key)) is None:
+            return 404, b'{"error": "Not found"}'
+
+        return 200, self.index.encode(entity)
+
+    async def respond(self, writer: asyncio.StreamWriter, status: int, response: bytes, keep_alive: bool):
+        head = [
+            f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(response)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        writer.write("\r\n".join(head).encode() + b"\r\n\r\n" + response)
+        await writer.drain()
+
+    async def serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # Minimal HTTP/1.1 with keep-alive
+        try:
+            while request_line := await reader.readline():
+                method, target, version = request_line.decode("latin-1").split()
+
+                headers = dict()
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                self.stats["requests"] += 1
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+                try:
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    length = -1
+
+                if length > max_body_size:
+                    # The body is not read, so the connection cannot be reused
+                    await self.respond(writer, 413, b'{"error": "Request body too large"}', False)
+                    break
+
+                if length < 0:
+                    await self.respond(writer, 400, b'{"error": "Invalid Content-Length"}', False)
+                    break
+
+                body = await reader.readexactly(length)
+                status, response = await self.handle(method, target, body)
+                await self.respond(writer, status, response, keep_alive)
+
+                if not keep_alive:
+                    break
+
+        except (ValueError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765, unix: str | None = None):
+        start = time.perf_counter()
+        count = await asyncio.to_thread(self.index.load)
+        self.last_reload = time.monotonic()
+        print(f"Loaded {count} files in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+
+        if unix is not None:
+            server = await asyncio.start_unix_server(self.serve_connection, unix)
+        else:
+            server = await asyncio.start_server(self.serve_connection, host, port)
+
+        print(f"Listening on {unix or f'http://{host}:{port}'}", file=sys.stderr)
+
+        reload_loop = asyncio.ensure_future(self.reload_loop())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            reload_loop.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local lookup service over an openprinttag-database checkout")
+    parser.add_argument("database", help="Path to the openprinttag-database checkout (or its data directory)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="Listen on a Unix socket instead of TCP")
+    parser.add_argument("--reload-interval", type=float, default=2.0, help="Seconds between checks for changed files")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(LookupService(args.database, args.reload_interval).serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import argparse
+import functools
+import os
+import sys
+
+import database
+from spec import load_spec
+from yaml_loader import load_yaml
+
+# MaterialTag implies/hints graph (data/material_tags.yaml), compiled to integer bitmasks indexed by the tag key.
+# Tag sets are represented as ints with bit `key` set for each tag, so set operations and queries are plain bitwise operations.
+
+
+class TagGraph:
+    def __init__(self, items):
+        # Deprecated tags only keep their key reserved, they do not have a name
+        self.by_name = {item["name"]: item for item in items if "name" in item}
+        self.by_key = {item["key"]: item for item in items}
+        assert len(self.by_key) == len(items), "Duplicate material tag keys"
+
+        def direct_mask(item, field):
+            result = 0
+            for name in item.get(field, ()):
+                if name not in self.by_name:
+                    raise ValueError(f"Tag {item.get('name', item['key'])} {field} unknown tag {name}")
+
+                result |= 1 << self.by_name[name]["key"]
+
+            return result
+
+        self.implies = {key: direct_mask(item, "implies") for key, item in self.by_key.items()}
+        hints = {key: direct_mask(item, "hints") for key, item in self.by_key.items()}
+
+        # Transitive closure of implies (including the tag itself), iterated to a fixed point so that cycles are handled as well
+        self.closure = {key: (1 << key) | mask for key, mask in self.implies.items()}
+        changed = True
+        while changed:
+            changed = False
+            for key, mask in self.closure.items():
+                expanded = mask
+                for implied in self.iter_keys(mask & ~(1 << key)):
+                    expanded |= self.closure[implied]
+
+                if expanded != mask:
+                    self.closure[key] = expanded
+                    changed = True
+
+        # Tags whose presence implies the tag (including the tag itself)
+        self.implied_by = {key: 0 for key in self.by_key}
+        for key, mask in self.closure.items():
+            for implied in self.iter_keys(mask):
+                self.implied_by[implied] |= 1 << key
+
+        # Hints of the tag and of everything it implies, minus what is implied anyway
+        self.hints = dict()
+        for key, mask in self.closure.items():
+            result = 0
+            for implied in self.iter_keys(mask):
+                result |= hints[implied]
+
+            self.hints[key] = result & ~mask
+
+        # Tags that imply each other form a cycle (strongly connected component)
+        cycles = set()
+        for key in self.by_key:
+            members = self.closure[key] & self.implied_by[key]
+            if members != 1 << key:
+                cycles.add(members)
+
+        self.cycles = [self.names(mask) for mask in sorted(cycles)]
+
+    @staticmethod
+    def iter_keys(mask: int):
+        while mask:
+            low = mask & -mask
+            yield low.bit_length() - 1
+            mask ^= low
+
+    def mask(self, names) -> int:
+        result = 0
+        for name in names:
+            result |= 1 << self.by_name[name]["key"]
+
+        return result
+
+    def names(self, mask: int):
+        return [self.by_key[key].get("name", f"deprecated_{key}") for key in self.iter_keys(mask)]
+
+    def expand(self, mask: int) -> int:
+        # Closure of a tag set under implies
+        result = mask
+        for key in self.iter_keys(mask):
+            result |= self.closure[key]
+
+        return result
+
+    def is_closed(self, mask: int):
+        return self.expand(mask) == mask
+
+    def missing_implied(self, mask: int) -> int:
+        return self.expand(mask) & ~mask
+
+    def implying(self, name: str) -> int:
+        # Mask of the tags whose presence implies the tag - for queries like "contains_carbon or any tag implying it": material_mask & implying("contains_carbon")
+        return self.implied_by[self.by_name[name]["key"]]
+
+    def suggested(self, mask: int) -> int:
+        result = 0
+        for key in self.iter_keys(mask):
+            result |= self.hints[key]
+
+        return result & ~self.expand(mask)
+
+    def validate(self, names):
+        # Returns a list of issues of a material tag set
+        issues = [f"Unknown tag {name}" for name in names if name not in self.by_name]
+        if issues:
+            return issues
+
+        mask = self.mask(names)
+        for key in self.iter_keys(mask):
+            if missing := self.closure[key] & ~mask:
+                issues.append(f"{self.names(1 << key)[0]} implies {', '.join(self.names(missing))}")
+
+        return issues
+
+
+@functools.cache
+def load_tag_graph(spec=None):
+    spec = spec or load_spec()
+    return TagGraph(spec.enum("material_tags").items)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Material tag implies/hints closure")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("closure", help="Print the closure of the tags under implies").add_argument("tags", nargs="+")
+    subparsers.add_parser("implying", help="Print the tags implying the tag").add_argument("tag")
+    subparsers.add_parser("cycles", help="Print implies cycles")
+    subparsers.add_parser("check", help="Check that the tags of all the materials in a database are closed under implies").add_argument("database")
+
+    args = parser.parse_args()
+    graph = load_tag_graph()
+
+    match args.command:
+        case "closure":
+            print(" ".join(graph.names(graph.expand(graph.mask(args.tags)))))
+
+        case "implying":
+            print(" ".join(graph.names(graph.implying(args.tag))))
+
+        case "cycles":
+            for cycle in graph.cycles:
+                print(" ".join(cycle))
+
+        case "check":
+            total = 0
+            invalid = 0
+
+            for file in database.entity_files(args.database, {"material"}):
+                document = load_yaml(file.path)
+                tags = document.get("tags", []) if isinstance(document, dict) else []
+                total += 1
+
+                if issues := graph.validate(tags):
+                    invalid += 1
+                    for issue in issues:
+                        print(f"{os.path.relpath(file.path, args.database)}: {issue}")
+
+            print(f"Checked {total} materials, {invalid} with issues", file=sys.stderr)
+            sys.exit(1 if invalid else 0)
+
+
+if __name__ == "__main__":
+    main()
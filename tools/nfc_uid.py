@@ -0,0 +1,145 @@
+import argparse
+import functools
+import json
+import sys
+import typing
+import uuid
+
+import opt_uuid
+from yaml_loader import load_yaml
+
+# NFCV (ISO 15693) UIDs are 8 bytes long and start with 0xE0, see docs_src/markdown/uuid.md
+nfcv_uid_length = 8
+nfcv_uid_prefix = 0xE0
+
+hex_separators = str.maketrans("", "", ":- ._")
+
+
+def normalize_uid(raw: bytes | bytearray | memoryview | str | int):
+    # Canonicalizes a NFCV tag UID as reported by various readers/apps to the 8 byte MSB-first form (0xE0 first).
+    # Accepts bytestreams and hex strings (with or without separators or the 0x prefix) in either byte order, and integers.
+    if isinstance(raw, str):
+        text = raw.strip().lower().removeprefix("0x").translate(hex_separators)
+        try:
+            data = bytes.fromhex(text)
+        except ValueError:
+            raise ValueError(f"Invalid NFC tag UID {raw!r}: not a hex string") from None
+
+    elif isinstance(raw, int):
+        if not 0 <= raw < (1 << (8 * nfcv_uid_length)):
+            raise ValueError(f"Invalid NFC tag UID {raw!r}: out of range")
+
+        data = raw.to_bytes(nfcv_uid_length, "big")
+
+    else:
+        data = bytes(raw)
+
+    if len(data) != nfcv_uid_length:
+        raise ValueError(f"Invalid NFC tag UID {raw!r}: expected {nfcv_uid_length} bytes, got {len(data)}")
+
+    if data[0] == nfcv_uid_prefix:
+        return data
+
+    # LSB-first byte order (as reported by Android, for example)
+    if data[-1] == nfcv_uid_prefix:
+        return data[::-1]
+
+    raise ValueError(f"Invalid NFC tag UID {raw!r}: NFCV UIDs start with 0x{nfcv_uid_prefix:02X}")
+
+
+class Resolution(typing.NamedTuple):
+    raw: typing.Any
+
+    # None if the raw UID could not be normalized
+    instance_uuid: uuid.UUID | None
+
+    # None if there is no record for the instance
+    record: dict | None
+
+    error: str | None = None
+
+
+class InstanceIndex:
+    # Maps MaterialPackageInstance UUIDs to records and resolves raw scanned tag UIDs to them.
+    # Recently seen raw UIDs are kept in a bounded LRU cache, so that repeated scans of the same tag are not normalized and hashed again.
+
+    def __init__(self, records: typing.Iterable[dict] = (), cache_size: int = 65536):
+        self.records = dict()
+        self.cached_instance_uuid = functools.lru_cache(maxsize=cache_size)(self._instance_uuid)
+
+        for record in records:
+            self.add(record)
+
+    @staticmethod
+    def _instance_uuid(raw):
+        return opt_uuid.material_package_instance_uuid(normalize_uid(raw))
+
+    def instance_uuid(self, raw):
+        # bytearray and memoryview are not hashable, they are cached as bytes
+        if isinstance(raw, (bytearray, memoryview)):
+            raw = bytes(raw)
+
+        return self.cached_instance_uuid(raw)
+
+    def add(self, record: dict):
+        # The record is indexed by its uuid, or by the UUID derived from its NFC tag UID
+        if "uuid" in record:
+            key = uuid.UUID(str(record["uuid"]))
+        elif "nfc_tag_uid" in record:
+            key = self.instance_uuid(record["nfc_tag_uid"])
+        else:
+            raise ValueError(f"Record {record!r} has neither uuid nor nfc_tag_uid")
+
+        self.records[key] = record
+        return key
+
+    def lookup(self, raw_uid):
+        return self.records.get(self.instance_uuid(raw_uid))
+
+    def resolve(self, raw_uids: typing.Iterable):
+        # Batch resolution, invalid UIDs are reported in the result instead of raising
+        result = []
+        records = self.records
+        instance_uuid = self.instance_uuid
+
+        for raw in raw_uids:
+            try:
+                key = instance_uuid(raw)
+            except ValueError as e:
+                result.append(Resolution(raw, None, None, str(e)))
+                continue
+
+            result.append(Resolution(raw, key, records.get(key)))
+
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resolves scanned NFC tag UIDs (one per line on stdin) to MaterialPackageInstance records")
+    parser.add_argument("records", nargs="?", help="YAML/JSON file with a list of MaterialPackageInstance records (with uuid or nfc_tag_uid)")
+    parser.add_argument("--batch-size", type=int, default=4096)
+    args = parser.parse_args()
+
+    index = InstanceIndex(load_yaml(args.records) if args.records else ())
+
+    def flush(batch):
+        for r in index.resolve(batch):
+            if r.error:
+                print(f"{r.raw}\t-\t{r.error}")
+            else:
+                print(f"{r.raw}\t{r.instance_uuid}\t{json.dumps(r.record, default=str) if r.record is not None else '-'}")
+
+    batch = []
+    for line in sys.stdin:
+        if line := line.strip():
+            batch.append(line)
+
+        if len(batch) >= args.batch_size:
+            flush(batch)
+            batch = []
+
+    flush(batch)
+
+
+if __name__ == "__main__":
+    main()
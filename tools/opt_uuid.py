@@ -0,0 +1,261 @@
+import argparse
+import hashlib
+import os
+import sys
+import typing
+import uuid
+
+import database
+from yaml_loader import load_yaml
+
+# UUID derivation as specified in docs_src/markdown/uuid.md
+brand_namespace = uuid.UUID("5269dfb7-1559-440a-85be-aba5f3eff2d2")
+material_namespace = uuid.UUID("616fc86d-7d99-4953-96c7-46d2836b9be9")
+container_namespace = uuid.UUID("1b2624e1-4e98-4fcb-a69e-e3188b01df84")
+material_package_namespace = uuid.UUID("6f7d485e-db8d-4979-904e-a231cd6602b2")
+material_package_instance_namespace = uuid.UUID("31062f81-b5bd-4f86-a5f8-46367e841508")
+
+# Brands first, the other UUIDs are derived from them. Material packages need the material -> brand mapping.
+derivation_order = ("brand", "material", "material_container", "material_package")
+
+
+def generate_uuid(namespace: uuid.UUID, *args: bytes):
+    # UUIDv5 over binary data (uuid.uuid5 only accepts bytes since Python 3.12)
+    digest = hashlib.sha1(namespace.bytes + b"".join(args)).digest()
+    return uuid.UUID(bytes=digest[:16], version=5)
+
+
+def encode(value: str | int | float):
+    # Strings are encoded as UTF-8, numbers as decimal strings
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+
+    return str(value).encode("utf-8")
+
+
+def brand_uuid(brand_name: str):
+    return generate_uuid(brand_namespace, encode(brand_name))
+
+
+def material_uuid(brand_uuid: uuid.UUID, material_name: str):
+    return generate_uuid(material_namespace, brand_uuid.bytes, encode(material_name))
+
+
+def container_uuid(brand_uuid: uuid.UUID, container_name: str):
+    return generate_uuid(container_namespace, brand_uuid.bytes, encode(container_name))
+
+
+def material_package_uuid(brand_uuid: uuid.UUID, gtin: str | int):
+    return generate_uuid(material_package_namespace, brand_uuid.bytes, encode(gtin))
+
+
+def material_package_instance_uuid(nfc_tag_uid: bytes):
+    return generate_uuid(material_package_instance_namespace, nfc_tag_uid)
+
+
+class Derivation(typing.NamedTuple):
+    file: database.EntityFile
+
+    # UUID stored in the entity file, None if not present
+    stored: uuid.UUID | None
+
+    # None if the UUID cannot be derived (missing name/gtin/brand)
+    derived: uuid.UUID | None
+
+    # Parsed entity file, so that the consumers do not have to load it again
+    document: dict
+
+    @property
+    def mismatch(self):
+        return self.stored is not None and self.derived is not None and self.stored != self.derived
+
+
+def parse_uuid(value):
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+
+class DatabaseDeriver:
+    # Derives UUIDs for a whole database in a single streaming pass.
+    # Only small slug/uuid -> brand UUID indexes are kept in memory, brand UUIDs are derived once per brand.
+
+    def __init__(self, root: str):
+        self.root = root
+        self.brand_uuids = dict()  # Brand slug/uuid string -> Brand::uuid
+        self.material_brands = dict()  # Material slug/uuid string -> Brand::uuid
+
+    def brand_uuid_by_name(self, name: str):
+        if (result := self.brand_uuids.get(("name", name))) is None:
+            result = self.brand_uuids[("name", name)] = brand_uuid(name)
+
+        return result
+
+    def resolve_brand(self, ref):
+        # Brand reference - inline object, slug reference or uuid reference
+        if not isinstance(ref, dict):
+            return None
+
+        if "uuid" in ref:
+            return parse_uuid(ref["uuid"])
+
+        if "slug" in ref and "name" not in ref:
+            return self.brand_uuids.get(("slug", ref["slug"]))
+
+        if "name" in ref:
+            return self.brand_uuid_by_name(ref["name"])
+
+        return None
+
+    def resolve_material_brand(self, ref):
+        if not isinstance(ref, dict):
+            return None
+
+        if "brand" in ref:
+            # Inline material
+            return self.resolve_brand(ref["brand"])
+
+        for key in ("uuid", "slug"):
+            if key in ref and (result := self.material_brands.get((key, str(ref[key])))) is not None:
+                return result
+
+        return None
+
+    def derive(self, kind: str, document: dict):
+        name = document.get("name")
+
+        match kind:
+            case "brand":
+                return self.brand_uuid_by_name(name) if name is not None else None
+
+            case "material":
+                brand = self.resolve_brand(document.get("brand"))
+                return material_uuid(brand, name) if brand is not None and name is not None else None
+
+            case "material_container":
+                brand = self.resolve_brand(document.get("brand"))
+                return container_uuid(brand, name) if brand is not None and name is not None else None
+
+            case "material_package":
+                brand = self.resolve_material_brand(document.get("material"))
+                gtin = document.get("gtin")
+                return material_package_uuid(brand, gtin) if brand is not None and gtin is not None else None
+
+        return None
+
+    def process(self, kind: str):
+        for file in database.entity_files(self.root, {kind}):
+            document = load_yaml(file.path)
+            if not isinstance(document, dict):
+                continue
+
+            stored = parse_uuid(document["uuid"]) if "uuid" in document else None
+            derived = self.derive(kind, document)
+
+            # Index what the later kinds refer to
+            self.update_index(kind, file.slug, None, document)
+
+            yield Derivation(file, stored, derived, document)
+
+    def index_entries(self, kind: str, slug: str, document: dict):
+        # Entries of the brand/material index for the entity: {(slug|uuid, value): Brand::uuid}
+        stored = parse_uuid(document["uuid"]) if "uuid" in document else None
+        brand = (stored or self.derive(kind, document)) if kind == "brand" else self.resolve_brand(document.get("brand"))
+
+        result = {("slug", slug): brand}
+        if stored is not None:
+            result[("uuid", str(stored))] = brand
+
+        return result
+
+    def update_index(self, kind: str, slug: str, old: dict | None, new: dict | None):
+        # Replaces the index entries of a brand or material (old is None for an added file, new for a removed one).
+        # Returns whether the entries changed, the UUIDs derived through them may have changed as well.
+        if kind not in ("brand", "material"):
+            return False
+
+        index = self.brand_uuids if kind == "brand" else self.material_brands
+        previous = {key: index.pop(key, None) for key in self.index_entries(kind, slug, old)} if old is not None else dict()
+        entries = self.index_entries(kind, slug, new) if new is not None else dict()
+        index.update(entries)
+
+        return previous != entries
+
+    def run(self):
+        for kind in derivation_order:
+            yield from self.process(kind)
+
+
+def derive_database(root: str):
+    return DatabaseDeriver(root).run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Derives OpenPrintTag UUIDs (see docs_src/markdown/uuid.md)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("brand", help="Derive Brand::uuid").add_argument("name")
+
+    for command in ("material", "container"):
+        p = subparsers.add_parser(command, help=f"Derive {command.capitalize()}::uuid")
+        p.add_argument("brand_uuid", type=uuid.UUID)
+        p.add_argument("name")
+
+    p = subparsers.add_parser("package", help="Derive MaterialPackage::uuid")
+    p.add_argument("brand_uuid", type=uuid.UUID)
+    p.add_argument("gtin")
+
+    p = subparsers.add_parser("instance", help="Derive MaterialPackageInstance::uuid")
+    p.add_argument("nfc_tag_uid", help="NFC tag UID as a hex string, MSB first")
+
+    p = subparsers.add_parser("derive", help="Derive UUIDs of all the entities in a database")
+    p.add_argument("database")
+
+    p = subparsers.add_parser("verify", help="Report database entities whose stored UUID differs from the derived one")
+    p.add_argument("database")
+    p.add_argument("--missing", action="store_true", help="Also report entities without a stored UUID")
+
+    args = parser.parse_args()
+
+    match args.command:
+        case "brand":
+            print(brand_uuid(args.name))
+
+        case "material":
+            print(material_uuid(args.brand_uuid, args.name))
+
+        case "container":
+            print(container_uuid(args.brand_uuid, args.name))
+
+        case "package":
+            print(material_package_uuid(args.brand_uuid, args.gtin))
+
+        case "instance":
+            print(material_package_instance_uuid(bytes.fromhex(args.nfc_tag_uid)))
+
+        case "derive":
+            for d in derive_database(args.database):
+                print(f"{os.path.relpath(d.file.path, args.database)}\t{d.derived if d.derived is not None else '-'}")
+
+        case "verify":
+            total = 0
+            mismatches = 0
+
+            for d in derive_database(args.database):
+                total += 1
+                rel_path = os.path.relpath(d.file.path, args.database)
+
+                if d.mismatch:
+                    mismatches += 1
+                    print(f"{rel_path}: stored {d.stored}, derived {d.derived}")
+
+                elif args.missing and d.stored is None:
+                    print(f"{rel_path}: no stored uuid, derived {d.derived if d.derived is not None else '-'}")
+
+            print(f"Checked {total} entities, {mismatches} mismatches", file=sys.stderr)
+            sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
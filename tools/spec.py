@@ -0,0 +1,183 @@
+import dataclasses
+import functools
+import os
+import types
+import typing
+
+import tracing
+from yaml_loader import load_yaml
+
+root_dir = os.path.abspath(os.path.dirname(__file__) + "/../")
+default_data_dir = f"{root_dir}/data"
+
+
+def freeze(data):
+    # Read-only view of parsed yaml data, so that the shared model cannot be modified by its consumers
+    match data:
+        case dict():
+            return types.MappingProxyType({key: freeze(value) for key, value in data.items()})
+
+        case list():
+            return tuple(freeze(value) for value in data)
+
+        case _:
+            return data
+
+
+def join_description(description):
+    if isinstance(description, (list, tuple)):
+        return "\n".join(description)
+
+    return description or ""
+
+
+class Record:
+    attrs: typing.Mapping
+
+    def get(self, key, default=None):
+        return self.attrs.get(key, default)
+
+    def __getitem__(self, key):
+        return self.attrs[key]
+
+    def __contains__(self, key):
+        return key in self.attrs
+
+
+@dataclasses.dataclass(frozen=True, eq=False)
+class Field(Record):
+    name: str
+    type: str | None
+
+    # Name of the entity that declares the field
+    entity: str
+
+    attrs: typing.Mapping
+
+    @property
+    def description(self):
+        return join_description(self.attrs.get("description"))
+
+    @property
+    def is_function(self):
+        return "(" in self.name
+
+
+@dataclasses.dataclass(frozen=True, eq=False)
+class Entity(Record):
+    name: str
+
+    # Basename of the yaml file the entity is defined in, without the suffix
+    file: str
+
+    inherits: str | None
+
+    # Fields declared directly on the entity
+    fields: tuple[Field, ...]
+
+    # Resolved inheritance chain, nearest parent first
+    ancestors: tuple[str, ...]
+
+    # Inherited fields (most generic first) followed by the entity's own fields
+    all_fields: tuple[Field, ...]
+
+    attrs: typing.Mapping
+
+    @functools.cached_property
+    def fields_by_name(self):
+        return types.MappingProxyType({field.name: field for field in self.all_fields})
+
+    @property
+    def description(self):
+        return join_description(self.attrs.get("description"))
+
+    @property
+    def is_enum(self):
+        # Enum entities either have no fields or describe the enum items, identified by a primary key (MaterialPhoto has an enum_file, but it is an object)
+        return "enum_file" in self.attrs and (not self.fields or any(field.get("primary_key", False) for field in self.fields))
+
+
+@dataclasses.dataclass(frozen=True, eq=False)
+class Enum:
+    # Basename of the yaml file, without the suffix
+    name: str
+
+    items: tuple[typing.Mapping, ...]
+
+    def index(self, key_item="name"):
+        return types.MappingProxyType({item[key_item]: item for item in self.items if key_item in item})
+
+
+class Spec:
+    def __init__(self, data_dir=default_data_dir):
+        self.data_dir = data_dir
+        self.files = dict()
+        self.enums = dict()
+        self.entities = dict()
+
+        entity_yamls = dict()
+
+        for file in sorted(os.listdir(data_dir)):
+            if not file.endswith(".yaml"):
+                continue
+
+            name = file.removesuffix(".yaml")
+            self.files[name] = data = freeze(load_yaml(os.path.join(data_dir, file)))
+
+            if isinstance(data, typing.Mapping):
+                for item in data["objects"]:
+                    assert item["name"] not in entity_yamls, f"Duplicate entity {item['name']}"
+                    entity_yamls[item["name"]] = (name, item)
+
+            elif isinstance(data, tuple):
+                self.enums[name] = Enum(name, data)
+
+            else:
+                assert False, f"Unexpected content of {file}"
+
+        def resolve(name, chain=()):
+            if name in self.entities:
+                return self.entities[name]
+
+            assert name not in chain, f"Inheritance cycle: {' -> '.join(chain + (name,))}"
+            assert name in entity_yamls, f"Unknown entity {name}"
+
+            file, item = entity_yamls[name]
+            fields = tuple(Field(field["name"], field.get("type"), name, field) for field in item.get("fields", ()))
+
+            ancestors = ()
+            inherited_fields = ()
+            if parent_name := item.get("inherits"):
+                parent = resolve(parent_name, chain + (name,))
+                ancestors = (parent_name,) + parent.ancestors
+                inherited_fields = parent.all_fields
+
+            entity = Entity(name, file, item.get("inherits"), fields, ancestors, inherited_fields + fields, item)
+            self.entities[name] = entity
+            return entity
+
+        for name in entity_yamls:
+            resolve(name)
+
+        # Keep the definition order
+        self.entities = {name: self.entities[name] for name in entity_yamls}
+
+    def entity(self, name: str) -> Entity:
+        return self.entities[name]
+
+    def with_subclasses(self, name: str) -> tuple[Entity, ...]:
+        # The entity and all the entities inheriting from it, in the definition order
+        return tuple(entity for entity in self.entities.values() if entity.name == name or name in entity.ancestors)
+
+    def enum(self, name: str) -> Enum:
+        return self.enums[name.removesuffix(".yaml")]
+
+    def file_entities(self, file: str):
+        file = file.removesuffix(".yaml")
+        return tuple(entity for entity in self.entities.values() if entity.file == file)
+
+
+@functools.cache
+@tracing.traced("load_spec", "spec")
+def load_spec(data_dir=default_data_dir):
+    return Spec(data_dir)
@@ -0,0 +1,323 @@
+import argparse
+import os
+import random
+import re
+import shutil
+import sys
+import time
+
+import yaml
+
+import opt_uuid
+from material_tags import load_tag_graph
+from spec import load_spec
+from yaml_loader import Dumper
+
+# Seeded generator of synthetic openprinttag-database trees, for tests and benchmarks.
+# Field values are derived from the spec (data/*.yaml): field types, enums, min/max ranges and examples.
+# UUIDs are derived as specified in uuid.md and all references resolve, so the result passes validate_db, integrity and opt_uuid verify.
+
+kind_directories = {
+    "brand": "brands",
+    "material": "materials",
+    "material_container": "material-containers",
+    "material_package": "material-packages",
+}
+
+# Enums that are stored by another item than the name (see schema/generate_db_schema.py)
+enum_name_items = {
+    "FFFMaterialType": "abbreviation",
+    "Country": "code",
+}
+
+# Enum types without an entity of their own
+enum_files = {
+    "MaterialPhotoType": "material_photo_types",
+}
+
+# Entities that are referenced ({slug: ...}) and not inlined
+reference_types = {"Brand", "Material", "MaterialContainer", "SLAMaterialContainerConnector"}
+
+material_classes = ["FFF", "SLA"]
+
+words = ["Galaxy", "Jet", "Silk", "Matte", "Pearl", "Lava", "Ocean", "Forest", "Arctic", "Neon", "Carbon", "Marble", "Sunset", "Urban", "Royal", "Pastel"]
+colors = ["Black", "White", "Red", "Blue", "Green", "Yellow", "Orange", "Purple", "Grey", "Silver", "Gold", "Pink", "Brown", "Transparent"]
+
+
+def slugify(text: str):
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+def gtin13(number: int):
+    # 12 digits + GS1 check digit
+    digits = f"{number:012d}"
+    check = (10 - sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits)) % 10) % 10
+    return int(digits + str(check))
+
+
+class SyntheticDatabase:
+    def __init__(self, root: str, seed: int = 0, optional_probability: float = 0.5, spec=None):
+        self.root = root
+        self.rng = random.Random(seed)
+        self.optional_probability = optional_probability
+        self.spec = spec or load_spec()
+        self.counts = {kind: 0 for kind in kind_directories}
+
+        # Only what the later kinds refer to is kept in memory
+        self.brands = []  # (slug, uuid)
+        self.materials = []  # (slug, brand index, class)
+        self.containers = {cls: [] for cls in material_classes}  # class -> slugs
+
+    def entity(self, type: str, cls: str | None):
+        # Class-specific variant of the entity if there is one (Material -> FFFMaterial, MaterialProperties -> FFFMaterialProperties)
+        for name in (f"{cls}{type}", type):
+            if name in self.spec.entities:
+                return self.spec.entities[name]
+
+        return None
+
+    def enum_value(self, type: str):
+        enum_file = enum_files.get(type) or self.spec.entity(type)["enum_file"]
+        items = [item for item in self.spec.enum(enum_file).items if not item.get("deprecated", False)]
+        return self.rng.choice(items)[enum_name_items.get(type, "name")]
+
+    def string_value(self, field):
+        example = field.get("example")
+        if isinstance(example, str):
+            example = example.strip("`")
+
+        max_length = field.get("max_length", 64)
+        pattern = field.get("opt_db_regex")
+
+        if isinstance(example, str) and len(example) <= max_length and (pattern is None or re.search(pattern, example)):
+            if field.name.endswith("url") or self.rng.random() < 0.5:
+                return example
+
+        if pattern is not None:
+            return None
+
+        return f"{field.name}-{self.rng.randrange(10**6)}"[:max_length]
+
+    def number_value(self, field, type):
+        minimum = field.get("min", 0 if type == "uint" else None)
+        maximum = field.get("max")
+        example = field.get("example")
+
+        if minimum is None and maximum is None and isinstance(example, (int, float)) and not isinstance(example, bool):
+            minimum, maximum = 0, 2 * abs(example) or 1000
+
+        minimum = 0 if minimum is None else minimum
+        maximum = minimum + 1000 if maximum is None else maximum
+
+        if type in ("int", "uint"):
+            return self.rng.randint(int(minimum), int(maximum))
+
+        return min(max(round(self.rng.uniform(minimum, maximum), 2), minimum), maximum)
+
+    def type_value(self, type: str, field, cls: str, refs: dict):
+        match type:
+            case "string":
+                return self.string_value(field)
+
+            case "number" | "int" | "uint":
+                return self.number_value(field, type)
+
+            case "bool":
+                return self.rng.random() < 0.5
+
+            case "color_rgba":
+                return f"#{self.rng.getrandbits(24):06x}" + ("ff" if self.rng.random() < 0.5 else "")
+
+            case "color_lab":
+                return [round(self.rng.uniform(0, 100), 2), round(self.rng.uniform(-128, 128), 2), round(self.rng.uniform(-128, 128), 2)]
+
+            case "MaterialClass":
+                return cls
+
+        if type in reference_types:
+            return refs.get(type)
+
+        if type in enum_files:
+            return self.enum_value(type)
+
+        entity = self.entity(type, cls)
+        if entity is None:
+            # Types without an obvious synthetic value (timestamps, signatures, ...) are left out
+            return None
+
+        if entity.is_enum:
+            return self.enum_value(type)
+
+        return self.document(entity, cls, refs)
+
+    def field_value(self, field, cls: str, refs: dict):
+        if match := re.fullmatch(r"(set|list)\((.+)\)", field.type):
+            values = []
+            for _ in range(self.rng.randint(1, 3)):
+                value = self.type_value(match[2], field, cls, refs)
+                if value is not None and not (match[1] == "set" and value in values):
+                    values.append(value)
+
+            if match[2] == "MaterialTag" and values:
+                # Material tags have to be closed under implies (material_tags.py check)
+                tag_graph = load_tag_graph(self.spec)
+                values = tag_graph.names(tag_graph.expand(tag_graph.mask(values)))
+
+            return values or None
+
+        return self.type_value(field.type, field, cls, refs)
+
+    def document(self, entity, cls: str, refs: dict, overrides: dict = {}):
+        result = dict()
+        for field in entity.all_fields:
+            if field.is_function or not field.get("in_opt_db", True) or field.type is None:
+                continue
+
+            required = field.get("required_in_opt_db", False) is True
+
+            if field.name in overrides:
+                value = overrides[field.name]
+            elif field.type == "UUID":
+                continue
+            elif required or self.rng.random() < self.optional_probability:
+                value = self.field_value(field, cls, refs)
+            else:
+                continue
+
+            assert value is not None or not required, f"Cannot generate required field {entity.name}::{field.name}"
+            if value is not None:
+                result[field.name] = value
+
+        return result
+
+    def write(self, kind: str, path: str, document: dict):
+        path = f"{self.root}/data/{kind_directories[kind]}/{path}.yaml"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            yaml.dump(document, f, Dumper=Dumper, sort_keys=False, allow_unicode=True)
+
+        self.counts[kind] += 1
+
+    def add_brand(self, i: int):
+        name = f"{self.rng.choice(words)} {self.rng.choice(words)} Filaments {i}"
+        slug = slugify(name)
+        uuid = opt_uuid.brand_uuid(name)
+
+        document = {"uuid": str(uuid), "slug": slug}
+        document |= self.document(self.spec.entity("Brand"), None, {"Brand": {"slug": slug}}, {"name": name})
+
+        self.brands.append((slug, uuid))
+        self.write("brand", slug, document)
+
+    def add_material(self, i: int):
+        brand_index = self.rng.randrange(len(self.brands))
+        brand_slug, brand_uuid = self.brands[brand_index]
+        cls = self.rng.choices(material_classes, weights=[4, 1])[0]
+
+        name = f"{self.rng.choice(words)} {self.rng.choice(colors)} {i}"
+        slug = f"{brand_slug}-{slugify(name)}"
+        overrides = {"name": name, "class": cls}
+        if cls == "FFF":
+            overrides["abbreviation"] = overrides["type"] = self.enum_value("FFFMaterialType")
+        else:
+            overrides["abbreviation"] = "RESIN"
+
+        document = {"uuid": str(opt_uuid.material_uuid(brand_uuid, name)), "slug": slug}
+        document |= self.document(self.entity("Material", cls), cls, {"Brand": {"slug": brand_slug}}, overrides)
+
+        self.materials.append((slug, brand_index, cls))
+        self.write("material", f"{brand_slug}/{slug}", document)
+
+    def add_container(self, i: int):
+        brand_slug, brand_uuid = self.rng.choice(self.brands)
+        cls = material_classes[i % len(material_classes)]
+
+        # The brand is optional, but the UUID is derived from it
+        name = f"{brand_slug} {cls} container {i}"
+        slug = slugify(name)
+
+        document = {"uuid": str(opt_uuid.container_uuid(brand_uuid, name)), "slug": slug}
+        document |= self.document(self.entity("MaterialContainer", cls), cls, {}, {"brand": {"slug": brand_slug}, "name": name, "class": cls})
+
+        self.containers[cls].append(slug)
+        self.write("material_container", slug, document)
+
+    def add_package(self, i: int):
+        material_slug, brand_index, cls = self.rng.choice(self.materials)
+        brand_slug, brand_uuid = self.brands[brand_index]
+        gtin = gtin13(200000000000 + i)
+
+        refs = {"Material": {"slug": material_slug}}
+        if self.containers[cls]:
+            refs["MaterialContainer"] = {"slug": self.rng.choice(self.containers[cls])}
+
+        slug = f"{material_slug}-{i}"
+        document = {"uuid": str(opt_uuid.material_package_uuid(brand_uuid, gtin)), "slug": slug}
+        document |= self.document(self.entity("MaterialPackage", cls), cls, refs, {"class": cls, "gtin": gtin, "material": refs["Material"]})
+
+        self.write("material_package", f"{brand_slug}/{slug}", document)
+
+    def generate(self, brands: int, materials: int, containers: int, packages: int):
+        assert brands > 0 or materials == packages == 0, "Materials need brands"
+        assert materials > 0 or packages == 0, "Packages need materials"
+
+        for i in range(brands):
+            self.add_brand(i)
+
+        for i in range(materials):
+            self.add_material(i)
+
+        for i in range(containers):
+            self.add_container(i)
+
+        for i in range(packages):
+            self.add_package(i)
+
+        return self.counts
+
+
+def default_counts(size: int):
+    # Proportions roughly following the real database, size is the number of materials
+    return {
+        "brands": max(1, size // 20),
+        "materials": size,
+        "containers": max(2, size // 10),
+        "packages": 2 * size,
+    }
+
+
+def generate_database(root: str, size: int = 1000, seed: int = 0, **counts):
+    return SyntheticDatabase(root, seed).generate(**(default_counts(size) | counts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generates a synthetic openprinttag-database tree from the spec")
+    parser.add_argument("output")
+    parser.add_argument("--size", type=int, default=1000, help="Number of materials, the other counts are derived from it unless specified")
+    parser.add_argument("--brands", type=int)
+    parser.add_argument("--materials", type=int)
+    parser.add_argument("--containers", type=int)
+    parser.add_argument("--packages", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--optional-probability", type=float, default=0.5, help="Probability of filling an optional field")
+    parser.add_argument("--overwrite", action="store_true", help="Remove the output directory first if it is not empty")
+    args = parser.parse_args()
+
+    # Files of a previous run would be mixed into the result
+    if os.path.isdir(args.output) and os.listdir(args.output):
+        if not args.overwrite:
+            print(f"Error: {args.output} is not empty, pass --overwrite to replace it", file=sys.stderr)
+            sys.exit(1)
+
+        shutil.rmtree(args.output)
+
+    counts = default_counts(args.size)
+    counts |= {key: value for key in counts if (value := getattr(args, key)) is not None}
+
+    start = time.perf_counter()
+    result = SyntheticDatabase(args.output, args.seed, args.optional_probability).generate(**counts)
+    print(f"Generated {', '.join(f'{count} {kind}s' for kind, count in result.items())} in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
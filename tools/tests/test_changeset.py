@@ -0,0 +1,101 @@
+from pathlib import Path
+import os
+import shutil
+import sys
+import tempfile
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from changeset import apply, ChangesetError, database_hash, diff, format_hash, load_entities  # noqa: E402
+from export_sqlite import export_snapshot  # noqa: E402
+from synthetic_db import SyntheticDatabase  # noqa: E402
+from yaml_loader import Dumper, load_yaml  # noqa: E402
+
+with tempfile.TemporaryDirectory() as root:
+    base, target, local = (os.path.join(root, name) for name in ("base", "target", "local"))
+    SyntheticDatabase(base, 3).generate(brands=3, materials=20, containers=4, packages=40)
+    shutil.copytree(base, target)
+    shutil.copytree(base, local)
+
+    # Change a material, remove a package and move another one
+    material = next(Path(target, "data/materials").rglob("*.yaml"))
+    document = load_yaml(str(material))
+    document["name"] += " v2"
+    document.pop("abbreviation")
+    with open(material, "w") as f:
+        yaml.dump(document, f, Dumper=Dumper, sort_keys=False)
+
+    packages = sorted(Path(target, "data/material-packages").rglob("*.yaml"))
+    os.remove(packages[0])
+    os.rename(packages[1], packages[1].with_name("moved.yaml"))
+
+    # Add a brand
+    with open(Path(target, "data/brands/new-brand.yaml"), "w") as f:
+        yaml.dump({"uuid": "9d6d3a58-2bc1-4c3a-9b5a-6d4b5f5a2c11", "slug": "new-brand", "name": "New Brand"}, f, Dumper=Dumper)
+
+    changeset = diff(load_entities(base), load_entities(target))
+    assert [change["op"] for change in changeset["changes"]] == ["add", "change", "change", "remove"], changeset["changes"]
+    assert changeset["changes"][1]["set"] == {"name": document["name"]} and changeset["changes"][1]["unset"] == ["abbreviation"]
+
+    # Snapshots diff the same way as checkouts
+    export_snapshot(target, os.path.join(root, "target.sqlite"))
+    assert diff(load_entities(base), load_entities(os.path.join(root, "target.sqlite")))["target"] == changeset["target"]
+
+    # A changeset for another version is rejected without touching the checkout
+    try:
+        apply(local, changeset, base_hash=changeset["target"])
+        assert False
+    except ChangesetError:
+        pass
+
+    result = apply(local, changeset)
+    assert result == changeset["target"] == format_hash(database_hash(load_entities(target)))
+    assert format_hash(database_hash(load_entities(local))) == result
+
+    # Applying again fails, the checkout is not the base anymore
+    try:
+        apply(local, changeset, base_hash=changeset["base"])
+        assert False
+    except ChangesetError:
+        pass
+
+
+def check_apply(base, target, local):
+    # Applies the base -> target changeset to a copy of base and checks the result against target
+    shutil.copytree(base, local)
+    changeset = diff(load_entities(base), load_entities(target))
+    result = apply(local, changeset)
+    assert result == format_hash(database_hash(load_entities(local))) == format_hash(database_hash(load_entities(target)))
+    assert sorted(path.relative_to(local) for path in Path(local).rglob("*.yaml")) == sorted(path.relative_to(target) for path in Path(target).rglob("*.yaml"))
+    return changeset
+
+
+with tempfile.TemporaryDirectory() as root:
+    base, target = os.path.join(root, "base"), os.path.join(root, "target")
+    SyntheticDatabase(base, 6).generate(brands=2, materials=4, containers=2, packages=6)
+    packages = sorted(Path(base, "data/material-packages").rglob("*.yaml"))
+
+    # Package A moves to the path of package B, which is removed in the same changeset
+    shutil.copytree(base, target)
+    a, b = (Path(target, path.relative_to(base)) for path in packages[:2])
+    os.replace(a, a.with_name("a.yaml"))
+    os.replace(a.with_name("a.yaml"), b.parent / "moved.yaml")
+    os.remove(b)
+    os.replace(b.parent / "moved.yaml", b)
+    changeset = check_apply(base, target, os.path.join(root, "local-move"))
+    assert sorted(change["op"] for change in changeset["changes"]) == ["change", "remove"]
+
+    # The entity at a path is replaced by another one (a different uuid)
+    shutil.rmtree(target)
+    shutil.copytree(base, target)
+    path = Path(target, packages[2].relative_to(base))
+    document = load_yaml(str(path))
+    document["uuid"] = "0f8fad5b-d9cb-469f-a165-70867728950e"
+    with open(path, "w") as f:
+        yaml.dump(document, f, Dumper=Dumper, sort_keys=False)
+
+    changeset = check_apply(base, target, os.path.join(root, "local-replace"))
+    assert sorted(change["op"] for change in changeset["changes"]) == ["add", "remove"]
+
+print("OK")
@@ -0,0 +1,96 @@
+from pathlib import Path
+import sys
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from color_index import ColorEntry, ColorIndex, delta_e2000, delta_e76, rgba_to_lab  # noqa: E402
+
+# CIEDE2000 test data from Sharma, Wu, Dalal: "The CIEDE2000 Color-Difference Formula: Implementation Notes, Supplementary Test Data, and Mathematical Observations" (2005)
+sharma = [
+    ((50.0000, 2.6772, -79.7751), (50.0000, 0.0000, -82.7485), 2.0425),
+    ((50.0000, 3.1571, -77.2803), (50.0000, 0.0000, -82.7485), 2.8615),
+    ((50.0000, 2.8361, -74.0200), (50.0000, 0.0000, -82.7485), 3.4412),
+    ((50.0000, -1.3802, -84.2814), (50.0000, 0.0000, -82.7485), 1.0000),
+    ((50.0000, -1.1848, -84.8006), (50.0000, 0.0000, -82.7485), 1.0000),
+    ((50.0000, -0.9009, -85.5211), (50.0000, 0.0000, -82.7485), 1.0000),
+    ((50.0000, 0.0000, 0.0000), (50.0000, -1.0000, 2.0000), 2.3669),
+    ((50.0000, -1.0000, 2.0000), (50.0000, 0.0000, 0.0000), 2.3669),
+    ((50.0000, 2.4900, -0.0010), (50.0000, -2.4900, 0.0009), 7.1792),
+    ((50.0000, 2.4900, -0.0010), (50.0000, -2.4900, 0.0010), 7.1792),
+    ((50.0000, 2.4900, -0.0010), (50.0000, -2.4900, 0.0011), 7.2195),
+    ((50.0000, 2.4900, -0.0010), (50.0000, -2.4900, 0.0012), 7.2195),
+    ((50.0000, -0.0010, 2.4900), (50.0000, 0.0009, -2.4900), 4.8045),
+    ((50.0000, -0.0010, 2.4900), (50.0000, 0.0010, -2.4900), 4.8045),
+    ((50.0000, -0.0010, 2.4900), (50.0000, 0.0011, -2.4900), 4.7461),
+    ((50.0000, 2.5000, 0.0000), (50.0000, 0.0000, -2.5000), 4.3065),
+    ((50.0000, 2.5000, 0.0000), (73.0000, 25.0000, -18.0000), 27.1492),
+    ((50.0000, 2.5000, 0.0000), (61.0000, -5.0000, 29.0000), 22.8977),
+    ((50.0000, 2.5000, 0.0000), (56.0000, -27.0000, -3.0000), 31.9030),
+    ((50.0000, 2.5000, 0.0000), (58.0000, 24.0000, 15.0000), 19.4535),
+    ((50.0000, 2.5000, 0.0000), (50.0000, 3.1736, 0.5854), 1.0000),
+    ((50.0000, 2.5000, 0.0000), (50.0000, 3.2972, 0.0000), 1.0000),
+    ((50.0000, 2.5000, 0.0000), (50.0000, 1.8634, 0.5757), 1.0000),
+    ((50.0000, 2.5000, 0.0000), (50.0000, 3.2592, 0.3350), 1.0000),
+    ((60.2574, -34.0099, 36.2677), (60.4626, -34.1751, 39.4387), 1.2644),
+    ((63.0109, -31.0961, -5.8663), (62.8187, -29.7946, -4.0864), 1.2630),
+    ((61.2901, 3.7196, -5.3901), (61.4292, 2.2480, -4.9620), 1.8731),
+    ((35.0831, -44.1164, 3.7933), (35.0232, -40.0716, 1.5901), 1.8645),
+    ((22.7233, 20.0904, -46.6940), (23.0331, 14.9730, -42.5619), 2.0373),
+    ((36.4612, 47.8580, 18.3852), (36.2715, 50.5065, 21.2231), 1.4146),
+    ((90.8027, -2.0831, 1.4410), (91.1528, -1.6435, 0.0447), 1.4441),
+    ((90.9257, -0.5406, -0.9208), (88.6381, -0.8985, -0.7239), 1.5381),
+    ((6.7747, -0.2908, -2.4247), (5.8714, -0.0985, -2.2286), 0.6377),
+    ((2.0776, 0.0795, -1.1350), (0.9033, -0.0636, -0.5514), 0.9082),
+]
+
+for lab1, lab2, expected in sharma:
+    # The formula is symmetric, evaluate both directions
+    assert abs(delta_e2000(np.array([lab1]), lab2)[0] - expected) < 1e-4, (lab1, lab2)
+    assert abs(delta_e2000(np.array([lab2]), lab1)[0] - expected) < 1e-4, (lab2, lab1)
+
+# Vectorized over all the pairs with the same reference
+first = [pair for pair in sharma if pair[1] == (50.0000, 0.0000, -82.7485)]
+assert np.allclose(delta_e2000(np.array([lab1 for lab1, _, _ in first]), first[0][1]), [expected for _, _, expected in first], atol=1e-4)
+
+# ΔE76 is the euclidean distance
+assert np.allclose(delta_e76(np.array([lab1 for lab1, _, _ in sharma]), (50, 0, 0)), [np.linalg.norm(np.subtract(lab1, (50, 0, 0))) for lab1, _, _ in sharma])
+assert abs(delta_e76(np.array([[50.0, 2.5, 0.0]]), (73.0, 25.0, -18.0))[0] - np.sqrt(23**2 + 22.5**2 + 18**2)) < 1e-12
+
+# sRGB -> L*a*b* (D65)
+assert np.allclose(rgba_to_lab(["#ffffff", "#000000ff", "#ff0000"]), [[100, 0, 0], [0, 0, 0], [53.2408, 80.0925, 67.2032]], atol=1e-2)
+assert rgba_to_lab([]).shape == (0, 3)
+
+# The grid search returns the same distances as a brute force search
+rng = np.random.default_rng(0)
+lab = np.column_stack([rng.uniform(0, 100, 500), rng.uniform(-100, 100, 500), rng.uniform(-100, 100, 500)])
+entries = [ColorEntry(f"material-{i}", "primary_color", None, True) for i in range(len(lab))]
+queries = np.vstack([lab[:5], rng.uniform(-150, 150, (20, 3))])
+
+for cell_size in (3.0, 10.0, 40.0):
+    index = ColorIndex(entries, lab, cell_size)
+
+    for query in queries:
+        brute = np.sort(delta_e76(lab, query))
+        for k in (1, 7, len(lab), len(lab) + 5):
+            result = index.nearest(query, k, "de76")
+            assert np.allclose([distance for distance, _ in result], brute[:k]), (cell_size, query, k)
+            assert all(abs(delta_e76(lab[[int(entry.material.split("-")[1])]], query)[0] - distance) < 1e-9 for distance, entry in result)
+
+        for radius in (0.0, 5.0, 25.0):
+            result = index.within(query, radius, "de76")
+            assert np.allclose([distance for distance, _ in result], brute[brute <= radius]), (cell_size, query, radius)
+
+        brute = np.sort(delta_e2000(lab, query))
+        assert np.allclose([distance for distance, _ in index.nearest(query, 7, "de2000")], brute[:7])
+
+    assert index.nearest(queries[0], 0) == [] and index.nearest(queries[0], 0, "de2000") == []
+    try:
+        index.nearest(queries[0], -1)
+        assert False
+    except ValueError:
+        pass
+
+assert ColorIndex([], np.zeros((0, 3))).nearest((50, 0, 0), 3) == []
+
+print("OK")
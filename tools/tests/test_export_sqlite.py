@@ -0,0 +1,30 @@
+from pathlib import Path
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from export_sqlite import export_snapshot, open_snapshot  # noqa: E402
+from synthetic_db import SyntheticDatabase  # noqa: E402
+
+with tempfile.TemporaryDirectory() as root:
+    counts = SyntheticDatabase(root, 1).generate(brands=3, materials=20, containers=4, packages=40)
+    output = os.path.join(root, "snapshot.sqlite")
+    assert export_snapshot(root, output) == counts
+
+    db = open_snapshot(output)
+
+    # Every reference in the synthetic database is a slug, the exporter resolves the uuids
+    package = db.execute("SELECT * FROM material_package ORDER BY gtin LIMIT 1").fetchone()
+    material = db.execute("SELECT * FROM material WHERE uuid = ?", (package["material_uuid"],)).fetchone()
+    assert material["slug"] == package["material_slug"] == json.loads(package["document"])["material"]["slug"]
+
+    brand = db.execute("SELECT * FROM brand WHERE uuid = ?", (material["brand_uuid"],)).fetchone()
+    assert brand["slug"] == material["brand_slug"]
+
+    assert db.execute("SELECT COUNT(*) FROM material_package WHERE material_uuid IS NULL").fetchone()[0] == 0
+    assert db.execute("SELECT COUNT(*) FROM material_package WHERE gtin = ?", (package["gtin"],)).fetchone()[0] == 1
+    db.close()
+
+print("OK")
@@ -0,0 +1,109 @@
+from pathlib import Path
+import collections
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import database  # noqa: E402
+import facets  # noqa: E402
+from facets import All, And, FacetIndex, Not, Or, Term, color_family, parse_query  # noqa: E402
+from material_tags import load_tag_graph  # noqa: E402
+from synthetic_db import SyntheticDatabase  # noqa: E402
+from yaml_loader import load_yaml  # noqa: E402
+
+assert color_family("#000000") == "black" and color_family("#ffffffff") == "white" and color_family("#808080") == "gray"
+assert color_family("#ff0000") == "red" and color_family("#00ff00") == "green" and color_family("#0000ff") == "blue"
+assert color_family("#8b4513") == "brown" and color_family("#ff8000") == "orange" and color_family("#zzzzzz") is None
+
+
+def scan(root):
+    # Facet values of every material by a plain scan of the files: slug -> {facet: set of values}
+    tag_graph = load_tag_graph()
+    brands = dict()
+    for file in database.entity_files(root, {"brand"}):
+        document = load_yaml(file.path)
+        brands[file.slug] = file.slug
+        brands[str(document["uuid"]).lower()] = file.slug
+
+    result = dict()
+    for file in database.entity_files(root, {"material"}):
+        document = load_yaml(file.path)
+        brand = document["brand"]
+        colors = [document.get("primary_color")] + document.get("secondary_colors", [])
+        colors = {color["color_rgba"].lower()[:7] for color in colors if color}
+        tags = set(document.get("tags", []))
+        result[file.slug] = {
+            "brand": {brands.get(brand.get("slug") or str(brand.get("uuid")).lower())},
+            "class": {document["class"]},
+            "type": {document["type"]} if "type" in document else set(),
+            "tags": tags,
+            "implied_tags": set(tag_graph.names(tag_graph.expand(tag_graph.mask(tags)))),
+            "certifications": set(document.get("certifications", [])),
+            "color": colors,
+            "color_family": {color_family(color) for color in colors},
+        }
+
+    return result
+
+
+def matches(query, values):
+    match query:
+        case Term():
+            return query.value in values.get(query.facet, ())
+        case All():
+            return True
+        case And():
+            return all(matches(q, values) for q in query.queries)
+        case Or():
+            return any(matches(q, values) for q in query.queries)
+        case Not():
+            return not matches(query.query, values)
+
+
+def naive_counts(slugs, materials, facet):
+    counts = collections.Counter(value for slug in slugs for value in materials[slug][facet])
+    return dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+
+
+with tempfile.TemporaryDirectory() as root:
+    SyntheticDatabase(root, 4, optional_probability=0.8).generate(brands=4, materials=80, containers=2, packages=4)
+    materials = scan(root)
+
+    index = FacetIndex.build(root)
+    index.save(os.path.join(root, "index.json"))
+    loaded = FacetIndex.load(os.path.join(root, "index.json"))
+    assert sorted(index.slugs(index.all)) == sorted(materials)
+
+    first = next(values for values in materials.values() if values["color"])
+    queries = [
+        "",
+        "class=FFF",
+        "class=FFF & type=PETG",
+        "tags=contains_carbon | tags=glitter",
+        "class=FFF & !implied_tags=abrasive",
+        f"color={min(first['color'])}",
+        f"color_family={min(first['color_family'])} | brand={min(first['brand'])}",
+        "!(class=FFF | class=SLA)",
+        "brand=unknown-brand",
+    ]
+
+    for text in queries:
+        expected = sorted(slug for slug, values in materials.items() if matches(parse_query(text), values))
+        for i in (index, loaded):
+            mask = i.query(text)
+            assert sorted(i.slugs(mask)) == expected, text
+
+            # Both counting strategies (per value bitmaps and iterating the matches) agree with the scan
+            for ratio in (0, len(materials) + 1):
+                facets.count_ids_ratio = ratio
+                counts = i.facet_counts(mask, facets.facet_names)
+                for facet in facets.facet_names:
+                    assert counts[facet] == naive_counts(expected, materials, facet), (text, facet, ratio)
+
+    facets.count_ids_ratio = 16
+
+    # The exact colors are not counted by default
+    assert list(index.facet_counts(index.all)) == facets.counted_facets
+
+print("OK")
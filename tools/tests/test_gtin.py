@@ -0,0 +1,44 @@
+from pathlib import Path
+import sys
+import tempfile
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from gtin import GtinIndex, invalid, normalize  # noqa: E402
+from synthetic_db import SyntheticDatabase  # noqa: E402
+from yaml_loader import Dumper, load_yaml  # noqa: E402
+
+# GTIN-13, GTIN-8, GTIN-12 (string and number without the leading zero), GTIN-14, wrong check digit, wrong length
+values = ["4006381333931", "96385074", "036000291452", 36000291452, "10036000291459", "4006381333932", "12345", "ABCDEFGH", True]
+assert normalize(values).tolist() == [4006381333931, 96385074, 36000291452, 36000291452, 10036000291459] + [invalid] * 4
+
+with tempfile.TemporaryDirectory() as root:
+    SyntheticDatabase(root, 5).generate(brands=3, materials=20, containers=4, packages=40)
+    index = GtinIndex.build(root)
+    assert index.issues == []
+
+    gtin = next(iter(index.packages))
+    assert [package.gtin for package in index.get(f"0{gtin}")] == [gtin]
+    assert index.resolve([str(gtin), "4006381333932"]) == [index.packages[gtin], []]
+
+    # Copy a package to another brand with the same GTIN and break the check digit of another one
+    packages = sorted(Path(root, "data/material-packages").rglob("*.yaml"))
+    brands = {path.parent.name: path for path in packages}
+    (_, a), (_, b) = list(brands.items())[:2]
+    document = load_yaml(str(a))
+    other = load_yaml(str(b))
+    other["gtin"] = document["gtin"]
+    with open(b, "w") as f:
+        yaml.dump(other, f, Dumper=Dumper)
+
+    broken = next(path for path in packages if path not in (a, b))
+    document = load_yaml(str(broken))
+    document["gtin"] += 1 if document["gtin"] % 10 != 9 else -1
+    with open(broken, "w") as f:
+        yaml.dump(document, f, Dumper=Dumper)
+
+    messages = sorted(issue.message.split(" (")[0] for issue in GtinIndex.build(root).issues)
+    assert len(messages) == 3 and messages[0].startswith("Duplicate GTIN") and "across brands" in messages[0] and messages[2].startswith("Invalid check digit"), messages
+
+print("OK")
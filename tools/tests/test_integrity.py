@@ -0,0 +1,67 @@
+from pathlib import Path
+import sys
+import tempfile
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from integrity import check_database  # noqa: E402
+from synthetic_db import SyntheticDatabase  # noqa: E402
+from yaml_loader import Dumper, load_yaml  # noqa: E402
+
+
+def write(path, document):
+    with open(path, "w") as f:
+        yaml.dump(document, f, Dumper=Dumper, sort_keys=False)
+
+
+def messages(root):
+    return sorted((Path(issue.path).name, issue.location, issue.message) for issue in check_database(root))
+
+
+with tempfile.TemporaryDirectory() as root:
+    SyntheticDatabase(root, 5).generate(brands=2, materials=4, containers=4, packages=4)
+    assert messages(root) == []
+
+    containers = Path(root, "data/material-containers")
+    sla = sorted(path for path in containers.glob("*.yaml") if load_yaml(str(path))["class"] == "SLA")
+    assert len(sla) >= 2
+    connector = "5b0c9c3e-2f7a-4d33-9a57-0f1e4b0b6f21"
+
+    # A connector defined inline in one container and referenced by uuid from another one
+    document = load_yaml(str(sla[0]))
+    document["connector"] = {"uuid": connector, "name": "20mm thread"}
+    write(sla[0], document)
+
+    document = load_yaml(str(sla[1]))
+    document["connector"] = {"uuid": connector.upper()}
+    write(sla[1], document)
+    assert messages(root) == []
+
+    # Connectors cannot be referenced by slug, and an unknown connector uuid does not resolve
+    document["connector"] = {"slug": "20mm-thread"}
+    write(sla[1], document)
+    assert messages(root) == [(sla[1].name, "$.connector", "Cannot resolve sla_material_container_connector by slug: it is not stored in the database")]
+
+    document["connector"] = {"uuid": "00000000-0000-4000-8000-000000000000"}
+    write(sla[1], document)
+    assert messages(root) == [(sla[1].name, "$.connector", "Referenced sla_material_container_connector with uuid '00000000-0000-4000-8000-000000000000' does not exist")]
+    del document["connector"]
+    write(sla[1], document)
+
+    # Dangling reference
+    package = next(Path(root, "data/material-packages").rglob("*.yaml"))
+    document = load_yaml(str(package))
+    document["material"] = {"slug": "no-such-material"}
+    write(package, document)
+    assert messages(root) == [(package.name, "$.material", "Referenced material with slug 'no-such-material' does not exist")]
+
+    # Duplicate uuid
+    brands = sorted(Path(root, "data/brands").glob("*.yaml"))
+    document = load_yaml(str(brands[1]))
+    document["uuid"] = load_yaml(str(brands[0]))["uuid"]
+    write(brands[1], document)
+    duplicates = [issue for issue in messages(root) if issue[1] == "$.uuid"]
+    assert len(duplicates) == 1 and duplicates[0][0] == brands[1].name and duplicates[0][2].startswith(f"Duplicate brand uuid '{document['uuid']}'"), duplicates
+
+print("OK")
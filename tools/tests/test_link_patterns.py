@@ -0,0 +1,107 @@
+from pathlib import Path
+import random
+import re
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from link_patterns import compile_pattern, LinkMatch, LinkPattern, LinkResolver, literal_prefix, match_properties  # noqa: E402
+from spec import load_spec  # noqa: E402
+
+
+def linear_resolve(patterns, url):
+    # Reference matcher: every pattern is tried, in the definition order
+    result = []
+    for link_pattern in patterns:
+        if match := compile_pattern(link_pattern.pattern).match(url):
+            result.append(LinkMatch(link_pattern.brand, link_pattern.type, match_properties(match)))
+
+    return result
+
+
+assert literal_prefix(r"https://prusament\.com/spool/\?spoolId=(?<x>\d+)") == "https://prusament.com/spool/?spoolId="
+assert literal_prefix(r"^https?://a\.com/") == "http"
+assert literal_prefix(r"https://a\.com/x*") == "https://a.com/"
+assert literal_prefix(r"https://a\.com/x{2}") == "https://a.com/"
+assert literal_prefix(r"https://a\.com/|https://b\.com/") == ""
+assert literal_prefix(r"(https://a\.com/|https://b\.com/)x") == ""
+assert literal_prefix(r"https://a\.com/[|]x") == "https://a.com/"
+assert literal_prefix(r"\d+") == ""
+
+# The example pattern of data/brands.yaml
+spec = load_spec()
+example = next(field.get("example") for field in spec.entities["BrandLinkPattern"].all_fields if field.name == "pattern").strip("`")
+
+patterns = [
+    LinkPattern("prusament", "material_package_instance", example),
+    # Overlapping prefixes - a pattern whose prefix is a prefix of another one, and the same prefix twice
+    LinkPattern("prusament", "brand", r"https://prusament\.com/$"),
+    LinkPattern("prusament", "material", r"https://prusament\.com/materials/(?<Material_slug>[a-z0-9-]+)/?$"),
+    LinkPattern("prusament", "material_package", r"https://prusament\.com/materials/(?<Material_slug>[a-z0-9-]+)/(?<MaterialPackage_id>\d+)$"),
+    LinkPattern("prusa", "material_package", r"https://www\.prusa3d\.com/(cs/)?produkt/(?<MaterialPackage_brand_specific_id>[a-z0-9-]+)/"),
+    LinkPattern("prusa", "material_package_instance", r"https://www\.prusa3d\.com/spool/(?<MaterialPackageInstance_uuid>[0-9a-f-]{36})"),
+    # Optional scheme char, alternations and no literal prefix at all
+    LinkPattern("acme", "brand", r"^https?://acme\.example/"),
+    LinkPattern("acme", "material", r"https://(www\.)?acme\.example/m/(?<Material_id>\d+)|https://acme\.example/material/(?<Material_slug>\w+)"),
+    LinkPattern("generic", "material_package_instance", r".*[?&]opt=(?<MaterialPackageInstance_uuid>[0-9a-f-]{36})"),
+]
+
+resolver = LinkResolver(patterns)
+
+instance = "5b0c9c3e-2f7a-4d33-9a57-0f1e4b0b6f21"
+urls = [
+    "https://prusament.com/spool/?spoolId=12345/",
+    "https://prusament.com/spool/?spoolId=/",
+    "https://prusament.com/",
+    "https://prusament.com",
+    "https://prusament.com/materials/pla-galaxy-black",
+    "https://prusament.com/materials/pla-galaxy-black/",
+    "https://prusament.com/materials/pla-galaxy-black/1234",
+    "https://prusament.com/materials/PLA/",
+    "https://www.prusa3d.com/produkt/prusament-pla-jet-black-1kg/",
+    "https://www.prusa3d.com/cs/produkt/prusament-pla-jet-black-1kg/",
+    f"https://www.prusa3d.com/spool/{instance}",
+    "https://www.prusa3d.com/spool/short",
+    "http://acme.example/",
+    "https://acme.example/m/42",
+    "https://www.acme.example/m/42",
+    "https://acme.example/material/petg",
+    f"https://shop.example/item?id=1&opt={instance}",
+    f"https://prusament.com/materials/x/?opt={instance}",
+    "",
+    "h",
+    "https://",
+    "https://example.com/",
+    "ftp://prusament.com/",
+]
+
+for url in urls:
+    assert resolver.resolve(url) == linear_resolve(patterns, url), url
+
+assert resolver.resolve(urls[0]) == [LinkMatch("prusament", "material_package_instance", {"MaterialPackageInstance": {"uuid": "12345"}})]
+assert [match.type for match in resolver.resolve("https://prusament.com/materials/pla/1")] == ["material_package"]
+assert [match.brand for match in resolver.resolve(f"https://prusament.com/materials/x/?opt={instance}")] == ["generic"]
+assert resolver.resolve("https://example.com/") == []
+assert resolver.resolve_many(urls + urls) == [resolver.resolve(url) for url in urls + urls]
+
+# Random URLs built from pieces of the ones above: prefixes, mutations and concatenations
+rng = random.Random(0)
+for _ in range(2000):
+    url = rng.choice(urls)
+    match rng.randrange(3):
+        case 0:
+            url = url[: rng.randrange(len(url) + 1)]
+        case 1 if url:
+            i = rng.randrange(len(url))
+            url = url[:i] + rng.choice("/.?=-aZ09") + url[i + 1 :]
+        case _:
+            url += rng.choice(urls)[rng.randrange(8) :]
+
+    assert resolver.resolve(url) == linear_resolve(patterns, url), url
+
+try:
+    LinkResolver([LinkPattern("broken", "brand", "https://(a")])
+    assert False
+except ValueError as e:
+    assert isinstance(e.__cause__, re.error)
+
+print("OK")
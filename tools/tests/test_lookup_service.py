@@ -0,0 +1,131 @@
+from pathlib import Path
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import opt_uuid  # noqa: E402
+from gtin import format_gtin14  # noqa: E402
+from lookup_service import LookupService, max_body_size  # noqa: E402
+from synthetic_db import SyntheticDatabase  # noqa: E402
+from yaml_loader import Dumper, load_yaml  # noqa: E402
+
+
+async def request(socket, method, target, body=b"", length=None):
+    reader, writer = await asyncio.open_unix_connection(socket)
+    length = len(body) if length is None else length
+    writer.write(f"{method} {target} HTTP/1.1\r\nContent-Length: {length}\r\nConnection: close\r\n\r\n".encode() + body)
+    response = await reader.read()
+    writer.close()
+
+    head, _, data = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(data)
+
+
+async def run(root):
+    service = LookupService(root, reload_interval=3600)
+    socket = os.path.join(root, "lookup.sock")
+    server = asyncio.ensure_future(service.serve(unix=socket))
+    while not os.path.exists(socket):
+        await asyncio.sleep(0.01)
+
+    package = load_yaml(str(next(Path(root, "data/material-packages").rglob("*.yaml"))))
+    status, entity = await request(socket, "GET", f"/gtin/{package['gtin']}")
+    assert status == 200 and entity["uuid"] == package["uuid"]
+
+    # GTINs are normalized to GTIN-14 with a valid check digit
+    assert (await request(socket, "GET", f"/gtin/{format_gtin14(package['gtin'])}"))[1]["uuid"] == package["uuid"]
+    assert (await request(socket, "GET", f"/gtin/{package['gtin'] + 1}"))[0] == 404
+
+    # Oversized bodies are rejected without reading them
+    assert (await request(socket, "POST", "/batch", length=max_body_size + 1))[0] == 413
+
+    status, entity = await request(socket, "GET", f"/slug/material/{package['material']['slug']}")
+    assert status == 200 and entity["kind"] == "material"
+
+    lookups = [{"uuid": package["uuid"]}, {"gtin": "0000000000000"}, {"kind": "brand", "slug": "missing"}, {"uuid": entity["uuid"].upper()}]
+    status, entities = await request(socket, "POST", "/batch", json.dumps(lookups).encode())
+    assert status == 200 and [item and item["kind"] for item in entities] == ["material_package", None, None, "material"]
+
+    # Malformed lookups and headers get 400 instead of a dropped connection
+    for lookups in ([{"kind": "brand", "slug": ["x"]}], [{"uuid": 1}], [{"gtin": [1]}], [{"gtin": True}], {"uuid": package["uuid"]}):
+        assert (await request(socket, "POST", "/batch", json.dumps(lookups).encode()))[0] == 400, lookups
+
+    assert (await request(socket, "POST", "/batch", b"[]", length="abc"))[0] == 400
+    assert (await request(socket, "POST", "/batch", b"[]", length=-1))[0] == 400
+
+    # A new file is picked up by the lookups that miss, concurrent lookups of the same key share the reload
+    with open(Path(root, "data/brands/new-brand.yaml"), "w") as f:
+        yaml.dump({"uuid": "9d6d3a58-2bc1-4c3a-9b5a-6d4b5f5a2c11", "slug": "new-brand", "name": "New Brand"}, f, Dumper=Dumper)
+
+    service.last_reload = 0
+    results = await asyncio.gather(*(request(socket, "GET", "/slug/brand/new-brand") for _ in range(5)))
+    assert all(status == 200 and entity["uuid"] == "9d6d3a58-2bc1-4c3a-9b5a-6d4b5f5a2c11" for status, entity in results)
+    assert service.stats["reloads"] == 1 and service.stats["reloaded_files"] == 1
+
+    # A malformed file is skipped (and the last good version kept) until it is fixed, the reloads keep working
+    with open(Path(root, "data/brands/new-brand.yaml"), "w") as f:
+        f.write("uuid: [unclosed\n")
+
+    with open(Path(root, "data/brands/broken-brand.yaml"), "w") as f:
+        f.write("name: {unclosed\n")
+
+    service.last_reload = 0
+    reloads = service.stats["reloads"]
+    assert (await request(socket, "GET", "/slug/brand/broken-brand"))[0] == 404
+    assert (await request(socket, "GET", "/slug/brand/new-brand"))[0] == 200
+    assert service.stats["reloads"] == reloads + 1 and set(service.index.broken) == {str(Path(root, "data/brands", name)) for name in ("new-brand.yaml", "broken-brand.yaml")}
+
+    with open(Path(root, "data/brands/broken-brand.yaml"), "w") as f:
+        yaml.dump({"slug": "broken-brand", "name": "Broken Brand"}, f, Dumper=Dumper)
+
+    await service.try_reload()
+    assert (await request(socket, "GET", "/slug/brand/broken-brand"))[1]["uuid"] == str(opt_uuid.brand_uuid("Broken Brand"))
+
+    os.remove(Path(root, "data/brands/broken-brand.yaml"))
+    os.remove(Path(root, "data/brands/new-brand.yaml"))
+    await service.reload()
+    assert (await request(socket, "GET", "/slug/brand/new-brand"))[0] == 404 and service.index.broken == {}
+
+    # A brand and a material without stored UUIDs added in the same reload, the UUIDs of the material and of its package are derived through them
+    def write(path, document):
+        path = Path(root, "data", path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            yaml.dump(document, f, Dumper=Dumper, sort_keys=False)
+
+    def expected_uuids(brand_name):
+        brand = opt_uuid.brand_uuid(brand_name)
+        return str(opt_uuid.material_uuid(brand, "Derived PLA")), str(opt_uuid.material_package_uuid(brand, 4006381333931))
+
+    write("materials/derived-brand/derived-pla.yaml", {"slug": "derived-pla", "brand": {"slug": "derived-brand"}, "class": "FFF", "name": "Derived PLA"})
+    write("material-packages/derived-brand/derived-pla-1kg.yaml", {"slug": "derived-pla-1kg", "class": "FFF", "material": {"slug": "derived-pla"}, "gtin": 4006381333931})
+    write("brands/derived-brand.yaml", {"slug": "derived-brand", "name": "Derived Brand"})
+    await service.reload()
+
+    material_uuid, package_uuid = expected_uuids("Derived Brand")
+    assert (await request(socket, "GET", f"/uuid/{material_uuid}"))[1]["slug"] == "derived-pla"
+    assert (await request(socket, "GET", f"/uuid/{package_uuid}"))[1]["slug"] == "derived-pla-1kg"
+
+    # Renaming the brand changes the derived UUIDs of the unchanged material and package
+    reloaded = service.stats["reloaded_files"]
+    write("brands/derived-brand.yaml", {"slug": "derived-brand", "name": "Renamed Brand"})
+    await service.reload()
+
+    assert service.stats["reloaded_files"] == reloaded + 1
+    for old, new in zip((material_uuid, package_uuid), expected_uuids("Renamed Brand")):
+        assert (await request(socket, "GET", f"/uuid/{new}"))[0] == 200
+        assert service.index.get(("uuid", old)) is None
+
+    server.cancel()
+
+
+with tempfile.TemporaryDirectory() as root:
+    SyntheticDatabase(root, 4).generate(brands=3, materials=20, containers=4, packages=40)
+    asyncio.run(run(root))
+
+print("OK")
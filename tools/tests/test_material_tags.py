@@ -0,0 +1,108 @@
+from pathlib import Path
+import random
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from material_tags import load_tag_graph, TagGraph  # noqa: E402
+
+graph = load_tag_graph()
+names = sorted(graph.by_name)
+
+# Tag sets survive the round-trip through the bitmask, the names come back in the key order
+rng = random.Random(0)
+assert graph.mask([]) == 0 and graph.names(0) == []
+for name in names:
+    assert graph.names(graph.mask([name])) == [name]
+
+for _ in range(200):
+    tags = rng.sample(names, rng.randint(1, 8))
+    mask = graph.mask(tags)
+    assert mask.bit_count() == len(tags)
+    assert graph.names(mask) == sorted(tags, key=lambda name: graph.by_name[name]["key"])
+    assert graph.mask(graph.names(mask)) == mask
+
+# Keys without a name (deprecated tags) still decode
+for key in (key for key, item in graph.by_key.items() if "name" not in item):
+    assert graph.names(1 << key) == [f"deprecated_{key}"]
+
+
+def naive_closure(tags):
+    # Plain graph search over the implies lists
+    result = set(tags)
+    pending = list(tags)
+    while pending:
+        for implied in graph.by_name[pending.pop()].get("implies", []):
+            if implied not in result:
+                result.add(implied)
+                pending.append(implied)
+
+    return result
+
+
+for name in names:
+    assert set(graph.names(graph.expand(graph.mask([name])))) == naive_closure([name]), name
+    assert set(graph.names(graph.implying(name))) == {other for other in names if name in naive_closure([other])}, name
+
+for _ in range(100):
+    tags = rng.sample(names, rng.randint(1, 8))
+    closure = naive_closure(tags)
+    mask = graph.mask(tags)
+    assert set(graph.names(graph.expand(mask))) == closure
+    assert set(graph.names(graph.missing_implied(mask))) == closure - set(tags)
+    assert graph.is_closed(graph.expand(mask))
+    assert graph.validate(sorted(closure)) == []
+    assert (graph.validate(tags) == []) == (closure == set(tags))
+
+assert graph.validate(["contains_carbon_fiber"]) == ["contains_carbon_fiber implies contains_carbon"]
+assert {"contains_carbon_fiber", "contains_carbon_nano_tubes", "contains_graphene", "contains_carbon"} <= set(graph.names(graph.implying("contains_carbon")))
+
+# Unknown tags
+assert graph.validate(["contains_carbon", "no_such_tag"]) == ["Unknown tag no_such_tag"]
+for call in (lambda: graph.mask(["no_such_tag"]), lambda: graph.implying("no_such_tag")):
+    try:
+        call()
+        assert False
+    except KeyError:
+        pass
+
+try:
+    TagGraph([{"key": 0, "name": "a", "implies": ["no_such_tag"]}])
+    assert False
+except ValueError:
+    pass
+
+# Unnamed (deprecated) tags with an unknown implied tag name their key in the error
+try:
+    TagGraph([{"key": 3, "implies": ["no_such_tag"]}])
+    assert False
+except ValueError as e:
+    assert str(e) == "Tag 3 implies unknown tag no_such_tag", e
+
+try:
+    TagGraph([{"key": 0, "name": "a"}, {"key": 0, "name": "b"}])
+    assert False
+except AssertionError:
+    pass
+
+# Transitive implies, cycles and hints on a small graph
+small = TagGraph(
+    [
+        {"key": 0, "name": "a", "implies": ["b"]},
+        {"key": 1, "name": "b", "implies": ["c"], "hints": ["f"]},
+        {"key": 2, "name": "c"},
+        {"key": 3, "name": "d", "implies": ["e"]},
+        {"key": 4, "name": "e", "implies": ["d"], "hints": ["a"]},
+        {"key": 5, "name": "f"},
+        {"key": 6},
+    ]
+)
+assert small.names(small.expand(small.mask(["a"]))) == ["a", "b", "c"]
+assert small.names(small.expand(small.mask(["d"]))) == ["d", "e"]
+assert small.names(small.implying("c")) == ["a", "b", "c"]
+assert small.cycles == [["d", "e"]]
+assert small.names(small.suggested(small.mask(["a"]))) == ["f"]
+assert small.names(small.suggested(small.mask(["a", "f"]))) == []
+assert small.names(small.suggested(small.mask(["d"]))) == ["a"]
+assert small.names(1 << 6) == ["deprecated_6"]
+
+print("OK")
@@ -0,0 +1,57 @@
+from pathlib import Path
+import sys
+import uuid
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from nfc_uid import InstanceIndex, normalize_uid  # noqa: E402
+
+# Test vector from docs_src/markdown/uuid.md
+uid = b"\xe0\x04\x01\x08\x66\x2f\x6f\xbc"
+instance_uuid = uuid.UUID("bf63e92d-9ca5-53d7-9fab-ffdd0240c585")
+
+# The same UID as reported by various readers
+inputs = [
+    uid,
+    bytearray(uid),
+    memoryview(uid),
+    uid[::-1],
+    bytearray(uid[::-1]),
+    "E004010866 2F6FBC",
+    "e0:04:01:08:66:2f:6f:bc",
+    "0xE0040108662F6FBC",
+    "bc-6f-2f-66-08-01-04-e0",
+    int.from_bytes(uid, "big"),
+]
+
+for raw in inputs:
+    assert normalize_uid(raw) == uid, raw
+
+for raw in ["e00401", "e0040108662f6fbc00", "0104e008662f6fbc", "e0040108662f6fbx", 1 << 64, -1, b""]:
+    try:
+        normalize_uid(raw)
+        assert False, raw
+    except ValueError:
+        pass
+
+index = InstanceIndex([{"nfc_tag_uid": uid.hex(), "name": "a"}, {"uuid": "0f8fad5b-d9cb-469f-a165-70867728950e", "name": "b"}])
+assert sorted(index.records) == sorted([instance_uuid, uuid.UUID("0f8fad5b-d9cb-469f-a165-70867728950e")])
+
+for raw in inputs:
+    assert index.lookup(raw)["name"] == "a", raw
+    assert index.instance_uuid(raw) == instance_uuid
+
+# Each distinct raw form is normalized once, repeated scans are cache hits (bytearray/memoryview share the entry of the bytes)
+info = index.cached_instance_uuid.cache_info()
+assert info.misses == len({bytes(raw) if isinstance(raw, (bytearray, memoryview)) else raw for raw in inputs} | {uid.hex()}), info
+
+index.lookup(bytearray(uid))
+index.lookup(memoryview(uid[::-1]))
+assert index.cached_instance_uuid.cache_info().misses == info.misses
+assert index.cached_instance_uuid.cache_info().hits == info.hits + 2
+
+results = index.resolve([bytearray(uid), "e0040108662f6fbd", "nope"])
+assert [r.instance_uuid for r in results[:1]] == [instance_uuid] and results[0].record["name"] == "a"
+assert results[1].instance_uuid is not None and results[1].record is None and results[1].error is None
+assert results[2].instance_uuid is None and results[2].error.startswith("Invalid NFC tag UID")
+
+print("OK")
@@ -0,0 +1,41 @@
+from pathlib import Path
+import os
+import sys
+import tempfile
+import uuid
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import opt_uuid  # noqa: E402
+
+# Values from the example in docs_src/markdown/uuid.md
+brand_uuid = opt_uuid.brand_uuid("Prusament")
+assert brand_uuid == uuid.UUID("ae5ff34e-298e-50c9-8f77-92a97fb30b09")
+assert opt_uuid.material_uuid(brand_uuid, "PLA Prusa Galaxy Black") == uuid.UUID("1aaca54a-431f-5601-adf5-85dd018f487f")
+assert opt_uuid.container_uuid(brand_uuid, "Prusament 1kg spool") == uuid.UUID("1b54c61b-c079-50e4-98f9-1d41be0db5f6")
+assert opt_uuid.material_package_uuid(brand_uuid, "1234") == uuid.UUID("7ed3ce83-764d-56de-bdcd-dc5226a0efd1")
+assert opt_uuid.material_package_uuid(brand_uuid, 1234) == uuid.UUID("7ed3ce83-764d-56de-bdcd-dc5226a0efd1")
+assert opt_uuid.material_package_instance_uuid(b"\xe0\x04\x01\x08\x66\x2f\x6f\xbc") == uuid.UUID("bf63e92d-9ca5-53d7-9fab-ffdd0240c585")
+
+# Whole-database derivation - references by slug, by uuid and inline
+material_uuid = opt_uuid.material_uuid(brand_uuid, "PLA Prusa Galaxy Black")
+files = {
+    "brands/prusament.yaml": f"uuid: {brand_uuid}\nname: Prusament\n",
+    "materials/prusament/galaxy-black.yaml": f"uuid: {material_uuid}\nbrand:\n  slug: prusament\nname: PLA Prusa Galaxy Black\n",
+    "materials/prusament/wrong.yaml": f"uuid: {uuid.uuid4()}\nbrand:\n  uuid: {brand_uuid}\nname: Wrong\n",
+    "material-containers/spool.yaml": "brand:\n  name: Prusament\nname: Prusament 1kg spool\n",
+    "material-packages/prusament/galaxy-black-1kg.yaml": f"uuid: {opt_uuid.material_package_uuid(brand_uuid, 1234)}\nmaterial:\n  slug: galaxy-black\ngtin: 1234\n",
+}
+
+with tempfile.TemporaryDirectory() as root:
+    for path, content in files.items():
+        os.makedirs(os.path.dirname(f"{root}/data/{path}"), exist_ok=True)
+        Path(f"{root}/data/{path}").write_text(content)
+
+    results = {d.file.slug: d for d in opt_uuid.derive_database(root)}
+
+assert results.keys() == {"prusament", "galaxy-black", "wrong", "spool", "galaxy-black-1kg"}
+assert [slug for slug, d in results.items() if d.mismatch] == ["wrong"]
+assert results["spool"].stored is None and results["spool"].derived == opt_uuid.container_uuid(brand_uuid, "Prusament 1kg spool")
+assert results["galaxy-black-1kg"].derived == results["galaxy-black-1kg"].stored
+
+print("UUID derivation OK")
@@ -0,0 +1,50 @@
+from pathlib import Path
+import os
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import database  # noqa: E402
+import integrity  # noqa: E402
+import opt_uuid  # noqa: E402
+import validate_db  # noqa: E402
+from material_tags import load_tag_graph  # noqa: E402
+from synthetic_db import SyntheticDatabase  # noqa: E402
+from yaml_loader import load_yaml  # noqa: E402
+
+tag_graph = load_tag_graph()
+
+# The synthetic databases have to be valid - schema, references and UUIDs
+for seed in range(3):
+    with tempfile.TemporaryDirectory() as root:
+        counts = SyntheticDatabase(root, seed, optional_probability=0.8).generate(brands=5, materials=60, containers=6, packages=120)
+        assert counts == {"brand": 5, "material": 60, "material_container": 6, "material_package": 120}, counts
+
+        results = list(validate_db.validate_database(root, jobs=1))
+        assert len(results) == sum(counts.values())
+        invalid = [result for result in results if result.errors]
+        assert not invalid, invalid[0]
+
+        issues = integrity.check_database(root)
+        assert not issues, issues[0]
+
+        derivations = list(opt_uuid.derive_database(root))
+        assert not any(derivation.mismatch or derivation.derived is None for derivation in derivations)
+
+        # Material tags are closed under implies
+        for file in database.entity_files(root, {"material"}):
+            assert tag_graph.validate(load_yaml(file.path).get("tags", [])) == [], file.path
+
+# The command line generator does not mix its output with an existing tree
+with tempfile.TemporaryDirectory() as root:
+    command = [sys.executable, str(Path(__file__).parent.parent / "synthetic_db.py"), root, "--brands", "1", "--materials", "2", "--containers", "1", "--packages", "1"]
+    subprocess.run(command, check=True, capture_output=True)
+    stale = Path(root, "data/brands/stale.yaml")
+    stale.write_text("name: Stale\n")
+
+    assert subprocess.run(command, capture_output=True).returncode == 1 and stale.exists()
+    subprocess.run(command + ["--overwrite"], check=True, capture_output=True)
+    assert not stale.exists() and len(os.listdir(Path(root, "data/brands"))) == 1
+
+print("OK")
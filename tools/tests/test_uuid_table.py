@@ -0,0 +1,55 @@
+from pathlib import Path
+import os
+import sys
+import tempfile
+import uuid
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import opt_uuid  # noqa: E402
+from synthetic_db import SyntheticDatabase  # noqa: E402
+from uuid_table import read_value, TableWriter, UuidTable, write_table, write_value  # noqa: E402
+
+for value in [None, True, 0, -1, 2**40, -(2**40), 0.5, "", "žluťoučký", uuid.uuid4(), [1, [2, "x"]], {"a": {"b": None}}]:
+    data = bytearray()
+    write_value(data, value)
+    assert read_value(data, 0) == (value, len(data)), value
+
+with tempfile.TemporaryDirectory() as root:
+    counts = SyntheticDatabase(root, 2).generate(brands=3, materials=20, containers=4, packages=40)
+    output = os.path.join(root, "table.bin")
+    assert write_table(root, output) == sum(counts.values())
+
+    with UuidTable(output) as table:
+        for derivation in opt_uuid.derive_database(root):
+            record = table.get(derivation.stored)
+            assert record.uuid == derivation.stored and record.kind == derivation.file.kind
+
+            # References are stored as UUIDs of records in the same table
+            if record.kind == "material_package":
+                assert table.get(record.fields["material"]).kind == "material"
+
+        assert table.get(uuid.uuid4()) is None
+        assert str(derivation.stored) in table
+
+    # UUIDs with trailing/leading zero bytes and at the ends of the fanout buckets, and their neighbours that are not in the table
+    keys = [bytes(16), bytes(15) + b"\x01", b"\x01" + bytes(15), b"\x01" + bytes(14) + b"\x02", b"\x7f" * 8 + bytes(8), b"\xff" * 16, b"\xff" * 15 + b"\x00"]
+    missing = [b"\x00" * 15 + b"\x02", b"\x01" + bytes(14) + b"\x01", b"\x7f" * 8 + bytes(7) + b"\x01", b"\x7f" * 7 + bytes(9), b"\xff" * 15 + b"\x01", b"\x80" + bytes(15)]
+
+    writer = TableWriter()
+    for i, key in enumerate(keys):
+        writer.add("brand", uuid.UUID(bytes=key), f"brand-{i}", {"name": f"Brand {i}"})
+
+    writer.write(output)
+    with UuidTable(output) as table:
+        for i, key in enumerate(keys):
+            assert table.index(key) == sorted(keys).index(key) and table.get(key).fields == {"name": f"Brand {i}"}, key
+
+        for key in missing:
+            assert table.index(key) == -1, key
+
+    # An empty table
+    TableWriter().write(output)
+    with UuidTable(output) as table:
+        assert len(table) == 0 and table.get(bytes(16)) is None
+
+print("OK")
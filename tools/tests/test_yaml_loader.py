@@ -0,0 +1,118 @@
+from pathlib import Path
+import glob
+import os
+import pickle
+import sys
+import tempfile
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import yaml_loader  # noqa: E402
+from synthetic_db import SyntheticDatabase  # noqa: E402
+from yaml_loader import load_yaml, parse_yaml  # noqa: E402
+
+
+def stats_delta(function):
+    before = dict(yaml_loader.stats)
+    result = function()
+    return result, {key: yaml_loader.stats[key] - before[key] for key in before if yaml_loader.stats[key] != before[key]}
+
+
+with tempfile.TemporaryDirectory() as root:
+    yaml_loader.cache_dir = os.path.join(root, "cache")
+    yaml_loader.cache_enabled = True
+
+    path = os.path.join(root, "document.yaml")
+    with open(path, "w") as f:
+        f.write("name: First\nvalues: [1, 2]\n")
+
+    entry_path = yaml_loader._entry_path(os.path.abspath(path))
+
+    def set_mtime(ns):
+        os.utime(path, ns=(ns, ns))
+
+    set_mtime(1_000_000_000_000_000_000)
+
+    # Miss, then hit without reading the file
+    assert stats_delta(lambda: load_yaml(path)) == ({"name": "First", "values": [1, 2]}, {"misses": 1})
+    assert stats_delta(lambda: load_yaml(Path(path))) == ({"name": "First", "values": [1, 2]}, {"hits": 1})
+
+    # The callers get their own copies, modifying one does not change the cache
+    load_yaml(path)["values"].append(3)
+    assert load_yaml(path)["values"] == [1, 2]
+
+    # Touched without changing the content: revalidated by the hash, and a hit again afterwards
+    set_mtime(1_000_000_001_000_000_000)
+    assert stats_delta(lambda: load_yaml(path)) == ({"name": "First", "values": [1, 2]}, {"revalidated": 1})
+    assert stats_delta(lambda: load_yaml(path))[1] == {"hits": 1}
+
+    # Content changed, the same size and a new mtime
+    with open(path, "w") as f:
+        f.write("name: Other\nvalues: [3, 4]\n")
+
+    set_mtime(1_000_000_002_000_000_000)
+    assert stats_delta(lambda: load_yaml(path)) == ({"name": "Other", "values": [3, 4]}, {"misses": 1})
+
+    # Content changed, another size and the same mtime
+    with open(path, "w") as f:
+        f.write("name: Longer name\n")
+
+    set_mtime(1_000_000_002_000_000_000)
+    assert stats_delta(lambda: load_yaml(path)) == ({"name": "Longer name"}, {"misses": 1})
+
+    # Corrupt, truncated, foreign and stale entries are parsed again and replaced
+    valid = Path(entry_path).read_bytes()
+    entry = pickle.loads(valid)
+    stale = [
+        b"not a pickle",
+        b"",
+        valid[: len(valid) // 2],
+        pickle.dumps(["not", "an", "entry"]),
+        pickle.dumps(entry | {"version": yaml_loader.cache_version + 1}),
+        pickle.dumps(entry | {"path": os.path.join(root, "other.yaml")}),
+        pickle.dumps(entry | {"data": {"name": "Stale"}, "mtime": entry["mtime"] - 1, "hash": "0" * 64}),
+    ]
+    for data in stale:
+        with open(entry_path, "wb") as f:
+            f.write(data)
+
+        assert stats_delta(lambda: load_yaml(path)) == ({"name": "Longer name"}, {"misses": 1}), data
+        assert stats_delta(lambda: load_yaml(path))[1] == {"hits": 1}
+
+    # Eviction keeps the cache within the size limit, the least recently used entries go first
+    paths = []
+    for i in range(4):
+        paths.append(os.path.join(root, f"document-{i}.yaml"))
+        with open(paths[-1], "w") as f:
+            f.write(f"index: {i}\n")
+
+        load_yaml(paths[-1])
+        entry = yaml_loader._entry_path(os.path.abspath(paths[-1]))
+        os.utime(entry, ns=(i * 10**9, i * 10**9))
+
+    os.utime(entry_path, ns=(0, 0))
+    sizes = [os.path.getsize(yaml_loader._entry_path(os.path.abspath(p))) for p in paths]
+    yaml_loader.evict(sizes[2] + sizes[3])
+    assert sorted(glob.glob(f"{yaml_loader.cache_dir}/*/*.pickle")) == sorted(yaml_loader._entry_path(os.path.abspath(p)) for p in paths[2:])
+
+    # Disabled cache, nothing is written
+    yaml_loader.evict(0)
+    yaml_loader.cache_enabled = False
+    assert stats_delta(lambda: load_yaml(path)) == ({"name": "Longer name"}, {})
+    assert glob.glob(f"{yaml_loader.cache_dir}/*/*.pickle") == []
+    yaml_loader.cache_enabled = True
+
+    # The libyaml loader parses the spec and a synthetic database the same as the pure-Python one
+    SyntheticDatabase(os.path.join(root, "db"), 7, optional_probability=1).generate(brands=3, materials=20, containers=4, packages=20)
+    files = sorted(glob.glob(f"{yaml_loader.root_dir}/data/*.yaml")) + sorted(glob.glob(f"{root}/db/**/*.yaml", recursive=True))
+    assert len(files) > 50
+
+    for file in files:
+        with open(file, "rb") as f:
+            content = f.read()
+
+        assert parse_yaml(content) == yaml.load(content, Loader=yaml.SafeLoader), file
+        assert load_yaml(file) == load_yaml(file) == yaml.load(content, Loader=yaml.SafeLoader), file
+
+print("OK")
@@ -0,0 +1,208 @@
+import atexit
+import collections
+import contextlib
+import cProfile
+import functools
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Timing/profiling instrumentation for the generators and tools.
+# OPT_TRACE=<file> records spans (wall + CPU time) and counters and writes them as a Chrome trace JSON at exit (open in chrome://tracing or ui.perfetto.dev),
+# together with a per-span summary on stderr.
+# OPT_PROFILE=<file> additionally dumps cProfile stats of the whole process (inspect with python3 -m pstats <file>), including the threads
+# (the schema profiles are generated in a thread pool). Worker processes (validate_db --jobs) are not profiled.
+# When disabled, traced functions are left undecorated and span() costs a single check.
+
+trace_file = os.environ.get("OPT_TRACE")
+profile_file = os.environ.get("OPT_PROFILE")
+enabled = bool(trace_file)
+
+events = []
+counters = collections.Counter()
+
+# Dicts of counters owned by other modules (cache stats, ...), read at exit: name -> dict
+counter_sources = {}
+
+_start = time.perf_counter_ns()
+_profiler = None
+
+# Profilers of the threads started after the profiling was enabled, merged into the dump at exit
+_thread_profilers = []
+
+
+def _record(name, category, start_wall, start_cpu, args):
+    end_wall = time.perf_counter_ns()
+    end_cpu = time.thread_time_ns()
+
+    events.append(
+        {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (start_wall - _start) / 1000,
+            "dur": (end_wall - start_wall) / 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": {**args, "cpu_ms": (end_cpu - start_cpu) / 1e6},
+        }
+    )
+
+
+@contextlib.contextmanager
+def _span(name, category, args):
+    start_wall = time.perf_counter_ns()
+    start_cpu = time.thread_time_ns()
+    try:
+        yield
+    finally:
+        _record(name, category, start_wall, start_cpu, args)
+
+
+def span(name: str, category: str = "", **args):
+    # with span("render", "docs", page="brands"): ...
+    if not enabled:
+        return contextlib.nullcontext()
+
+    return _span(name, category, args)
+
+
+def traced(name: str | None = None, category: str = "", args=None):
+    # Decorator recording every call of the function as a span, args(*call_args, **call_kwargs) returns the span arguments
+    def decorator(function):
+        if not enabled:
+            return function
+
+        span_name = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*call_args, **call_kwargs):
+            start_wall = time.perf_counter_ns()
+            start_cpu = time.thread_time_ns()
+            try:
+                return function(*call_args, **call_kwargs)
+            finally:
+                _record(span_name, category, start_wall, start_cpu, args(*call_args, **call_kwargs) if args else {})
+
+        return wrapper
+
+    return decorator
+
+
+def count(name: str, value: int = 1):
+    counters[name] += value
+
+
+def peak_memory():
+    # Peak resident set size in bytes of this process and of its (waited for) children
+    if resource is None:
+        return {}
+
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale,
+    }
+
+
+def all_counters():
+    result = dict(counters)
+    for source_name, source in counter_sources.items():
+        for key, value in source.items():
+            result[f"{source_name}.{key}"] = value
+
+    return result
+
+
+def summary():
+    # Total wall/CPU time and call count per span name
+    result = dict()
+    for event in events:
+        item = result.setdefault(event["name"], {"count": 0, "wall_ms": 0.0, "cpu_ms": 0.0})
+        item["count"] += 1
+        item["wall_ms"] += event["dur"] / 1000
+        item["cpu_ms"] += event["args"]["cpu_ms"]
+
+    return result
+
+
+def write_trace(path: str):
+    end = (time.perf_counter_ns() - _start) / 1000
+    counter_values = all_counters()
+    memory = peak_memory()
+
+    trace_events = list(events)
+    if counter_values:
+        trace_events.append({"name": "counters", "ph": "C", "ts": end, "pid": os.getpid(), "tid": 0, "args": counter_values})
+
+    if memory:
+        trace_events.append({"name": "peak_memory", "ph": "C", "ts": end, "pid": os.getpid(), "tid": 0, "args": memory})
+
+    data = {
+        "traceEvents": trace_events,
+        "displayTimeUnit": "ms",
+        "otherData": {
+            "argv": sys.argv,
+            "counters": counter_values,
+            "peak_memory": memory,
+            "summary": summary(),
+        },
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def print_summary():
+    items = sorted(summary().items(), key=lambda item: -item[1]["wall_ms"])
+    print(f"{'span':<40} {'count':>7} {'wall ms':>10} {'cpu ms':>10}", file=sys.stderr)
+    for name, item in items:
+        print(f"{name:<40} {item['count']:>7} {item['wall_ms']:>10.1f} {item['cpu_ms']:>10.1f}", file=sys.stderr)
+
+    for name, value in sorted(all_counters().items()):
+        print(f"{name:<40} {value:>7}", file=sys.stderr)
+
+    for name, value in peak_memory().items():
+        print(f"{f'peak memory ({name})':<40} {value / 1024 / 1024:>7.1f} MB", file=sys.stderr)
+
+
+def _profile_thread(frame, event, arg):
+    # threading.setprofile hook, called once in every new thread: replaces itself with a profiler of the thread
+    profiler = cProfile.Profile()
+    _thread_profilers.append(profiler)
+    profiler.enable()
+
+
+@atexit.register
+def _finish():
+    if _profiler is not None:
+        _profiler.disable()
+        stats = pstats.Stats(_profiler)
+        for profiler in _thread_profilers:
+            stats.add(profiler)
+
+        stats.dump_stats(profile_file)
+
+    if enabled:
+        write_trace(trace_file)
+        print_summary()
+
+
+if profile_file:
+    _profiler = cProfile.Profile()
+    _profiler.enable()
+
+    # Since Python 3.12, cProfile uses sys.monitoring, which covers all the threads, but only one profiler can be active.
+    # Before, it only profiles the thread it was enabled in and every thread needs its own.
+    if sys.version_info < (3, 12):
+        threading.setprofile(_profile_thread)
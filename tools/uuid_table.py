@@ -0,0 +1,394 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+import typing
+import uuid
+
+import numpy as np
+
+import opt_uuid
+from integrity import kind_entities, reference_types
+from spec import load_spec
+
+# Read-only binary UUID -> record table for low-RAM consumers, memory-mapped and never loaded as a whole.
+#
+# Layout (little endian):
+#   header       magic, version, record count, offsets of the sections below
+#   fanout       257 x u32 - fanout[b] = number of UUIDs with the first byte < b (as in git pack indexes)
+#   uuids        count x 16 bytes, sorted
+#   offsets      (count + 1) x u32 - payload of record i is payload[offsets[i]:offsets[i + 1]]
+#   payload      records: kind id (u8), field count (varint), (field id (varint), value) for every present field
+#   meta         JSON - kinds and their field names (field ids index into them)
+#
+# Values are tagged: None, bools, ints (zigzag varint), floats (f64), strings (varint length + UTF-8), UUIDs (16 bytes), lists and maps.
+# References to the other entities are stored as the UUIDs of the referenced entities, so they can be looked up in the same table.
+
+magic = b"OPTUUIDT"
+format_version = 1
+
+header_format = struct.Struct("<8sHHI5Q")
+fanout_format = struct.Struct("<257I")
+offset_format = struct.Struct("<2I")
+
+tag_none, tag_false, tag_true, tag_int, tag_float, tag_str, tag_uuid, tag_list, tag_map = range(9)
+
+float_format = struct.Struct("<d")
+
+
+def payload_fields(kind: str, spec=None):
+    # Fields of the in_opt entities (the kind entity and its class-specific subclasses) that are stored in the database
+    spec = spec or load_spec()
+    entity_name = kind_entities[kind]
+
+    result = []
+    for entity in spec.with_subclasses(entity_name):
+        if not entity.get("in_opt", False):
+            continue
+
+        for field in entity.all_fields:
+            if field.is_function or field.type is None or field.name == "uuid" or field.name in result:
+                continue
+
+            if field.get("in_opt", True) and field.get("in_opt_db", True):
+                result.append(field.name)
+
+    # Brands are not stored on the tags, but the consumers need at least their names
+    return result or ["name"]
+
+
+def write_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+
+    out.append(value)
+
+
+def read_varint(data, pos: int):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+
+        shift += 7
+
+
+def write_value(out: bytearray, value):
+    if value is None:
+        out.append(tag_none)
+
+    elif isinstance(value, bool):
+        out.append(tag_true if value else tag_false)
+
+    elif isinstance(value, int):
+        out.append(tag_int)
+        write_varint(out, (value << 1) if value >= 0 else ((-value << 1) - 1))
+
+    elif isinstance(value, float):
+        out.append(tag_float)
+        out += float_format.pack(value)
+
+    elif isinstance(value, uuid.UUID):
+        out.append(tag_uuid)
+        out += value.bytes
+
+    elif isinstance(value, str):
+        data = value.encode("utf-8")
+        out.append(tag_str)
+        write_varint(out, len(data))
+        out += data
+
+    elif isinstance(value, (list, tuple)):
+        out.append(tag_list)
+        write_varint(out, len(value))
+        for item in value:
+            write_value(out, item)
+
+    elif isinstance(value, dict):
+        out.append(tag_map)
+        write_varint(out, len(value))
+        for key, item in value.items():
+            write_value(out, str(key))
+            write_value(out, item)
+
+    else:
+        # Dates and other YAML scalars
+        write_value(out, str(value))
+
+
+def read_value(data, pos: int):
+    tag = data[pos]
+    pos += 1
+
+    match tag:
+        case 0:
+            return None, pos
+
+        case 1:
+            return False, pos
+
+        case 2:
+            return True, pos
+
+        case 3:
+            value, pos = read_varint(data, pos)
+            return (value >> 1) ^ -(value & 1), pos
+
+        case 4:
+            return float_format.unpack_from(data, pos)[0], pos + 8
+
+        case 5:
+            length, pos = read_varint(data, pos)
+            return str(data[pos : pos + length], "utf-8"), pos + length
+
+        case 6:
+            return uuid.UUID(bytes=bytes(data[pos : pos + 16])), pos + 16
+
+        case 7:
+            count, pos = read_varint(data, pos)
+            result = []
+            for _ in range(count):
+                value, pos = read_value(data, pos)
+                result.append(value)
+
+            return result, pos
+
+        case 8:
+            count, pos = read_varint(data, pos)
+            result = dict()
+            for _ in range(count):
+                key, pos = read_value(data, pos)
+                result[key], pos = read_value(data, pos)
+
+            return result, pos
+
+    raise ValueError(f"Invalid value tag {tag} at {pos - 1}")
+
+
+class TableWriter:
+    def __init__(self, spec=None):
+        self.spec = spec or load_spec()
+        self.fields = {kind: payload_fields(kind, self.spec) for kind in opt_uuid.derivation_order}
+        self.field_ids = {kind: {name: i for i, name in enumerate(fields)} for kind, fields in self.fields.items()}
+        self.field_types = {kind: {field.name: field.type for entity in self.spec.with_subclasses(kind_entities[kind]) for field in entity.all_fields} for kind in opt_uuid.derivation_order}
+
+        # Kind -> slug -> UUID, for resolving the references
+        self.slug_uuids = {kind: dict() for kind in opt_uuid.derivation_order}
+
+        self.records = []  # (uuid bytes, payload)
+
+    def resolve(self, field_type: str, ref):
+        # Reference -> UUID of the referenced entity (None if it cannot be resolved)
+        if not isinstance(ref, dict):
+            return None
+
+        if "uuid" in ref:
+            return opt_uuid.parse_uuid(ref["uuid"])
+
+        if "slug" in ref:
+            return self.slug_uuids.get(reference_types[field_type], {}).get(ref["slug"])
+
+        return None
+
+    def encode(self, field_type, value):
+        if field_type in reference_types:
+            return self.resolve(field_type, value)
+
+        if field_type == "UUID":
+            return opt_uuid.parse_uuid(value)
+
+        return value
+
+    def add(self, kind: str, record_uuid: uuid.UUID, slug: str, document: dict):
+        self.slug_uuids[kind][slug] = record_uuid
+
+        field_ids = self.field_ids[kind]
+        field_types = self.field_types[kind]
+        present = [(field_ids[name], self.encode(field_types[name], value)) for name, value in document.items() if name in field_ids]
+
+        payload = bytearray([opt_uuid.derivation_order.index(kind)])
+        write_varint(payload, len(present))
+        for field_id, value in present:
+            write_varint(payload, field_id)
+            write_value(payload, value)
+
+        self.records.append((record_uuid.bytes, bytes(payload)))
+
+    def add_database(self, root: str):
+        # UUIDs that are not stored in the files are derived (uuid.md)
+        for derivation in opt_uuid.derive_database(root):
+            record_uuid = derivation.stored or derivation.derived
+            if record_uuid is None:
+                print(f"Skipping {derivation.file.path}: no UUID", file=sys.stderr)
+                continue
+
+            self.add(derivation.file.kind, record_uuid, derivation.file.slug, derivation.document)
+
+    def write(self, output: str):
+        self.records.sort()
+        for (a, _), (b, _) in zip(self.records, self.records[1:]):
+            if a == b:
+                raise ValueError(f"Duplicate UUID {uuid.UUID(bytes=a)}")
+
+        fanout = [0] * 257
+        for record_uuid, _ in self.records:
+            fanout[record_uuid[0] + 1] += 1
+
+        for i in range(1, 257):
+            fanout[i] += fanout[i - 1]
+
+        offsets = [0]
+        for _, payload in self.records:
+            offsets.append(offsets[-1] + len(payload))
+
+        assert offsets[-1] < 1 << 32, "Payload too large"
+
+        meta = json.dumps({"kinds": opt_uuid.derivation_order, "fields": self.fields}).encode("utf-8")
+
+        fanout_offset = header_format.size
+        uuids_offset = fanout_offset + fanout_format.size
+        offsets_offset = uuids_offset + 16 * len(self.records)
+        payload_offset = offsets_offset + 4 * len(offsets)
+        meta_offset = payload_offset + offsets[-1]
+
+        with open(f"{output}.tmp", "wb") as f:
+            f.write(header_format.pack(magic, format_version, 0, len(self.records), fanout_offset, uuids_offset, offsets_offset, payload_offset, meta_offset))
+            f.write(fanout_format.pack(*fanout))
+            f.write(b"".join(record_uuid for record_uuid, _ in self.records))
+            f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+            f.write(b"".join(payload for _, payload in self.records))
+            f.write(meta)
+
+        os.replace(f"{output}.tmp", output)
+        return len(self.records)
+
+
+def write_table(root: str, output: str, spec=None):
+    writer = TableWriter(spec)
+    writer.add_database(root)
+    return writer.write(output)
+
+
+class Record(typing.NamedTuple):
+    uuid: uuid.UUID
+    kind: str
+    fields: dict
+
+
+class UuidTable:
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        file_magic, version, _, self.count, self.fanout_offset, self.uuids_offset, self.offsets_offset, self.payload_offset, meta_offset = header_format.unpack_from(self.mm, 0)
+        if file_magic != magic or version != format_version:
+            self.mm.close()
+            raise ValueError(f"{path} is not a UUID table (version {format_version})")
+
+        meta = json.loads(self.mm[meta_offset:])
+        self.kinds = meta["kinds"]
+        self.fields = [meta["fields"][kind] for kind in self.kinds]
+
+        # The sorted UUID column as fixed-size byte strings, a view of the mapping (numpy compares them bytewise, as the UUIDs are sorted)
+        self.uuids = np.frombuffer(self.mm, dtype="S16", count=self.count, offset=self.uuids_offset)
+
+    def close(self):
+        # The view has to be released before the mapping can be closed
+        self.uuids = None
+        self.mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def index(self, key: bytes) -> int:
+        # Binary search within the fanout bucket of the first byte (8 steps less than over the whole array), returns -1 if not found.
+        # The search runs in place on the mapped UUID column, only the compared UUIDs are read, the pages of the rest of the file are not touched.
+        lo, hi = offset_format.unpack_from(self.mm, self.fanout_offset + 4 * key[0])
+        i = lo + int(self.uuids[lo:hi].searchsorted(key))
+
+        # numpy strips trailing zero bytes of the items, the match is checked on the mapping itself
+        pos = self.uuids_offset + 16 * i
+        return i if i < hi and self.mm[pos : pos + 16] == key else -1
+
+    def payload(self, i: int) -> memoryview:
+        # Raw payload of the i-th record, without copying
+        start, end = offset_format.unpack_from(self.mm, self.offsets_offset + 4 * i)
+        return memoryview(self.mm)[self.payload_offset + start : self.payload_offset + end]
+
+    def record(self, i: int) -> Record:
+        data = self.payload(i)
+        kind = data[0]
+        count, pos = read_varint(data, 1)
+
+        fields = dict()
+        names = self.fields[kind]
+        for _ in range(count):
+            field_id, pos = read_varint(data, pos)
+            fields[names[field_id]], pos = read_value(data, pos)
+
+        data.release()
+
+        record_uuid = self.mm[self.uuids_offset + 16 * i : self.uuids_offset + 16 * i + 16]
+        return Record(uuid.UUID(bytes=record_uuid), self.kinds[kind], fields)
+
+    def get(self, key: uuid.UUID | str | bytes) -> Record | None:
+        if isinstance(key, str):
+            key = uuid.UUID(key)
+
+        if isinstance(key, uuid.UUID):
+            key = key.bytes
+
+        i = self.index(key)
+        return self.record(i) if i >= 0 else None
+
+    def __contains__(self, key: uuid.UUID | str | bytes):
+        return self.get(key) is not None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory-mapped UUID lookup table of an openprinttag-database tree")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    p = subparsers.add_parser("build", help="Build the table")
+    p.add_argument("database")
+    p.add_argument("-o", "--output", required=True)
+
+    p = subparsers.add_parser("lookup", help="Look up UUIDs (arguments or one per line on stdin)")
+    p.add_argument("table")
+    p.add_argument("uuids", nargs="*")
+
+    args = parser.parse_args()
+
+    match args.command:
+        case "build":
+            start = time.perf_counter()
+            count = write_table(args.database, args.output)
+            print(f"Wrote {count} records ({os.path.getsize(args.output)} bytes) in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+
+        case "lookup":
+            missing = 0
+            with UuidTable(args.table) as table:
+                for key in args.uuids or (line.strip() for line in sys.stdin if line.strip()):
+                    record = table.get(key)
+                    missing += record is None
+                    print(json.dumps({"uuid": key, "kind": record.kind, "fields": record.fields} if record else {"uuid": key, "kind": None}, ensure_ascii=False, default=str))
+
+            if missing:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import argparse
+import json
+import multiprocessing
+import os
+import pathlib
+import sys
+import typing
+import urllib.parse
+
+import jsonschema.validators
+import referencing
+import yaml
+
+import database
+from yaml_loader import load_yaml
+
+root_dir = pathlib.Path(__file__).parent.parent
+default_schema_dir = root_dir / "schema" / "generated" / "opt_db_schema"
+bundle_file = "opt_db.bundle.schema.json"
+
+
+def load_registry(schema_dir=default_schema_dir):
+    # Read every schema exactly once and register it under the URI the relative $refs resolve to
+    schemas = {}
+    resources = []
+
+    for path in sorted(pathlib.Path(schema_dir).glob("*.schema.json")):
+        if path.name.endswith(".bundle.schema.json"):
+            continue
+
+        contents = json.loads(path.read_text(encoding="utf-8"))
+        uri = urllib.parse.urljoin(contents.get("$id", ""), path.name)
+
+        schemas[path.name.removesuffix(".schema.json")] = contents
+        resources.append((uri, referencing.Resource.from_contents(contents)))
+
+    return schemas, referencing.Registry().with_resources(resources).crawl()
+
+
+def load_bundle_validators(bundle_path):
+    # The bundle is self-contained - a single read and no $ref retrieval
+    bundle = json.loads(pathlib.Path(bundle_path).read_text(encoding="utf-8"))
+    cls = jsonschema.validators.validator_for(bundle)
+
+    result = {}
+    for kind in bundle["$defs"]:
+        schema = {"$schema": bundle["$schema"], "$defs": bundle["$defs"], "$ref": f"#/$defs/{kind}"}
+        result[kind] = cls(schema, format_checker=cls.FORMAT_CHECKER)
+
+    return result
+
+
+def load_validators(schema_dir=default_schema_dir, use_bundle=True):
+    bundle_path = pathlib.Path(schema_dir) / bundle_file
+    if use_bundle and bundle_path.is_file():
+        return load_bundle_validators(bundle_path)
+
+    schemas, registry = load_registry(schema_dir)
+
+    result = {}
+    for kind, schema in schemas.items():
+        cls = jsonschema.validators.validator_for(schema)
+        result[kind] = cls(schema, registry=registry, format_checker=cls.FORMAT_CHECKER)
+
+    return result
+
+
+class ValidationResult(typing.NamedTuple):
+    path: str
+    kind: str
+    errors: list[str]
+
+
+def format_error(error: jsonschema.ValidationError):
+    location = error.json_path if len(error.path) else "$"
+    return f"{location}: {error.message}"
+
+
+def validate_document(validator, document):
+    errors = sorted(validator.iter_errors(document), key=lambda e: list(map(str, e.path)))
+    return [format_error(e) for e in errors]
+
+
+# Per-process validators, compiled once by the pool initializer
+_validators = None
+
+
+def _init_worker(schema_dir):
+    global _validators
+    _validators = load_validators(schema_dir)
+
+
+def _validate_file(file: database.EntityFile):
+    try:
+        document = load_yaml(file.path)
+
+    except yaml.YAMLError as e:
+        return ValidationResult(file.path, file.kind, [f"YAML error: {e}"])
+
+    errors = validate_document(_validators[file.kind], document)
+
+    if isinstance(document, dict) and "slug" in document and document["slug"] != file.slug:
+        errors.append(f"$.slug: '{document['slug']}' does not match the filename '{file.slug}'")
+
+    return ValidationResult(file.path, file.kind, errors)
+
+
+def validate_database(root, schema_dir=default_schema_dir, jobs: int | None = None, chunksize=64):
+    # Yields ValidationResults as they finish (in no particular order)
+    files = database.entity_files(root)
+
+    if jobs == 1:
+        _init_worker(schema_dir)
+        yield from map(_validate_file, files)
+        return
+
+    with multiprocessing.Pool(jobs, initializer=_init_worker, initargs=(schema_dir,)) as pool:
+        yield from pool.imap_unordered(_validate_file, files, chunksize=chunksize)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validates an openprinttag-database tree against the generated schemas")
+    parser.add_argument("database", help="Path to the openprinttag-database checkout (or its data directory)")
+    parser.add_argument("--schema-dir", default=default_schema_dir, help="Directory with the generated *.schema.json files")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Number of worker processes (defaults to the number of CPUs)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Also report valid files")
+    args = parser.parse_args()
+
+    total = 0
+    invalid = 0
+
+    for result in validate_database(args.database, args.schema_dir, args.jobs):
+        total += 1
+        rel_path = os.path.relpath(result.path, args.database)
+
+        if result.errors:
+            invalid += 1
+            for error in result.errors:
+                print(f"{rel_path}: {error}", flush=True)
+
+        elif args.verbose:
+            print(f"{rel_path}: OK", flush=True)
+
+    print(f"Validated {total} files, {invalid} invalid", file=sys.stderr)
+    sys.exit(1 if invalid else 0)
+
+
+if __name__ == "__main__":
+    main()
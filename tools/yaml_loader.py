@@ -0,0 +1,156 @@
+import atexit
+import hashlib
+import os
+import pickle
+
+import yaml
+
+import tracing
+
+root_dir = os.path.abspath(os.path.dirname(__file__) + "/../")
+
+# Use the libyaml bindings if available, they are an order of magnitude faster than the pure-Python loader
+Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+Dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+# On-disk cache of parsed documents, keyed by the file path and validated by its size, mtime and content hash
+cache_enabled = os.environ.get("OPT_YAML_CACHE", "1") != "0"
+cache_dir = os.environ.get("OPT_YAML_CACHE_DIR", f"{root_dir}/build/yaml_cache")
+cache_max_size = int(os.environ.get("OPT_YAML_CACHE_SIZE", 256 * 1024 * 1024))
+
+# Bump when the format of the cache entries changes
+cache_version = 1
+
+stats = {"hits": 0, "revalidated": 0, "misses": 0}
+tracing.counter_sources["yaml_cache"] = stats
+
+_written_since_eviction = 0
+
+
+def parse_yaml(data: bytes | str):
+    return yaml.load(data, Loader=Loader)
+
+
+def _entry_path(path: str):
+    key = hashlib.sha1(path.encode("utf-8")).hexdigest()
+    return f"{cache_dir}/{key[:2]}/{key}.pickle"
+
+
+def _read_entry(entry_path: str):
+    try:
+        with open(entry_path, "rb") as f:
+            entry = pickle.load(f)
+
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        return None
+
+    if not isinstance(entry, dict) or entry.get("version") != cache_version:
+        return None
+
+    return entry
+
+
+def _write_entry(entry_path: str, entry: dict):
+    global _written_since_eviction
+
+    data = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+
+    os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+    tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+
+    os.replace(tmp_path, entry_path)
+
+    _written_since_eviction += len(data)
+    if _written_since_eviction > cache_max_size // 8:
+        evict()
+
+
+@tracing.traced("load_yaml", "yaml", args=lambda path: {"path": str(path)})
+def load_yaml(path: str | os.PathLike):
+    path = os.path.abspath(path)
+
+    if not cache_enabled:
+        with open(path, "rb") as f:
+            return parse_yaml(f.read())
+
+    st = os.stat(path)
+    entry_path = _entry_path(path)
+    entry = _read_entry(entry_path)
+
+    # Fast path - the file was not touched since it was cached, no need to even read it
+    if entry is not None and entry["path"] == path and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime_ns:
+        stats["hits"] += 1
+        os.utime(entry_path)  # Mark the entry as recently used for the eviction
+        return entry["data"]
+
+    with open(path, "rb") as f:
+        content = f.read()
+
+    content_hash = hashlib.sha256(content).hexdigest()
+
+    # The file was touched, but the content is the same (git checkout, copy, ...)
+    if entry is not None and entry["path"] == path and entry["hash"] == content_hash:
+        stats["revalidated"] += 1
+        data = entry["data"]
+
+    else:
+        stats["misses"] += 1
+        data = parse_yaml(content)
+
+    _write_entry(
+        entry_path,
+        {
+            "version": cache_version,
+            "path": path,
+            "size": len(content),
+            "mtime": st.st_mtime_ns,
+            "hash": content_hash,
+            "data": data,
+        },
+    )
+
+    return data
+
+
+def evict(max_size: int | None = None):
+    # Removes the least recently used entries until the cache fits into max_size bytes
+    global _written_since_eviction
+    _written_since_eviction = 0
+
+    if max_size is None:
+        max_size = cache_max_size
+
+    entries = []
+    total_size = 0
+
+    for dirpath, _, filenames in os.walk(cache_dir):
+        for filename in filenames:
+            entry_path = os.path.join(dirpath, filename)
+            try:
+                st = os.stat(entry_path)
+            except FileNotFoundError:
+                continue
+
+            entries.append((st.st_mtime_ns, st.st_size, entry_path))
+            total_size += st.st_size
+
+    if total_size <= max_size:
+        return
+
+    for _, size, entry_path in sorted(entries):
+        try:
+            os.remove(entry_path)
+        except FileNotFoundError:
+            pass
+
+        total_size -= size
+        if total_size <= max_size:
+            break
+
+
+@atexit.register
+def _evict_at_exit():
+    if _written_since_eviction > 0:
+        evict()